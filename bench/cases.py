@@ -0,0 +1,298 @@
+"""
+The benchmarks.  Each case takes `quick` and returns {name: metric}.
+
+    decode      MeasurementFrame.from_bytes and batch decode_records
+    receiver    highest simulator rate TelemetryReceiver + ingest take
+                without losing a datagram (sender in a subprocess)
+    logger      DataLogger rows/s and MB/s, CSV and binary
+    ui          MainWindow._updater per tick at 2 and 5 kHz telemetry,
+                DearPyGui context without a viewport (no rendering)
+    commands    MotorController.set_pwm against sim.fake_autopilot
+
+Inputs come from sim.stm32_sim with a fixed seed, so every run feeds the
+code under test the same data.
+"""
+from __future__ import annotations
+import contextlib, io, re, socket, subprocess, sys, tempfile, threading, time
+from typing import Callable, Dict
+
+import numpy as np
+
+from core.measurement import MeasurementFrame, FRAME_SIZE, RECORD_DTYPE, decode_records
+from sim.stm32_sim import Stm32Sim
+from .harness import ROOT, metric, timed
+
+__all__ = ["CASES"]
+
+CASES: Dict[str, Callable[[bool], dict]] = {}
+
+
+def _case(fn):
+    CASES[fn.__name__] = fn
+    return fn
+
+
+def _frames(n: int, rate: float = 5000.0) -> np.ndarray:
+    return Stm32Sim(rate=rate, seed=1).frames(0, n)
+
+
+def _free_port() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _ingest():
+    """The AppCoordinator ingest stages, without a stored calibration."""
+    from core.ingest import IngestPipeline
+    from core.derived import DerivedChannels, DEFAULT_DERIVED
+    from core.filters import ValidityMask, ChannelFilters
+    from core.calibration import CalibrationSet, CalibrationStage
+    from core.measurement import FIELD_NAMES
+    return IngestPipeline(
+        [CalibrationStage(CalibrationSet()), DerivedChannels(DEFAULT_DERIVED)],
+        view_stages=[ValidityMask(FIELD_NAMES), ChannelFilters({}),
+                     DerivedChannels(DEFAULT_DERIVED)])
+
+
+# ── decode ─────────────────────────────────────────────────────────────
+@_case
+def decode(quick: bool) -> dict:
+    raw = _frames(256).tobytes()
+    one = raw[:FRAME_SIZE]
+    n = 5_000 if quick else 20_000
+
+    def single():
+        for _ in range(n):
+            MeasurementFrame.from_bytes(one)
+
+    ring, stamps = bytearray(raw), np.arange(256, dtype=np.float64)
+    m = 200 if quick else 1000
+
+    def batch():
+        for _ in range(m):
+            decode_records(ring, stamps, 256)
+
+    reps = 3 if quick else 7
+    return {
+        "decode.from_bytes": metric([n / t for t in timed(single, reps)], "frames/s"),
+        "decode.records_256": metric([m * 256 / t for t in timed(batch, reps)], "rows/s"),
+    }
+
+
+# ── receiver ───────────────────────────────────────────────────────────
+_SIM_SENT = re.compile(r"sent (\d+) of (\d+) frames in ([\d.]+) s")
+
+
+def _receive_at(rate: float, seconds: float) -> dict:
+    from core.telemetry import TelemetryReceiver
+    from core.bus import BLOCK, LATEST
+    port = _free_port()
+    ingest = _ingest()
+    rec = ingest.bus.subscribe("logger", capacity=1 << 16, policy=BLOCK)
+    ingest.view_bus.subscribe("ui", capacity=1 << 14, policy=LATEST)
+    done = threading.Event()
+    drained = [0]
+
+    def consume():                              # stands in for DataLogger
+        while not done.is_set() or rec.pending:
+            drained[0] += len(rec.get_batch(timeout=0.1))
+
+    rx = TelemetryReceiver("127.0.0.1", port, ingest)
+    rx.start()
+    consumer = threading.Thread(target=consume, daemon=True)
+    consumer.start()
+    out = subprocess.run([sys.executable, "-m", "sim.stm32_sim", "--port", str(port),
+                          "--rate", str(rate), "--duration", str(seconds)],
+                         cwd=ROOT, capture_output=True, text=True, timeout=seconds + 30)
+    time.sleep(0.3)
+    done.set()
+    consumer.join(2.0)
+    rx.stop()
+    m = _SIM_SENT.search(out.stdout)
+    if not m:
+        raise RuntimeError(f"simulator failed: {out.stdout}{out.stderr}")
+    sent, elapsed = int(m.group(1)), float(m.group(3))
+    return {"sent": sent, "sent_rate": sent / elapsed, "received": rx.stats.snapshot()["packets"],
+            "drained": drained[0], "bus_dropped": rec.dropped}
+
+
+@_case
+def receiver(quick: bool) -> dict:
+    rates = [2_000, 5_000, 10_000, 20_000] if quick else \
+        [2_000, 5_000, 10_000, 20_000, 50_000, 100_000, 200_000]
+    seconds = 1.0 if quick else 3.0
+    best, sender_limited, capped = 0.0, False, False
+    for i, rate in enumerate(rates):
+        r = _receive_at(rate, seconds)
+        lossless = r["received"] >= r["sent"] and not r["bus_dropped"]
+        print(f"    receiver @ {rate:>7,} /s: sent {r['sent']:,} ({r['sent_rate']:,.0f}/s), "
+              f"received {r['received']:,}, bus dropped {r['bus_dropped']}", file=sys.__stdout__)
+        if r["sent_rate"] < 0.95 * rate:
+            sender_limited = True               # can't push harder from here
+        if not lossless:
+            break
+        best = r["sent_rate"]
+        if sender_limited:
+            break
+        capped = i == len(rates) - 1            # lossless at the top rung
+    out = {"receiver.max_lossless": metric([best], "pkt/s")}
+    if sender_limited:
+        out["receiver.max_lossless"]["note"] = "sender-limited"
+    elif capped:
+        out["receiver.max_lossless"]["note"] = "ladder-capped"
+    return out
+
+
+# ── logger ─────────────────────────────────────────────────────────────
+@_case
+def logger(quick: bool) -> dict:
+    from core.bus import FrameBus, BLOCK
+    from core.logger import DataLogger
+    ingest = _ingest()
+    n = 50_000 if quick else 200_000
+    frames = _frames(n)
+    rows = np.empty(n, dtype=RECORD_DTYPE)
+    rows["t_host"] = rows["t_stm32_host"] = rows["t_pixhawk_host"] = \
+        1.7e9 + frames["stm32_timestamp"]
+    for name in frames.dtype.names:
+        rows[name] = frames[name]
+    rows = ingest.process(rows)                 # with the derived columns
+
+    out = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for fmt in ("csv", "bin"):
+            sizes = []
+
+            def write_all():
+                bus = FrameBus(rows.dtype)
+                sub = bus.subscribe("logger", capacity=n, policy=BLOCK)
+                for i in range(0, n, 256):      # as the receiver publishes
+                    bus.publish(rows[i:i + 256])
+                lg = DataLogger(sub, f"bench_{fmt}", folder=tmp, fmt=fmt)
+                lg.start()
+                lg.stop()
+                sizes.append(lg.file.stat().st_size)
+                lg.file.unlink()
+
+            t = timed(write_all, repeats=3 if quick else 5)
+            out[f"logger.{fmt}_rows"] = metric([n / s for s in t], "rows/s")
+            out[f"logger.{fmt}_bytes"] = metric([b / s / 1e6 for b, s in zip(sizes[1:], t)],
+                                                "MB/s")
+    return out
+
+
+# ── ui ─────────────────────────────────────────────────────────────────
+class _StubCoordinator:
+    """Just what MainWindow._updater reads, fed from pre-built batches."""
+
+    def __init__(self, batches):
+        self._batches = iter(batches)
+        self.motor = None
+        self.tele = None
+        self._pwm_cached = 1000
+        from core.stream_stats import StreamStats
+        self._stats = StreamStats()
+
+    def drain_frames(self):
+        return next(self._batches)
+
+    def stream_stats(self) -> dict:
+        snap = self._stats.snapshot()
+        snap["subscribers"] = {"ui": {"received": 0, "dropped": 0, "pending": 0}}
+        snap["masked"] = {}
+        return snap
+
+    def command_stats(self):
+        return None
+
+
+@_case
+def ui(quick: bool) -> dict:
+    import dearpygui.dearpygui as dpg
+    from ui.main_window import MainWindow
+    from utils import widgets
+    ticks = 120 if quick else 600
+    refresh = 60.0
+    out = {}
+    for rate in (2_000, 5_000):
+        per_tick = int(rate / refresh)
+        n = per_tick * (ticks + 60)
+        frames = _frames(n, rate)
+        rows = np.empty(n, dtype=RECORD_DTYPE)
+        t_host = time.time() + np.arange(n) / rate
+        rows["t_host"] = rows["t_stm32_host"] = rows["t_pixhawk_host"] = t_host
+        for name in frames.dtype.names:
+            rows[name] = frames[name]
+        ingest = _ingest()
+        rows = ingest.process(rows)
+        for stage in ingest.view_stages:
+            rows = stage(rows)
+        batches = [rows[i:i + per_tick] for i in range(0, n, per_tick)]
+
+        widgets.forget()                        # caches belong to the last context
+        win = MainWindow(refresh_hz=refresh, run=False)
+        win.coord = _StubCoordinator(batches)
+        try:
+            for _ in range(60):                 # warm-up: fill the plot history
+                win._updater()
+            costs = []
+            for _ in range(ticks):
+                t = time.perf_counter()
+                win._updater()
+                costs.append(time.perf_counter() - t)
+        finally:
+            dpg.destroy_context()
+        costs = np.array(costs) * 1e3
+        out[f"ui.tick_{rate // 1000}khz"] = metric(costs, "ms", "lower")
+        out[f"ui.tick_{rate // 1000}khz_p95"] = metric([np.percentile(costs, 95)], "ms", "lower")
+    return out
+
+
+# ── commands ───────────────────────────────────────────────────────────
+@_case
+def commands(quick: bool) -> dict:
+    from sim.fake_autopilot import FakeAutopilot
+    from core.motor import MotorController
+    port = _free_port()
+    ap = FakeAutopilot(f"udpout:127.0.0.1:{port}", hb_rate=5.0, seed=1)
+    ap.start()
+    motor = MotorController(f"udpin:127.0.0.1:{port}", 115200, max_cmd_rate=0)
+    seconds = 1.0 if quick else 3.0
+    try:
+        motor.arm()
+        sent0 = motor.pwm.sent
+        calls, i = 0, 0
+        t0 = time.perf_counter()
+        while time.perf_counter() - t0 < seconds:
+            for _ in range(100):
+                motor.set_pwm(1 + i % 4, 1100 + i % 800)
+                i += 1
+            calls += 100
+        elapsed = time.perf_counter() - t0
+        sent = motor.pwm.sent - sent0
+        time.sleep(0.5)                         # let the last ACKs arrive
+        cs = motor.cmd_stats.snapshot()
+        motor.disarm()
+    finally:
+        motor.close()
+        ap.stop()
+        ap.join(2.0)
+    lat = cs["latency_ms"]
+    return {
+        "commands.set_pwm_calls": metric([calls / elapsed], "calls/s"),
+        "commands.sent": metric([sent / elapsed], "cmd/s"),
+        "commands.ack_p50": metric([lat["p50"]], "ms", "lower"),
+        "commands.ack_p95": metric([lat["p95"]], "ms", "lower"),
+        "commands.unacked": metric([cs["unacked"]], "cmds", "lower"),
+    }
+
+
+@contextlib.contextmanager
+def quiet(enabled: bool = True):
+    """Swallow the prints of the code under test."""
+    if not enabled:
+        yield
+        return
+    with contextlib.redirect_stdout(io.StringIO()):
+        yield
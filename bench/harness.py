@@ -0,0 +1,152 @@
+"""
+Timing, result records and run-to-run comparison for the benchmarks.
+
+Every metric is a dict
+
+    {"value": median, "unit": "rows/s", "better": "higher" | "lower",
+     "spread": relative IQR of the repeats, "n": repeats}
+
+and a run is {"env": {...}, "metrics": {name: metric}} saved as JSON under
+bench/results/.  compare() flags a metric as a regression only when it got
+worse by more than `threshold` *and* by more than twice the noise seen
+in either run, so a noisy laptop does not cry wolf.
+"""
+from __future__ import annotations
+import datetime, gc, json, os, pathlib, platform, subprocess, time
+from typing import Callable, List, Optional
+
+import numpy as np
+
+__all__ = ["metric", "timed", "environment", "save", "load", "compare",
+           "format_run", "format_compare", "RESULTS"]
+
+ROOT = pathlib.Path(__file__).resolve().parent.parent
+RESULTS = ROOT / "bench" / "results"
+
+
+def metric(samples, unit: str, better: str = "higher") -> dict:
+    """Summarise repeated measurements of one quantity."""
+    a = np.asarray(samples, dtype=float)
+    med = float(np.median(a))
+    q1, q3 = np.percentile(a, [25, 75]) if len(a) > 1 else (med, med)
+    return {"value": med, "unit": unit, "better": better,
+            "spread": float((q3 - q1) / med) if med else 0.0, "n": len(a)}
+
+
+def timed(fn: Callable[[], object], repeats: int = 7, warmup: int = 1) -> List[float]:
+    """
+    Wall time of `fn()` per repeat, after `warmup` untimed calls.  The
+    garbage collector is off while timing (as in timeit).
+    """
+    for _ in range(warmup):
+        fn()
+    out = []
+    gc_was = gc.isenabled()
+    gc.disable()
+    try:
+        for _ in range(repeats):
+            t = time.perf_counter()
+            fn()
+            out.append(time.perf_counter() - t)
+    finally:
+        if gc_was:
+            gc.enable()
+    return out
+
+
+def _git(*args) -> Optional[str]:
+    try:
+        return subprocess.run(["git", *args], cwd=ROOT, capture_output=True,
+                              text=True, timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def environment() -> dict:
+    return {
+        "time":     datetime.datetime.now().isoformat(timespec="seconds"),
+        "commit":   _git("rev-parse", "--short", "HEAD"),
+        "dirty":    bool(_git("status", "--porcelain", "--untracked-files=no")),
+        "python":   platform.python_version(),
+        "numpy":    np.__version__,
+        "platform": platform.platform(),
+        "machine":  platform.machine(),
+        "cpus":     os.cpu_count(),
+        "host":     platform.node(),
+    }
+
+
+def save(run: dict, path: Optional[pathlib.Path] = None) -> pathlib.Path:
+    if path is None:
+        RESULTS.mkdir(parents=True, exist_ok=True)
+        stamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+        path = RESULTS / f"{stamp}_{run['env'].get('commit') or 'nogit'}.json"
+    path.write_text(json.dumps(run, indent=2))
+    return path
+
+
+def load(path: str | pathlib.Path) -> dict:
+    """A saved run; "latest" / "previous" pick from bench/results/."""
+    if str(path) in ("latest", "previous"):
+        runs = sorted(RESULTS.glob("*.json"))
+        need = 1 if path == "latest" else 2
+        if len(runs) < need:
+            raise FileNotFoundError(f"no {path} run in {RESULTS}")
+        path = runs[-need]
+    return json.loads(pathlib.Path(path).read_text())
+
+
+def compare(base: dict, new: dict, threshold: float = 0.10) -> List[dict]:
+    """
+    Per-metric change from `base` to `new`, with a verdict.  Quick and
+    full runs use different input sizes and rate ladders, so mixing them
+    raises ValueError.
+    """
+    if bool(base.get("quick")) != bool(new.get("quick")):
+        raise ValueError("cannot compare a --quick run with a full run "
+                         f"(base quick={bool(base.get('quick'))}, "
+                         f"new quick={bool(new.get('quick'))})")
+    rows = []
+    for name, m in new["metrics"].items():
+        b = base["metrics"].get(name)
+        if not b or not b["value"]:
+            rows.append({"name": name, "new": m, "base": None, "change": None,
+                         "verdict": "new"})
+            continue
+        change = (m["value"] - b["value"]) / abs(b["value"])
+        worse = -change if m["better"] == "higher" else change
+        noise = 2 * max(m.get("spread", 0.0), b.get("spread", 0.0))
+        if worse > max(threshold, noise):
+            verdict = "REGRESSION"
+        elif -worse > max(threshold, noise):
+            verdict = "improved"
+        else:
+            verdict = "same"
+        rows.append({"name": name, "new": m, "base": b, "change": change,
+                     "verdict": verdict})
+    return rows
+
+
+def _fmt(v: float) -> str:
+    return f"{v:,.0f}" if abs(v) >= 1000 else f"{v:.3g}"
+
+
+def format_run(run: dict) -> str:
+    env = run["env"]
+    lines = [f"{env['time']}{'  (quick)' if run.get('quick') else ''}  commit {env['commit']}{' (dirty)' if env['dirty'] else ''}"
+             f"  python {env['python']}  numpy {env['numpy']}  {env['cpus']} cpus"]
+    for name, m in run["metrics"].items():
+        note = f"  ({m['note']})" if m.get("note") else ""
+        lines.append(f"  {name:<34} {_fmt(m['value']):>12} {m['unit']:<8}"
+                     f" ±{m['spread'] * 100:4.1f}%{note}")
+    return "\n".join(lines)
+
+
+def format_compare(rows: List[dict]) -> str:
+    lines = [f"  {'metric':<34} {'base':>12} {'new':>12} {'change':>8}"]
+    for r in rows:
+        base = _fmt(r["base"]["value"]) if r["base"] else "-"
+        change = f"{r['change'] * 100:+.1f}%" if r["change"] is not None else ""
+        lines.append(f"  {r['name']:<34} {base:>12} {_fmt(r['new']['value']):>12} "
+                     f"{change:>8}  {r['verdict']}")
+    return "\n".join(lines)
@@ -0,0 +1,85 @@
+"""
+Run the performance benchmarks, record the results and compare runs.
+
+    python -m bench.run                         # everything, saved to bench/results/
+    python -m bench.run --quick decode logger   # a subset, shorter
+    python -m bench.run --compare latest        # vs the newest saved run
+    python -m bench.run --report a.json b.json  # compare two saved runs
+
+Each case repeats its measurement and reports the median and relative
+IQR (see bench.harness).  Exit status is 1 when --compare / --report
+finds a regression, so CI or a pre-merge check can gate on it, and 2
+when the two runs cannot be compared (a --quick run against a full one).
+Run on an otherwise idle machine, plugged in, and compare only runs
+from the same machine.
+"""
+from __future__ import annotations
+import argparse, sys, time
+
+from . import harness
+from .cases import CASES, quiet
+
+
+def _parse(argv):
+    p = argparse.ArgumentParser(description="Telemetry / logging / UI / command benchmarks.")
+    p.add_argument("cases", nargs="*", metavar="CASE",
+                   help=f"subset to run ({', '.join(CASES)}); default all")
+    p.add_argument("--quick", action="store_true", help="fewer repeats, smaller inputs")
+    p.add_argument("--compare", metavar="RUN",
+                   help='saved run (path, "latest" or "previous") to compare against')
+    p.add_argument("--report", nargs=2, metavar=("BASE", "NEW"),
+                   help="compare two saved runs without running anything")
+    p.add_argument("--threshold", type=float, default=0.10,
+                   help="relative change treated as significant (default 0.10)")
+    p.add_argument("--no-save", action="store_true")
+    p.add_argument("--verbose", action="store_true", help="show the output of the code under test")
+    args = p.parse_args(argv)
+    unknown = [c for c in args.cases if c not in CASES]
+    if unknown:
+        p.error(f"unknown case(s) {', '.join(unknown)}")
+    return args
+
+
+def _compare(base: dict, new: dict, threshold: float) -> int:
+    try:
+        rows = harness.compare(base, new, threshold)
+    except ValueError as e:
+        print(f"\nNot compared: {e}")
+        return 2
+    print(f"\nvs {base['env']['time']} (commit {base['env']['commit']}):")
+    print(harness.format_compare(rows))
+    bad = [r["name"] for r in rows if r["verdict"] == "REGRESSION"]
+    if bad:
+        print(f"\n{len(bad)} regression(s): {', '.join(bad)}")
+        return 1
+    return 0
+
+
+def main(argv=None) -> int:
+    args = _parse(argv)
+    if args.report:
+        return _compare(harness.load(args.report[0]), harness.load(args.report[1]),
+                        args.threshold)
+
+    base = harness.load(args.compare) if args.compare else None
+    if base and bool(base.get("quick")) != args.quick:
+        print(f"{args.compare} is a {'quick' if base.get('quick') else 'full'} run; "
+              f"re-run {'with' if base.get('quick') else 'without'} --quick to compare")
+        return 2
+    run = {"env": harness.environment(), "quick": args.quick, "metrics": {}}
+    for name in args.cases or CASES:
+        print(f"{name} …", flush=True)
+        t = time.perf_counter()
+        with quiet(not args.verbose):
+            run["metrics"].update(CASES[name](args.quick))
+        print(f"  done in {time.perf_counter() - t:.1f} s")
+
+    print()
+    print(harness.format_run(run))
+    if not args.no_save:
+        print(f"\nSaved → {harness.save(run)}")
+    return _compare(base, run, args.threshold) if base else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
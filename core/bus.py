@@ -0,0 +1,170 @@
+from __future__ import annotations
+import threading, time
+from typing import List, Optional
+
+import numpy as np
+
+from .measurement import RECORD_DTYPE
+
+__all__ = ["FrameBus", "Subscription", "LATEST", "BLOCK"]
+
+# Backpressure policies
+LATEST = "latest"   # overwrite the oldest pending rows, count them as dropped
+BLOCK  = "block"    # publisher waits up to block_timeout for space (lossless)
+
+
+class Subscription:
+    """
+    One consumer's bounded ring of pending rows.  The bus writes into it,
+    the owner drains it with `get_batch()` or `latest()`; `peek()` reads
+    the newest row without consuming anything.
+    """
+
+    def __init__(self, name: str, dtype: np.dtype, capacity: int,
+                 policy: str, block_timeout: float):
+        if policy not in (LATEST, BLOCK):
+            raise ValueError(f"Unknown policy {policy!r}")
+        self.name          = name
+        self.dtype         = np.dtype(dtype)
+        self.policy        = policy
+        self.capacity      = max(1, int(capacity))
+        self.block_timeout = block_timeout
+        self._buf  = np.empty(self.capacity, dtype=dtype)
+        self._head = 0           # total rows written
+        self._tail = 0           # total rows consumed
+        self._cond = threading.Condition()
+        self._closed = False
+
+        self.received = 0        # rows offered by the bus
+        self.dropped  = 0        # rows lost to overflow
+
+    # ── publisher side ─────────────────────────────────────────────
+    def _write(self, rows: np.ndarray):
+        k, cap = len(rows), self.capacity
+        start = self._head % cap
+        first = min(k, cap - start)
+        self._buf[start:start + first] = rows[:first]
+        if k > first:
+            self._buf[:k - first] = rows[first:]
+        self._head += k
+
+    def _push(self, batch: np.ndarray):
+        n = len(batch)
+        with self._cond:
+            self.received += n
+            if self.policy == LATEST:
+                if n > self.capacity:
+                    self.dropped += n - self.capacity
+                    batch = batch[-self.capacity:]
+                    n = self.capacity
+                over = (self._head - self._tail) + n - self.capacity
+                if over > 0:
+                    self.dropped += over
+                    self._tail += over
+                self._write(batch)
+                self._cond.notify_all()
+                return
+
+            deadline = time.monotonic() + self.block_timeout
+            i = 0
+            while i < n:
+                free = self.capacity - (self._head - self._tail)
+                if free:
+                    k = min(free, n - i)
+                    self._write(batch[i:i + k])
+                    i += k
+                    self._cond.notify_all()
+                    continue
+                remaining = deadline - time.monotonic()
+                if self._closed or remaining <= 0:
+                    self.dropped += n - i
+                    break
+                self._cond.wait(remaining)
+
+    # ── consumer side ──────────────────────────────────────────────
+    @property
+    def pending(self) -> int:
+        with self._cond:
+            return self._head - self._tail
+
+    def get_batch(self, timeout: Optional[float] = None,
+                  max_rows: Optional[int] = None) -> np.ndarray:
+        """
+        Return (and consume) every pending row, oldest first.  Waits up
+        to `timeout` seconds for data; returns an empty array otherwise.
+        """
+        with self._cond:
+            if self._head == self._tail and timeout:
+                self._cond.wait_for(
+                    lambda: self._head != self._tail or self._closed, timeout)
+            k = self._head - self._tail
+            if max_rows is not None:
+                k = min(k, max_rows)
+            start = self._tail % self.capacity
+            first = min(k, self.capacity - start)
+            if k == first:
+                out = self._buf[start:start + k].copy()
+            else:
+                out = np.concatenate((self._buf[start:], self._buf[:k - first]))
+            self._tail += k
+            self._cond.notify_all()
+            return out
+
+    def latest(self):
+        """Return the newest pending row (a copy) and discard the rest."""
+        with self._cond:
+            if self._head == self._tail:
+                return None
+            rec = self._buf[(self._head - 1) % self.capacity].copy()
+            self._tail = self._head
+            self._cond.notify_all()
+            return rec
+
+    def peek(self):
+        """The newest row written (a copy), consumed or not; None before any."""
+        with self._cond:
+            if self._head == 0:
+                return None
+            return self._buf[(self._head - 1) % self.capacity].copy()
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+
+class FrameBus:
+    """
+    Fan-out of decoded frame batches to any number of subscribers, each
+    with its own ring buffer and backpressure policy.
+    """
+
+    def __init__(self, dtype: np.dtype = RECORD_DTYPE):
+        self.dtype = np.dtype(dtype)
+        self._subs: List[Subscription] = []
+        self._lock = threading.Lock()
+        self.published = 0
+
+    def subscribe(self, name: str, capacity: int = 1024,
+                  policy: str = LATEST,
+                  block_timeout: float = 0.5) -> Subscription:
+        sub = Subscription(name, self.dtype, capacity, policy, block_timeout)
+        with self._lock:
+            self._subs = self._subs + [sub]     # copy-on-write for publish()
+        return sub
+
+    def unsubscribe(self, sub: Subscription):
+        sub.close()
+        with self._lock:
+            self._subs = [s for s in self._subs if s is not sub]
+
+    def publish(self, batch: np.ndarray):
+        self.published += len(batch)
+        for sub in self._subs:
+            sub._push(batch)
+
+    def stats(self) -> dict:
+        """Per-subscriber received/dropped/pending counters."""
+        return {s.name: {"received": s.received, "dropped": s.dropped,
+                         "pending": s.pending}
+                for s in self._subs}
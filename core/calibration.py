@@ -0,0 +1,139 @@
+"""
+Per-channel calibration to engineering units, plus tare.
+
+Each channel maps raw → engineering units as
+
+    y = poly(x) - tare        poly coefficients lowest order first
+
+`{"offset": o, "scale": s}` is shorthand for poly = [-o·s, s], i.e.
+y = (x - o)·s.  Calibrations persist in ~/.lat_motor_gui_cal.json next to
+the Settings file and are applied in place at ingest, before derived
+channels, so gauges, plots and recordings all carry engineering units.
+Sentinel and non-finite raw values pass through unchanged so the view's
+ValidityMask still recognises them.
+
+Example file (thrust in grams so g/W comes out right):
+    {"thrust1": {"offset": 216000, "scale": 0.0125, "unit": "g"},
+     "current": {"poly": [0.02, 0.98, 0.0004], "unit": "A"}}
+"""
+from __future__ import annotations
+import json, pathlib, time
+from typing import Dict, Iterable, Optional
+
+import numpy as np
+
+from .bus import Subscription
+from .filters import SENTINELS
+
+__all__ = ["ChannelCal", "CalibrationSet", "CalibrationStage", "measure_mean"]
+
+_CFG = pathlib.Path.home() / ".lat_motor_gui_cal.json"
+
+
+class ChannelCal:
+    __slots__ = ("poly", "tare", "unit")
+
+    def __init__(self, poly=(0.0, 1.0), tare: float = 0.0, unit: str = ""):
+        self.poly = [float(c) for c in poly] or [0.0, 1.0]
+        self.tare = float(tare)
+        self.unit = unit
+
+    @classmethod
+    def from_dict(cls, d: dict) -> "ChannelCal":
+        if "poly" in d:
+            poly = d["poly"]
+        else:
+            o, s = float(d.get("offset", 0.0)), float(d.get("scale", 1.0))
+            poly = [-o * s, s]
+        return cls(poly, d.get("tare", 0.0), d.get("unit", ""))
+
+    def to_dict(self) -> dict:
+        return {"poly": self.poly, "tare": self.tare, "unit": self.unit}
+
+    def apply(self, x: np.ndarray) -> np.ndarray:
+        # Horner in float64, highest order first
+        y = np.full(x.shape, self.poly[-1])
+        xd = x.astype(np.float64)
+        for c in reversed(self.poly[:-1]):
+            y = y * xd + c
+        return y - self.tare
+
+
+class CalibrationSet:
+    """All channel calibrations; replaced wholesale so readers never see a half update."""
+
+    def __init__(self, channels: Optional[Dict[str, ChannelCal]] = None):
+        self.channels: Dict[str, ChannelCal] = dict(channels or {})
+
+    @classmethod
+    def load(cls, path: pathlib.Path | None = None) -> "CalibrationSet":
+        p = path or _CFG
+        if p.exists():
+            try:
+                raw = json.loads(p.read_text())
+                return cls({k: ChannelCal.from_dict(v) for k, v in raw.items()})
+            except Exception as e:
+                print(f"Ignoring unreadable calibration file {p}: {e}")
+        return cls()
+
+    def save(self, path: pathlib.Path | None = None) -> None:
+        (path or _CFG).write_text(json.dumps(self.to_dict(), indent=2))
+
+    def to_dict(self) -> dict:
+        return {k: c.to_dict() for k, c in self.channels.items()}
+
+    def with_tare(self, tares: Dict[str, float]) -> "CalibrationSet":
+        """Copy with `tares` (engineering units) added to the current tares."""
+        out = {k: ChannelCal(c.poly, c.tare, c.unit) for k, c in self.channels.items()}
+        for name, t in tares.items():
+            cal = out.setdefault(name, ChannelCal())
+            cal.tare += float(t)
+        return CalibrationSet(out)
+
+
+class CalibrationStage:
+    """Ingest stage: applies the current CalibrationSet in place."""
+
+    def __init__(self, cal: CalibrationSet, sentinels=SENTINELS):
+        self.cal = cal
+        self.sentinels = np.asarray(sentinels, dtype=np.float32)
+
+    def out_dtype(self, in_dtype: np.dtype) -> np.dtype:
+        unknown = [k for k in self.cal.channels if k not in in_dtype.names]
+        if unknown:
+            raise ValueError(f"Calibration for unknown channels {unknown}")
+        return in_dtype
+
+    def __call__(self, batch: np.ndarray) -> np.ndarray:
+        cal = self.cal                          # one snapshot per batch
+        for name, c in cal.channels.items():
+            col = batch[name]
+            keep = ~np.isfinite(col)
+            for s in self.sentinels:
+                keep |= col == s
+            y = c.apply(col)
+            if keep.any():
+                y[keep] = col[keep]
+            col[:] = y
+        return batch
+
+
+def measure_mean(sub: Subscription, fields: Iterable[str], seconds: float,
+                 sentinels=SENTINELS) -> Dict[str, float]:
+    """
+    Average `fields` over `seconds` of rows from `sub`, ignoring
+    sentinel / non-finite samples.  Blocks the calling thread.
+    """
+    fields = list(fields)
+    s = np.zeros(len(fields))
+    n = np.zeros(len(fields))
+    sub.get_batch()                             # only rows from now on
+    t_end = time.monotonic() + seconds
+    while time.monotonic() < t_end:
+        batch = sub.get_batch(timeout=0.2)
+        for i, f in enumerate(fields):
+            col = batch[f].astype(np.float64)
+            ok = np.isfinite(col) & ~np.isin(col, sentinels)
+            s[i] += col[ok].sum()
+            n[i] += ok.sum()
+    return {f: float(s[i] / n[i]) for i, f in enumerate(fields) if n[i]}
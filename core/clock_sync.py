@@ -0,0 +1,96 @@
+from __future__ import annotations
+import math
+from typing import Optional
+
+import numpy as np
+
+__all__ = ["ClockAligner"]
+
+
+class ClockAligner:
+    """
+    Online offset + drift estimate mapping a device clock onto host time.
+
+    Each `window` seconds of device time contributes one point: the
+    smallest (host - device) offset seen in it, i.e. the sample with the
+    least transport delay.  An exponentially weighted line fit through
+    those points (time constant `memory`) gives offset and drift, so
+    `host ≈ dev + offset + drift * (dev - ref)`.
+    """
+
+    def __init__(self, scale: float = 1.0, window: float = 1.0,
+                 memory: float = 120.0, jump: float = 5.0):
+        """
+        scale  – device clock units per second (1000 for milliseconds)
+        window – seconds of device time folded into one envelope point
+        memory – decay time constant of the fit, in seconds
+        jump   – a backwards step larger than this (s) resets the fit
+        """
+        self.scale, self.window = scale, window
+        self.memory, self.jump = memory, jump
+        self.reset()
+
+    def reset(self):
+        self._ref: Optional[float] = None      # device time origin (s)
+        self._bucket: Optional[int] = None
+        self._bucket_x = self._bucket_y = math.nan
+        self._last_x: Optional[float] = None
+        self._s = np.zeros(5)                   # Σw, Σwx, Σwy, Σwxx, Σwxy
+        self.points = 0
+        self.offset = math.nan                  # host - device at ref (s)
+        self.drift = 0.0                        # s/s (×1e6 for ppm)
+
+    @property
+    def locked(self) -> bool:
+        return self.points >= 3
+
+    def _add_point(self, x: float, y: float):
+        if self._last_x is not None:
+            self._s *= math.exp(-max(0.0, x - self._last_x) / self.memory)
+        self._last_x = x
+        self._s += (1.0, x, y, x * x, x * y)
+        self.points += 1
+        sw, sx, sy, sxx, sxy = self._s
+        den = sw * sxx - sx * sx
+        if self.points >= 2 and den > 1e-12:
+            self.drift = (sw * sxy - sx * sy) / den
+            self.offset = (sy - self.drift * sx) / sw
+        else:
+            self.offset, self.drift = sy / sw, 0.0
+
+    def update(self, host: np.ndarray, dev: np.ndarray) -> np.ndarray:
+        """Feed (host, device) pairs; returns device times mapped to host time."""
+        d = dev.astype(np.float64) / self.scale
+        ok = np.isfinite(d)
+        if ok.any():
+            first = float(d[ok][0])
+            if self._ref is None or (self._last_x is not None and
+                                     first - self._ref < self._last_x - self.jump):
+                self.reset()
+                self._ref = first
+            x = d[ok] - self._ref
+            y = host[ok] - d[ok]
+            buckets = np.floor(x / self.window).astype(np.int64)
+            starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+            for i, j in zip(starts, np.r_[starts[1:], len(x)]):
+                k = int(np.argmin(y[i:j])) + i
+                b = int(buckets[i])
+                if b != self._bucket:
+                    if self._bucket is not None and math.isfinite(self._bucket_y):
+                        self._add_point(self._bucket_x, self._bucket_y)
+                    self._bucket, self._bucket_y = b, math.inf
+                if y[k] < self._bucket_y:
+                    self._bucket_x, self._bucket_y = float(x[k]), float(y[k])
+                    if self.points == 0:      # usable before the first fit
+                        self.offset = self._bucket_y
+        return self.to_host(dev)
+
+    def to_host(self, dev: np.ndarray) -> np.ndarray:
+        d = np.asarray(dev, dtype=np.float64) / self.scale
+        if self._ref is None:
+            return np.full_like(d, np.nan)
+        return d + self.offset + self.drift * (d - self._ref)
+
+    def state(self) -> dict:
+        return {"offset_s": float(self.offset), "drift_ppm": float(self.drift) * 1e6,
+                "points": self.points, "locked": self.locked}
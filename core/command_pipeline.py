@@ -0,0 +1,156 @@
+from __future__ import annotations
+import threading, time
+from typing import Callable, Dict, Iterable, Optional
+
+from .logging_utils import log
+
+__all__ = ["PwmPipeline"]
+
+
+class PwmPipeline(threading.Thread):
+    """
+    Non-blocking servo command queue with its own sender thread.
+
+    * latest value wins: a channel updated before it was sent is
+      coalesced into one command;
+    * commands leave at most `max_rate` per second;
+    * `stop()` jumps the queue and bypasses the rate limit;
+    * channels pending together leave together: as one `send_many`
+      message when the link supports it, else back-to-back `send` calls;
+    * with `refresh`, an idle queue calls it every `refresh_period` s
+      once something has been sent (RC overrides time out on the
+      autopilot unless they are repeated).
+
+    `send(channel, pwm)` / `send_many({channel: pwm})` / `refresh()` are
+    called on the sender thread only.
+    """
+
+    def __init__(self, send: Callable[[int, int], None], max_rate: float = 100.0,
+                 send_many: Optional[Callable[[Dict[int, int]], None]] = None,
+                 refresh: Optional[Callable[[], None]] = None,
+                 refresh_period: float = 0.25):
+        super().__init__(daemon=True)
+        self._send = send
+        self._send_many = send_many
+        self._refresh = refresh
+        self.refresh_period = refresh_period
+        self._refresh_due = float("inf")        # armed by the first send
+        self.max_rate = max_rate
+        self._pending: Dict[int, int] = {}      # channel -> pwm, oldest first
+        self._urgent = False
+        self._cond = threading.Condition()
+        self._halt = False
+        self._next_ok = 0.0
+
+        self.queued    = 0     # submit() calls
+        self.coalesced = 0     # updates that replaced an unsent value
+        self.sent      = 0     # commands handed to `send`
+        self.stops     = 0     # priority stop requests
+        self.refreshes = 0     # idle re-sends via `refresh`
+        self.errors    = 0
+
+    # ── caller side (never blocks) ─────────────────────────────────
+    def submit(self, channel: int, pwm: int):
+        with self._cond:
+            self.queued += 1
+            if channel in self._pending:
+                self.coalesced += 1
+            self._pending[channel] = pwm
+            self._cond.notify()
+
+    def submit_many(self, setpoints: Dict[int, int]):
+        """Queue several channels so they are sent in the same burst."""
+        with self._cond:
+            self.queued += len(setpoints)
+            self.coalesced += len(self._pending.keys() & setpoints.keys())
+            self._pending.update(setpoints)
+            self._cond.notify()
+
+    def stop(self, pwm: int = 1000, channels: Iterable[int] = range(1, 9)):
+        """Queue `pwm` on every channel ahead of anything else, unthrottled."""
+        with self._cond:
+            self.stops += 1
+            urgent = {ch: pwm for ch in channels}
+            for ch in self._pending.keys() & urgent.keys():
+                self.coalesced += 1
+            rest = {ch: v for ch, v in self._pending.items() if ch not in urgent}
+            self._pending = {**urgent, **rest}
+            self._urgent = True
+            self._cond.notify()
+
+    @property
+    def backlog(self) -> int:
+        with self._cond:
+            return len(self._pending)
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {"queued": self.queued, "coalesced": self.coalesced,
+                    "sent": self.sent, "stops": self.stops,
+                    "refreshes": self.refreshes, "errors": self.errors,
+                    "backlog": len(self._pending)}
+
+    # ── sender thread ──────────────────────────────────────────────
+    def run(self):
+        while True:
+            with self._cond:
+                while not self._pending and not self._halt:
+                    idle = self._refresh_due - time.monotonic()
+                    if idle <= 0:
+                        break                       # time to repeat the last state
+                    self._cond.wait(idle if idle != float("inf") else None)
+                if self._halt and not self._pending:
+                    return
+                batch = None
+                if self._pending:
+                    if not self._urgent and not self._halt:
+                        delay = self._next_ok - time.monotonic()
+                        if delay > 0:
+                            self._cond.wait(delay)  # a stop may arrive meanwhile
+                            continue
+                    batch, self._pending = self._pending, {}
+                    self._urgent = False
+
+            if batch is None:
+                self._repeat()
+            else:
+                n_msgs = self._flush(batch)
+                if self.max_rate:
+                    self._next_ok = time.monotonic() + n_msgs / self.max_rate
+            if self._refresh is not None:
+                self._refresh_due = time.monotonic() + self.refresh_period
+
+    def _repeat(self):
+        try:
+            self._refresh()
+            self.refreshes += 1
+        except Exception as e:
+            self.errors += 1
+            log(f"PWM refresh error: {e}")
+
+    def _flush(self, batch: Dict[int, int]) -> int:
+        """Send one burst; returns the number of messages it took."""
+        if self._send_many is not None:
+            try:
+                self._send_many(batch)
+                self.sent += len(batch)
+            except Exception as e:
+                self.errors += 1
+                log(f"PWM bulk send error {batch}: {e}")
+            return 1
+        for ch, pwm in batch.items():
+            try:
+                self._send(ch, pwm)
+                self.sent += 1
+            except Exception as e:
+                self.errors += 1
+                log(f"PWM send error ch{ch}: {e}")
+        return len(batch)
+
+    def close(self):
+        """Flush what is pending, then end the sender thread."""
+        with self._cond:
+            self._halt = True
+            self._cond.notify()
+        if self.is_alive():
+            self.join(timeout=2.0)
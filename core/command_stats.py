@@ -0,0 +1,110 @@
+from __future__ import annotations
+import threading, time
+from collections import Counter, defaultdict, deque
+from typing import Deque, Dict
+
+import numpy as np
+
+__all__ = ["CommandTracker"]
+
+# send → COMMAND_ACK latency histogram bin edges (ms); last bin is "> 2000 ms"
+LATENCY_EDGES_MS = np.array([1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000])
+
+# MAV_RESULT names, so the tracker does not need pymavlink
+_RESULTS = {0: "accepted", 1: "temporarily_rejected", 2: "denied",
+            3: "unsupported", 4: "failed", 5: "in_progress", 6: "cancelled"}
+
+
+class CommandTracker:
+    """
+    Matches every COMMAND_LONG we send to its COMMAND_ACK.
+
+    COMMAND_ACK carries only the command id, so outstanding sends are
+    queued per command id and each ACK answers the oldest one (the
+    autopilot handles commands in order).  Sends left without an ACK
+    for `timeout` seconds count as unacknowledged.
+    """
+
+    def __init__(self, timeout: float = 2.0, keep: int = 2048):
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._keep = keep
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._pending: Dict[int, Deque[float]] = defaultdict(deque)
+            self._recent: Deque[float] = deque(maxlen=self._keep)   # seconds
+            self.hist = np.zeros(len(LATENCY_EDGES_MS) + 1, dtype=np.int64)
+            self.latency_sum = 0.0  # seconds, over every ACK (for metrics)
+            self.sent     = 0
+            self.acked    = 0
+            self.unacked  = 0       # timed out waiting for an ACK
+            self.stray    = 0       # ACKs with nothing outstanding
+            self.results: Counter = Counter()
+            self.by_command: Counter = Counter()
+
+    # ── link side ──────────────────────────────────────────────────
+    def on_sent(self, command: int):
+        """Call right after the COMMAND_LONG left (under the write lock)."""
+        now = time.monotonic()
+        with self._lock:
+            self.sent += 1
+            self.by_command[command] += 1
+            self._pending[command].append(now)
+            self._expire(now)
+
+    def on_ack(self, msg):
+        """COMMAND_ACK handler (router thread)."""
+        now = time.monotonic()
+        with self._lock:
+            self._expire(now)
+            q = self._pending.get(msg.command)
+            if not q:
+                self.stray += 1
+                return
+            dt = now - q.popleft()
+            self.acked += 1
+            self.results[_RESULTS.get(msg.result, str(msg.result))] += 1
+            self._recent.append(dt)
+            self.latency_sum += dt
+            self.hist[np.searchsorted(LATENCY_EDGES_MS, dt * 1e3)] += 1
+
+    def _expire(self, now: float):
+        for q in self._pending.values():
+            while q and now - q[0] > self.timeout:
+                q.popleft()
+                self.unacked += 1
+
+    # ── any thread ─────────────────────────────────────────────────
+    def counters(self) -> dict:
+        """Cheap subset of snapshot() for metrics scrapes (no percentiles)."""
+        with self._lock:
+            self._expire(time.monotonic())
+            return {"sent": self.sent, "acked": self.acked, "unacked": self.unacked,
+                    "stray_acks": self.stray,
+                    "pending": sum(len(q) for q in self._pending.values()),
+                    "hist": self.hist.tolist(), "latency_sum": self.latency_sum}
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            self._expire(time.monotonic())
+            lat = np.array(self._recent) * 1e3
+            pct = np.percentile(lat, [50, 95, 99]) if len(lat) else [np.nan] * 3
+            failed = self.acked - self.results["accepted"] - self.results["in_progress"]
+            return {
+                "sent":        self.sent,
+                "acked":       self.acked,
+                "failed":      failed,
+                "unacked":     self.unacked,
+                "pending":     sum(len(q) for q in self._pending.values()),
+                "stray_acks":  self.stray,
+                "results":     dict(self.results),
+                "latency_ms":  {"mean": float(lat.mean()) if len(lat) else float("nan"),
+                                "p50": float(pct[0]), "p95": float(pct[1]),
+                                "p99": float(pct[2]),
+                                "max": float(lat.max()) if len(lat) else float("nan")},
+                "latency_hist": dict(zip(
+                    [f"<{e:g}ms" for e in LATENCY_EDGES_MS] + [f">{LATENCY_EDGES_MS[-1]:g}ms"],
+                    self.hist.tolist())),
+            }
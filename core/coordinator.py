@@ -1,17 +1,24 @@
 # src/core/coordinator.py
 
 from __future__ import annotations
-import threading, queue, time
+import threading, time
 from typing import Optional
-from pymavlink import mavutil
-from core.shared_state import armed_status
 
-import datetime
 from .settings    import Settings
 from .motor       import MotorController
 from .telemetry   import TelemetryReceiver
 from .logger      import DataLogger
 from .measurement import MeasurementFrame
+from .bus         import FrameBus, Subscription, LATEST, BLOCK
+from .ingest      import IngestPipeline
+from .derived     import DerivedChannels, DEFAULT_DERIVED
+from .filters     import ValidityMask, ChannelFilters
+from .calibration import CalibrationSet, CalibrationStage, measure_mean
+from .measurement import FIELD_NAMES
+from .profiles    import Profile, ProfileRunner, step, pct_to_pwm
+from .sweep       import ThrustSweep
+from .stream_stats import verdict
+from .metrics     import REGISTRY, MetricsServer
 import os,sys
 
 
@@ -26,12 +33,30 @@ class AppCoordinator:
     Glue between GUI and backend threads with single MAVLink connection.
     """
     def __init__(self, settings: Settings):
-        # single‐slot queue for the freshest MeasurementFrame
-        self._frame_q: "queue.Queue[MeasurementFrame]" = queue.Queue(maxsize=1)
+        self.settings = settings
+        # derived channels are computed once per batch at ingest, then
+        # every row fans out to per-consumer rings.  `bus` carries raw rows
+        # (recordings); `view_bus` masked + filtered ones (UI, controllers).
+        derived = {**DEFAULT_DERIVED, **settings.derived}
+        self.validity = ValidityMask(FIELD_NAMES)
+        # raw counts → engineering units before anything else sees them
+        self.calibration = CalibrationStage(CalibrationSet.load())
+        self.ingest = IngestPipeline(
+            [self.calibration, DerivedChannels(derived)],
+            view_stages=[self.validity,
+                         ChannelFilters(settings.filters),
+                         DerivedChannels(derived)],   # from the cleaned inputs
+        )
+        self.bus = self.ingest.bus
+        self.view_bus = self.ingest.view_bus
+        # UI keeps the newest rows between two refreshes (a few frames' worth)
+        self._ui_sub: Subscription = self.view_bus.subscribe("ui", capacity=1 << 14,
+                                                             policy=LATEST)
 
         # Motor controller (single connection)
         try:
-            self.motor = MotorController(settings.com_port, settings.baud)
+            self.motor = MotorController(settings.com_port, settings.baud,
+                                         bulk_setpoints=settings.bulk_setpoints)
             print(f"Motor controller connected on {settings.com_port}")
         except Exception as e:
             print(f"Motor controller unavailable ({settings.com_port}): {e}")
@@ -41,7 +66,9 @@ class AppCoordinator:
         self.tele = TelemetryReceiver(
             bind_ip   = settings.stm32_ip,
             port      = settings.udp_port,
-            dst_queue = self._frame_q
+            bus       = self.ingest,
+            stm32_clock_scale   = settings.stm32_clock_scale,
+            pixhawk_clock_scale = settings.pixhawk_clock_scale,
         )
         self.tele.start()
         print(f"Started UDP telemetry receiver on {settings.stm32_ip}:{settings.udp_port}")
@@ -50,76 +77,35 @@ class AppCoordinator:
         self._sel_motor   = 1
         self._pwm_cached  = 1000
         self._cont_evt    = threading.Event()
+        self._profile: Optional[ProfileRunner] = None
+        self._sweep: Optional[ThrustSweep] = None
         
         if self.motor:
             threading.Thread(target=self._cont_loop, daemon=True).start()
 
-        # Armed status monitoring using motor's connection
-        self.armed = False
-        self._armed_lock = threading.Lock()
-        
-        # Start heartbeat monitoring using motor's existing connection
-        if self.motor:
-            self._hb_thread = threading.Thread(target=self._heartbeat_monitor, daemon=True)
-            self._hb_thread.start()
-
         self.logger: Optional[DataLogger] = None
+        self._log_sub: Optional[Subscription] = None
 
-    def _heartbeat_monitor(self):
-        """Monitor heartbeat using motor's existing MAVLink connection"""
-        # while True:
-        #     try:
-        #         if self.motor and self.motor.master:
-        #             # Use motor's existing connection - no second connection needed
-        #             msg = self.motor.master.recv_match(type="HEARTBEAT", blocking=False, timeout=0.1)
-        #             if msg:
-        #                 # Print raw heartbeat data for debugging
-        #                 print(f"[HEARTBEAT] Raw Data:")
-        #                 print(f"  Timestamp: {datetime.datetime.now().strftime('%H:%M:%S.%f')[:-3]}")
-        #                 print(f"  Type: {msg.type}")
-        #                 print(f"  Autopilot: {msg.autopilot}")
-        #                 print(f"  Base Mode: {msg.base_mode} (0b{format(msg.base_mode, '08b')})")
-        #                 print(f"  Custom Mode: {msg.custom_mode}")
-        #                 print(f"  System Status: {msg.system_status}")
-        #                 print(f"  MAVLink Version: {msg.mavlink_version}")
-                        
-        #                 # Decode base mode flags
-        #                 print(f"  Base Mode Flags:")
-        #                 print(f"    MAV_MODE_FLAG_SAFETY_ARMED: {bool(msg.base_mode & mavutil.mavlink.MAV_MODE_FLAG_SAFETY_ARMED)}")
-        #                 print(f"    MAV_MODE_FLAG_MANUAL_INPUT_ENABLED: {bool(msg.base_mode & mavutil.mavlink.MAV_MODE_FLAG_MANUAL_INPUT_ENABLED)}")
-        #                 print(f"    MAV_MODE_FLAG_HIL_ENABLED: {bool(msg.base_mode & mavutil.mavlink.MAV_MODE_FLAG_HIL_ENABLED)}")
-        #                 print(f"    MAV_MODE_FLAG_STABILIZE_ENABLED: {bool(msg.base_mode & mavutil.mavlink.MAV_MODE_FLAG_STABILIZE_ENABLED)}")
-        #                 print(f"    MAV_MODE_FLAG_GUIDED_ENABLED: {bool(msg.base_mode & mavutil.mavlink.MAV_MODE_FLAG_GUIDED_ENABLED)}")
-        #                 print(f"    MAV_MODE_FLAG_AUTO_ENABLED: {bool(msg.base_mode & mavutil.mavlink.MAV_MODE_FLAG_AUTO_ENABLED)}")
-        #                 print(f"    MAV_MODE_FLAG_TEST_ENABLED: {bool(msg.base_mode & mavutil.mavlink.MAV_MODE_FLAG_TEST_ENABLED)}")
-        #                 print(f"    MAV_MODE_FLAG_CUSTOM_MODE_ENABLED: {bool(msg.base_mode & mavutil.mavlink.MAV_MODE_FLAG_CUSTOM_MODE_ENABLED)}")
-                        
-        #                 # Armed status extraction
-        #                 new_armed = bool(msg.base_mode && mavutil.mavlink.MAV_MODE_FLAG_SAFETY_ARMED)
-        #                 arm_status1 = mavutil.mavlink.MAV_MODE_FLAG_SAFETY_ARMED
-        #                 print(f"  Extracted Armed Status: {new_armed}")
-        #                 print(f"  Extracted Armed Status1: {arm_status1}")
-        #                 print(f"  Extracted Armed Status2: {msg.base_mode}")
-
-        #                 with self._armed_lock:
-        #                     if new_armed != self.armed:
-        #                         print(f"  *** ARMED STATUS CHANGE: {self.armed} -> {new_armed} ***")
-        #                         self.armed = new_armed
-        #                     else:
-        #                         print(f"  Armed status unchanged: {self.armed}")
-                        
-        #                 print(f"  " + "="*50)
-                        
-        #         time.sleep(0.5)  # Slower polling to reduce interference with commands
-        #     except Exception as e:
-        #         print(f"Heartbeat monitoring error: {e}")
-        #         time.sleep(1.0)
-        return
+        REGISTRY.collector("ingest", self._metrics)
+        _serve_metrics(settings.metrics_port)
+
+    def _metrics(self):
+        """Per-consumer ring depth / drops and masked values (core.metrics)."""
+        subs = [("raw", name, st) for name, st in self.bus.stats().items()]
+        if self.view_bus is not self.bus:
+            subs += [("view", name, st) for name, st in self.view_bus.stats().items()]
+        for key, kind, help in (("received", "counter", "Rows offered to the subscriber"),
+                                ("dropped", "counter", "Rows lost to ring overflow"),
+                                ("pending", "gauge", "Rows waiting in the ring")):
+            name = f"lat_bus_{key}_total" if kind == "counter" else f"lat_bus_{key}_rows"
+            yield name, kind, help, [({"bus": bus, "subscriber": sub}, st[key])
+                                     for bus, sub, st in subs]
+        yield "lat_masked_values_total", "counter", "Sentinel / non-finite values masked", \
+            [({"field": f}, n) for f, n in self.validity.masked.items()]
 
     def get_armed_status(self) -> bool:
-        """Thread-safe armed status getter"""
-        with self._armed_lock:
-            return self.armed
+        """Armed flag from the latest vehicle HEARTBEAT (False without a motor link)."""
+        return self.motor.get_armed_status() if self.motor else False
 
     # ------------------ Motor API ------------------
 
@@ -132,21 +118,85 @@ class AppCoordinator:
 
     def send_pwm_pct(self, pct: int):
         if self.motor:
-            pct = max(0, min(100, pct))
-            pwm = 1000 + int(pct/100*1000)
+            pwm = pct_to_pwm(pct)
             self._pwm_cached = pwm
             self.motor.set_pwm(self._sel_motor, pwm)
+            self._record_setpoint(time.time(), self._sel_motor, pwm)
         else:
             print(f"Motor control unavailable - cannot send {pct}% throttle")
 
     def single_shot(self, pct: int, duration_ms: int):
+        """`pct` throttle for `duration_ms`, then zero; returns at once."""
         if self.motor:
-            self.send_pwm_pct(pct)
-            time.sleep(duration_ms/1000)
-            self.send_pwm_pct(0)
+            return self.run_profile(step(pct_to_pwm(pct), duration_ms/1000))
         else:
             print(f"Motor control unavailable - cannot run single shot")
 
+    # ---------------- Profiles ---------------------
+
+    def run_profile(self, profile: Profile,
+                    channel: Optional[int] = None) -> Optional[ProfileRunner]:
+        """Play `profile` on `channel` (default: selected motor), replacing any running one."""
+        if not self.motor:
+            print("Motor control unavailable - cannot run profile")
+            return None
+        self.stop_profile()
+        self.stop_sweep()
+        self._profile = ProfileRunner(profile, channel or self._sel_motor,
+                                      send=self.motor.set_pwm,
+                                      on_setpoint=self._record_setpoint)
+        self._profile.start()
+        return self._profile
+
+    def stop_profile(self):
+        runner, self._profile = self._profile, None
+        if runner:
+            runner.stop()
+
+    @property
+    def profile_running(self) -> bool:
+        return self._profile is not None and self._profile.is_alive()
+
+    # ---------------- Thrust sweep -----------------
+
+    def run_sweep(self, pwm_table, channel: Optional[int] = None,
+                  **kw) -> Optional[ThrustSweep]:
+        """
+        Arm, step `channel` through `pwm_table` waiting for steady state at
+        each step, return to rest and disarm, then write the
+        thrust/power/g-per-W table (core.sweep).
+        """
+        if not self.motor:
+            print("Motor control unavailable - cannot run sweep")
+            return None
+        self.stop_profile()
+        self.stop_sweep()
+        sub = self.view_bus.subscribe("sweep", capacity=1 << 16, policy=LATEST)
+        self._sweep = ThrustSweep(sub, channel or self._sel_motor, pwm_table,
+                                  send=self.motor.set_pwm,
+                                  on_setpoint=self._record_setpoint,
+                                  prepare=self.motor.arm,
+                                  finish=self.motor.disarm,
+                                  on_done=lambda sw: self.view_bus.unsubscribe(sw.sub),
+                                  **kw)
+        self._sweep.start()
+        return self._sweep
+
+    def stop_sweep(self):
+        sweep, self._sweep = self._sweep, None
+        if sweep:
+            sweep.stop()
+
+    @property
+    def sweep_running(self) -> bool:
+        return self._sweep is not None and self._sweep.is_alive()
+
+    def _record_setpoint(self, t_host: float, channel: int, pwm: int,
+                         late_s: float = 0.0, source: str = "manual"):
+        logger = self.logger
+        if logger is not None:
+            logger.log_setpoint(t_host, channel, pwm, late_s, source)
+
     def start_continuous(self):
         if self.motor:
             self._cont_evt.set()
@@ -158,43 +208,167 @@ class AppCoordinator:
     def stop_all(self):
         if self.motor:
             self._cont_evt.clear()
+            self.stop_profile()
+            self.stop_sweep()
+            # zero throttle first (jumps the command queue), then disarm
+            self.motor.stop_pwm(1000)
             self.motor.disarm()
-            for ch in range(1,9):
-                self.motor.set_pwm(ch, 1000)
         else:
             print("Motor control unavailable - cannot stop motors")
 
-    def _cont_loop(self):
+    def _cont_loop(self, period: float = 0.1):
+        # fixed monotonic deadlines: the resend rate does not drift
+        next_t = time.monotonic()
         while True:
-            if self._cont_evt.is_set() and self.motor:
+            if self._cont_evt.is_set() and self.motor and \
+                    not (self.profile_running or self.sweep_running):
                 self.motor.set_pwm(self._sel_motor, self._pwm_cached)
-            time.sleep(0.1)
+            next_t += period
+            delay = next_t - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            else:
+                next_t = time.monotonic()       # overran: resync, don't burst
 
     # ---------------- Telemetry API ----------------
 
     def latest_frame(self) -> Optional[MeasurementFrame]:
-        try:
-            return self._frame_q.get_nowait()
-        except queue.Empty:
+        """Newest view-bus row; a peek, so drain_frames() still sees every row."""
+        rec = self._ui_sub.peek()
+        return None if rec is None else MeasurementFrame.from_record(rec)
+
+    def stream_stats(self) -> dict:
+        """Receiver health: rates, size errors, gaps, jitter, per-consumer drops."""
+        snap = self.tele.stats.snapshot()
+        snap["subscribers"] = {**self.bus.stats(), **self.view_bus.stats()}
+        snap["masked"] = dict(self.validity.masked)
+        return snap
+
+    def clock_sync(self) -> dict:
+        """Current STM32/Pixhawk → host clock fits (offset, drift, lock)."""
+        return {"stm32":   self.tele.stm32_clock.state(),
+                "pixhawk": self.tele.pixhawk_clock.state()}
+
+    def command_stats(self) -> Optional[dict]:
+        """COMMAND_LONG → COMMAND_ACK latency and failures, if a motor is attached."""
+        return self.motor.cmd_stats.snapshot() if self.motor else None
+
+    def drain_frames(self):
+        """Every UI-bound row received since the previous call (oldest first)."""
+        return self._ui_sub.get_batch()
+
+    # ---------------- Calibration ------------------
+
+    TARE_FIELDS = ("thrust1", "thrust2", "thrust3", "thrust4", "thrust5",
+                   "thrust6", "torque", "load")
+
+    def tare(self, seconds: float = 2.0, fields=TARE_FIELDS) -> Optional[threading.Thread]:
+        """
+        Average `fields` for `seconds` (motor idle!) and fold the result into
+        their tare so they read zero; saved with the calibration file.
+        Runs on its own thread.  Refused while recording: the file's
+        calibration metadata is captured at start_logging and must keep
+        describing every row.
+        """
+        if self.logger is not None:
+            print("[CAL] Tare refused while recording – stop logging first")
             return None
 
+        def run():
+            sub = self.bus.subscribe("tare", capacity=1 << 16, policy=LATEST)
+            try:
+                means = measure_mean(sub, fields, seconds)
+            finally:
+                self.bus.unsubscribe(sub)
+            if not means:
+                print("[CAL] Tare failed: no valid samples")
+                return
+            if self.logger is not None:
+                print("[CAL] Tare discarded: recording started meanwhile")
+                return
+            self.calibration.cal = self.calibration.cal.with_tare(means)
+            self.calibration.cal.save()
+            print("[CAL] Tare: " + ", ".join(f"{k} {v:+.4g}" for k, v in means.items()))
+
+        th = threading.Thread(target=run, daemon=True)
+        th.start()
+        return th
+
+    def reload_calibration(self) -> bool:
+        """Re-read the calibration file (after editing it by hand); not while recording."""
+        if self.logger is not None:
+            print("[CAL] Reload refused while recording – stop logging first")
+            return False
+        cal = CalibrationSet.load()
+        try:                                    # same check as at pipeline build
+            CalibrationStage(cal).out_dtype(self.ingest.in_dtype)
+        except ValueError as e:
+            print(f"[CAL] Reload rejected: {e}")
+            return False
+        self.calibration.cal = cal
+        return True
+
     # ---------------- Logging API ------------------
 
-    def start_logging(self, name_prefix: str):
+    def start_logging(self, name_prefix: str, fmt: Optional[str] = None):
         if self.logger is None:
-            self.logger = DataLogger(self._frame_q, name_prefix=name_prefix)
+            # lossless: the receiver waits briefly rather than drop rows
+            self._log_sub = self.bus.subscribe("logger", capacity=1 << 16,
+                                               policy=BLOCK)
+            self.logger = DataLogger(self._log_sub, name_prefix=name_prefix,
+                                     fmt=fmt or self.settings.log_format,
+                                     meta={"calibration": self.calibration.cal.to_dict()})
             self.logger.start()
             print(f"[LOG] Started → {self.logger.file.name}")
 
     def stop_logging(self):
         if self.logger:
             self.logger.stop()
+            self.bus.unsubscribe(self._log_sub)
+            if self._log_sub.dropped:
+                print(f"[LOG] ⚠︎ {self._log_sub.dropped} frames dropped "
+                      f"of {self._log_sub.received}")
+            st = self.tele.stats.snapshot()
+            gaps = f"{st['gaps']} gaps (~{st['lost']} lost)" if st["timed"] \
+                else "gaps n/a (no STM32 timestamps)"
+            print(f"[LOG] Stream {verdict(st)}: {st['packets']} pkts, {gaps}, "
+                  f"{st['size_errors']} size errors, jitter {st['jitter_ms']:.2f} ms")
+            cs = self.command_stats()
+            if cs:
+                lat = cs["latency_ms"]
+                print(f"[LOG] Commands: {cs['sent']} sent, {cs['acked']} acked "
+                      f"(p50 {lat['p50']:.1f} ms, p95 {lat['p95']:.1f} ms, "
+                      f"max {lat['max']:.1f} ms), {cs['failed']} failed, "
+                      f"{cs['unacked']} unacked")
             self.logger = None
+            self._log_sub = None
 
     # ---------------- Cleanup ---------------------
 
     def shutdown(self):
+        self.stop_profile()
+        self.stop_sweep()
         self.stop_logging()
         self.tele.stop()
         self.stop_all()
+        if self.motor:
+            self.motor.close()
+        REGISTRY.collector("ingest", None)
         print("Coordinator shutdown complete")
+
+
+_metrics_server: Optional[MetricsServer] = None
+
+
+def _serve_metrics(port: int):
+    """Start the process-wide /metrics endpoint once (reconnects reuse it)."""
+    global _metrics_server
+    if _metrics_server is not None or not port:
+        return
+    try:
+        _metrics_server = MetricsServer(REGISTRY, "127.0.0.1", port)
+    except OSError as e:
+        print(f"Metrics endpoint unavailable on port {port}: {e}")
+        return
+    _metrics_server.start()
+    print(f"Metrics on http://127.0.0.1:{port}/metrics")
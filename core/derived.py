@@ -0,0 +1,126 @@
+"""
+Derived channels: named NumPy expressions over the record fields.
+
+Each expression is parsed, checked and compiled once; every incoming
+batch is then evaluated column-wise, and the results are appended to the
+row as regular float32 fields, so the UI, recordings and any other bus
+consumer read `batch["power"]` instead of recomputing it.
+
+Expressions may use record fields, previously defined derived channels,
+numbers, arithmetic/comparison operators and the functions in `_FUNCS`.
+`nansum(a, b, ...)` / `nanmean(a, b, ...)` combine channels element-wise
+over the finite ones only, so one disconnected load cell (masked to NaN
+on the view branch) does not blank the total; rows with no finite input
+stay NaN.
+
+    {"power": "voltage * current",
+     "g_per_w": "where(power > 0, thrust_total / power, nan)"}
+"""
+from __future__ import annotations
+import ast
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from .ingest import extend_dtype, widen
+
+__all__ = ["DerivedChannels", "DEFAULT_DERIVED"]
+
+DEFAULT_DERIVED: Dict[str, str] = {
+    "power":            "voltage * current",
+    "thrust_total":     "nansum(thrust1, thrust2, thrust3, thrust4, thrust5, thrust6)",
+    "thrust_per_motor": "nanmean(thrust1, thrust2, thrust3, thrust4, thrust5, thrust6)",
+    "g_per_w":          "where(power > 0, thrust_total / power, nan)",
+}
+
+
+
+def _nansum(*cols):
+    """Element-wise sum of the finite inputs; NaN where none is finite."""
+    a = np.stack(np.broadcast_arrays(*cols)).astype(np.float64)
+    ok = np.isfinite(a)
+    return np.where(ok.any(axis=0), np.where(ok, a, 0.0).sum(axis=0), np.nan)
+
+
+def _nanmean(*cols):
+    """Element-wise mean of the finite inputs; NaN where none is finite."""
+    a = np.stack(np.broadcast_arrays(*cols)).astype(np.float64)
+    ok = np.isfinite(a)
+    n = ok.sum(axis=0)
+    return np.where(n > 0, np.where(ok, a, 0.0).sum(axis=0) / np.maximum(n, 1), np.nan)
+
+
+_FUNCS = {name: getattr(np, name) for name in (
+    "abs", "sqrt", "exp", "log", "log10", "sin", "cos", "tan", "arctan2",
+    "hypot", "minimum", "maximum", "where", "clip", "isfinite", "sign")}
+_FUNCS.update(nansum=_nansum, nanmean=_nanmean)
+_CONSTS = {"nan": np.nan, "pi": np.pi, "inf": np.inf}
+
+_ALLOWED = (ast.Expression, ast.BinOp, ast.UnaryOp, ast.Compare, ast.Call,
+            ast.Name, ast.Load, ast.Constant, ast.operator, ast.unaryop,
+            ast.cmpop)
+
+
+def _compile(name: str, expr: str, known: set) -> Tuple[object, List[str]]:
+    """Check `expr` and return (code, record/derived names it reads)."""
+    try:
+        tree = ast.parse(expr, mode="eval")
+    except SyntaxError as e:
+        raise ValueError(f"derived {name!r}: {e.msg} in {expr!r}") from None
+    used = []
+    for node in ast.walk(tree):
+        if not isinstance(node, _ALLOWED):
+            raise ValueError(f"derived {name!r}: {type(node).__name__} "
+                             f"not allowed in {expr!r}")
+        if isinstance(node, ast.Call) and not (
+                isinstance(node.func, ast.Name) and node.func.id in _FUNCS):
+            raise ValueError(f"derived {name!r}: unknown function in {expr!r}")
+        if isinstance(node, ast.Name) and node.id not in _FUNCS \
+                and node.id not in _CONSTS:
+            if node.id not in known:
+                raise ValueError(f"derived {name!r}: unknown channel "
+                                 f"{node.id!r} in {expr!r}")
+            if node.id not in used:
+                used.append(node.id)
+    return compile(tree, f"<derived:{name}>", "eval"), used
+
+
+class DerivedChannels:
+    """
+    Ingest stage appending one float32 field per expression.  If the row
+    already has all of them (e.g. on the filtered view branch) they are
+    recomputed in place instead.
+    """
+
+    def __init__(self, exprs: Dict[str, str]):
+        self.exprs = dict(exprs)
+        self._compiled: List[Tuple[str, object, List[str]]] = []
+        self._in = self._out = None
+
+    def out_dtype(self, in_dtype: np.dtype) -> np.dtype:
+        """Compile against `in_dtype`; returns the widened row layout."""
+        present = [n for n in self.exprs if n in in_dtype.names]
+        self._in_place = bool(present) and len(present) == len(self.exprs)
+        if present and not self._in_place:
+            raise ValueError(f"derived {present[0]!r} shadows a record field")
+        known = set(in_dtype.names) - set(self.exprs)
+        self._compiled = []
+        for name, expr in self.exprs.items():
+            code, used = _compile(name, expr, known)
+            self._compiled.append((name, code, used))
+            known.add(name)
+        self._in = in_dtype
+        self._out = in_dtype if self._in_place else extend_dtype(in_dtype, list(self.exprs))
+        return self._out
+
+    @property
+    def names(self) -> List[str]:
+        return list(self.exprs)
+
+    def __call__(self, batch: np.ndarray) -> np.ndarray:
+        out = batch if self._in_place else widen(batch, self._out)
+        env = {"__builtins__": {}, **_FUNCS, **_CONSTS}
+        with np.errstate(all="ignore"):
+            for name, code, used in self._compiled:
+                out[name] = eval(code, env, {n: out[n] for n in used})
+        return out
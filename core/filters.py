@@ -0,0 +1,213 @@
+"""
+Validity masking and smoothing for the live view.
+
+These stages run on the *view* branch of the IngestPipeline: recordings
+keep the raw values, while the UI and controllers see sentinel-free,
+optionally filtered channels.  Everything works on whole batches with
+NumPy; filter state is carried across batches so results do not depend
+on how datagrams were grouped.
+
+Filter specs (Settings.filters), per channel:
+    {"type": "ema",     "alpha": 0.1}
+    {"type": "lowpass", "cutoff_hz": 20, "order": 2}   # cascaded 1st order
+    {"type": "median",  "size": 5}
+"""
+from __future__ import annotations
+import math, warnings
+from collections import Counter
+from typing import Dict, Iterable, Optional, Sequence
+
+import numpy as np
+
+__all__ = ["ValidityMask", "ChannelFilters", "SENTINELS"]
+
+# values the STM32 firmware sends for "no reading" (load cell: 2^31)
+SENTINELS = (2147483648.0,)
+
+_BLOCK = 64          # samples per matrix step of the IIR recurrence
+
+
+class ValidityMask:
+    """Replace sentinel and non-finite values with NaN, counting them."""
+
+    def __init__(self, fields: Iterable[str],
+                 sentinels: Sequence[float] = SENTINELS,
+                 limits: Optional[Dict[str, Sequence[float]]] = None):
+        self.fields = list(fields)
+        self.sentinels = np.asarray(sentinels, dtype=np.float32)
+        self.limits = {k: (float(lo), float(hi)) for k, (lo, hi) in (limits or {}).items()}
+        self.masked: Counter = Counter()
+        self._block: Optional[tuple] = None     # (byte offset, width)
+
+    def out_dtype(self, in_dtype: np.dtype) -> np.dtype:
+        missing = [f for f in self.fields if f not in in_dtype.names]
+        if missing:
+            raise ValueError(f"ValidityMask: unknown fields {missing}")
+        # adjacent float32 fields (the raw frame) are checked as one 2-D block
+        spec = [in_dtype.fields[f] for f in self.fields]
+        off = spec[0][1] if spec else 0
+        if spec and all(dt == np.dtype("<f4") and o == off + 4 * i
+                        for i, (dt, o, *_) in enumerate(spec)):
+            self._block = (off, len(spec))
+        return in_dtype
+
+    def _bad(self, a: np.ndarray) -> np.ndarray:
+        bad = ~np.isfinite(a)
+        for s in self.sentinels:
+            bad |= a == s
+        return bad
+
+    def __call__(self, batch: np.ndarray) -> np.ndarray:
+        if self._block and batch.flags.c_contiguous:
+            off, k = self._block
+            a = np.ndarray((len(batch), k), dtype="<f4", buffer=batch,
+                           offset=off, strides=(batch.dtype.itemsize, 4))
+            bad = self._bad(a)
+            counts = bad.sum(axis=0)
+            if counts.any():
+                a[bad] = np.nan
+                for name, c in zip(self.fields, counts.tolist()):
+                    if c:
+                        self.masked[name] += c
+            fields = list(self.limits)
+        else:
+            fields = self.fields
+        for name in fields:
+            col = batch[name]
+            bad = self._bad(col)
+            if name in self.limits:
+                lo, hi = self.limits[name]
+                with np.errstate(invalid="ignore"):
+                    bad |= (col < lo) | (col > hi)
+                bad &= ~np.isnan(col)           # already masked/counted
+            k = int(np.count_nonzero(bad))
+            if k:
+                col[bad] = np.nan
+                self.masked[name] += k
+        return batch
+
+
+class _Recursive:
+    """y[n] = b·y[n-1] + (1-b)·x[n], vectorised in blocks; NaN-tolerant."""
+
+    def __init__(self, b: float):
+        self.b = float(b)
+        k = np.arange(_BLOCK)
+        e = k[:, None] - k[None, :]
+        self._T = np.where(e >= 0, self.b ** np.maximum(e, 0), 0.0) * (1 - self.b)
+        self._pow = self.b ** (k + 1)
+        self.y: Optional[float] = None          # last output
+        self.x: Optional[float] = None          # last valid input
+
+    def __call__(self, x: np.ndarray) -> np.ndarray:
+        x = x.astype(np.float64)
+        bad = np.isnan(x)
+        if bad.any():
+            # hold the last valid input through gaps, report NaN there
+            idx = np.where(bad, -1, np.arange(len(x)))
+            np.maximum.accumulate(idx, out=idx)
+            lead = idx < 0
+            if lead.all() and self.x is None:
+                return x                        # nothing valid seen yet
+            fill = self.x if self.x is not None else x[idx[~lead][0]]
+            x = np.where(lead, fill, x[np.maximum(idx, 0)])
+        if self.y is None:
+            self.y = float(x[0])
+        out = np.empty_like(x)
+        for i in range(0, len(x), _BLOCK):
+            blk = x[i:i + _BLOCK]
+            n = len(blk)
+            out[i:i + n] = self._T[:n, :n] @ blk + self._pow[:n] * self.y
+            self.y = float(out[i + n - 1])
+        self.x = float(x[-1])
+        out[bad] = np.nan
+        return out
+
+
+class _Cascade:
+    def __init__(self, stages):
+        self.stages = stages
+
+    def __call__(self, x):
+        for st in self.stages:
+            x = st(x)
+        return x
+
+
+class _Median:
+    """Running median over `size` samples, carrying the tail across batches."""
+
+    def __init__(self, size: int):
+        self.size = max(1, int(size))
+        self._tail = np.full(self.size - 1, np.nan)
+
+    def __call__(self, x: np.ndarray) -> np.ndarray:
+        if self.size == 1:
+            return x
+        buf = np.concatenate((self._tail, x.astype(np.float64)))
+        self._tail = buf[-(self.size - 1):]
+        win = np.lib.stride_tricks.sliding_window_view(buf, self.size)
+        out = np.sort(win, axis=1)[:, self.size // 2]
+        holed = np.isnan(win).any(axis=1)       # NaN sorts last: redo those
+        if holed.any():
+            with warnings.catch_warnings():
+                warnings.simplefilter("ignore", RuntimeWarning)   # all-NaN windows
+                out[holed] = np.nanmedian(win[holed], axis=1)
+        out[np.isnan(x)] = np.nan
+        return out
+
+
+def _build(spec: dict, fs: float):
+    kind = spec.get("type")
+    if kind == "ema":
+        return _Recursive(1.0 - float(spec["alpha"]))
+    if kind == "lowpass":
+        b = math.exp(-2 * math.pi * float(spec["cutoff_hz"]) / fs)
+        return _Cascade([_Recursive(b) for _ in range(int(spec.get("order", 1)))])
+    if kind == "median":
+        return _Median(spec.get("size", 5))
+    raise ValueError(f"Unknown filter type {kind!r} (ema, lowpass, median)")
+
+
+class ChannelFilters:
+    """
+    Per-channel filters applied in place.  Low-pass cutoffs need the
+    sample rate: give `fs`, or it is estimated from the first batch's
+    aligned STM32 times (host receive times if those are not available).
+    """
+
+    def __init__(self, specs: Dict[str, dict], fs: Optional[float] = None):
+        self.specs = {k: dict(v) for k, v in specs.items()}
+        self.fs = fs
+        self._filters: Dict[str, object] = {}
+
+    def out_dtype(self, in_dtype: np.dtype) -> np.dtype:
+        missing = [f for f in self.specs if f not in in_dtype.names]
+        if missing:
+            raise ValueError(f"ChannelFilters: unknown fields {missing}")
+        for spec in self.specs.values():
+            _build(spec, self.fs or 1000.0)     # validate now, build later
+        return in_dtype
+
+    def _estimate_fs(self, t: np.ndarray) -> Optional[float]:
+        d = np.diff(t)
+        d = d[d > 0]
+        return 1.0 / float(np.median(d)) if len(d) else None
+
+    def reset(self):
+        self._filters = {}
+
+    def __call__(self, batch: np.ndarray) -> np.ndarray:
+        if not self.specs:
+            return batch
+        if not self._filters:
+            if self.fs is None:
+                t = batch["t_stm32_host"] if "t_stm32_host" in batch.dtype.names \
+                    else batch["t_host"]
+                self.fs = self._estimate_fs(t) or self._estimate_fs(batch["t_host"])
+                if self.fs is None:
+                    return batch                # wait for a usable batch
+            self._filters = {k: _build(s, self.fs) for k, s in self.specs.items()}
+        for name, f in self._filters.items():
+            batch[name] = f(batch[name])
+        return batch
@@ -0,0 +1,81 @@
+"""
+Batch processing between the receiver and the frame bus.
+
+The receiver hands each decoded batch to `IngestPipeline.publish()`,
+which runs it through a list of stages and publishes the result.  A stage
+is any object with
+
+    out_dtype(in_dtype) -> dtype     called once, at pipeline build time
+    __call__(batch)     -> batch     called per batch, vectorised
+
+Stages may widen the row (derived channels) or rewrite values in place.
+
+An optional *view* branch takes a copy of every published batch through
+further stages (validity masking, filters) into a second bus, so the
+recording keeps raw values while the UI and controllers read clean ones.
+"""
+from __future__ import annotations
+from typing import List, Optional, Sequence
+
+import numpy as np
+
+from .bus import FrameBus
+from .measurement import RECORD_DTYPE
+
+__all__ = ["IngestPipeline", "extend_dtype", "widen"]
+
+
+def extend_dtype(base: np.dtype, names: Sequence[str], fmt: str = "<f4") -> np.dtype:
+    """`base` followed by new `names`; base fields keep their offsets."""
+    return np.dtype(base.descr + [(n, fmt) for n in names])
+
+
+def widen(batch: np.ndarray, dtype: np.dtype) -> np.ndarray:
+    """Copy `batch` into the leading bytes of rows of the wider `dtype`."""
+    n, width = len(batch), batch.dtype.itemsize
+    out = np.empty(n, dtype=dtype)
+    out.view(np.uint8).reshape(n, dtype.itemsize)[:, :width] = \
+        np.ascontiguousarray(batch).view(np.uint8).reshape(n, width)
+    return out
+
+
+class IngestPipeline:
+    """
+    Stages applied to every received batch, then a FrameBus of the
+    resulting row type.  Pass it to TelemetryReceiver in place of a bus.
+
+    `bus` carries the raw (recorded) rows; `view_bus` carries the rows
+    after `view_stages`, or is the same bus when there are none.  View
+    stages must keep the row type.
+    """
+
+    def __init__(self, stages: Sequence = (), in_dtype: np.dtype = RECORD_DTYPE,
+                 bus: Optional[FrameBus] = None, view_stages: Sequence = ()):
+        self.stages: List = list(stages)
+        self.view_stages: List = list(view_stages)
+        dtype = np.dtype(in_dtype)
+        for st in self.stages:
+            dtype = st.out_dtype(dtype)
+        for st in self.view_stages:
+            if st.out_dtype(dtype) != dtype:
+                raise ValueError(f"view stage {type(st).__name__} changes the row type")
+        self.in_dtype, self.dtype = np.dtype(in_dtype), dtype
+        self.bus = bus or FrameBus(dtype)
+        if self.bus.dtype != dtype:
+            raise ValueError("bus row type does not match the pipeline output")
+        self.view_bus = FrameBus(dtype) if self.view_stages else self.bus
+
+    @staticmethod
+    def _run(stages, batch: np.ndarray) -> np.ndarray:
+        for st in stages:
+            batch = st(batch)
+        return batch
+
+    def process(self, batch: np.ndarray) -> np.ndarray:
+        return self._run(self.stages, batch)
+
+    def publish(self, batch: np.ndarray):
+        batch = self.process(batch)
+        self.bus.publish(batch)
+        if self.view_stages:
+            self.view_bus.publish(self._run(self.view_stages, batch.copy()))
@@ -1,41 +1,114 @@
 # logger.py
 from __future__ import annotations
-import csv, time, datetime, pathlib, threading, queue
-from .measurement import MeasurementFrame
+import csv, datetime, json, pathlib, threading, time
+from typing import Optional
+from .bus import Subscription
+from .recording import RecordingWriter, CsvWriter
 from .logging_utils import log  # You already have this helper to log with timestamps
+from .metrics import REGISTRY
+
+_M_WRITE = REGISTRY.histogram("lat_logger_write_seconds", "Time to write one batch to the log file")
+_M_ROWS = REGISTRY.counter("lat_logger_rows_total", "Rows written to log files")
 
 class DataLogger(threading.Thread):
     """
-    CSV logger: start on demand, stop on demand.
-    Filename = <name_prefix>_<YYYYMMDD_HHMMSS>.csv
+    CSV / binary logger: start on demand, stop on demand.
+    Filename = <name_prefix>_<YYYYMMDD_HHMMSS>.csv  (or .bin)
+
+    Drains a FrameBus subscription batch by batch; after `stop()` the
+    rows still pending are written before the file is closed.
+    fmt="bin" appends fixed-size binary records (see core.recording), which
+    `python -m core.recording` turns back into CSV.
+
+    `meta` (e.g. the calibration in force) goes into the binary header,
+    or into a `<file>.meta.json` sidecar for CSV logs.
+
+    Commanded setpoints go to a sidecar `<file>.setpoints.csv` on the same
+    wall clock as `t_host`, so analysis can line them up with the frames.
     """
     def __init__(self,
-                 in_q: "queue.Queue[MeasurementFrame]",
+                 sub: Subscription,
                  name_prefix: str,
-                 folder: str | pathlib.Path = "logs"):
+                 folder: str | pathlib.Path = "logs",
+                 fmt: str = "csv",
+                 flush_interval: float = 1.0,
+                 fsync_interval: float = 10.0,
+                 meta: Optional[dict] = None):
         super().__init__(daemon=True)
-        self.q = in_q
+        if fmt not in ("csv", "bin"):
+            raise ValueError(f"Unknown log format {fmt!r}")
+        self.sub = sub
+        self.fmt = fmt
+        self.meta = dict(meta or {})
+        self.flush_interval = flush_interval
+        self.fsync_interval = fsync_interval
         self.stop_evt = threading.Event()
         self.folder = pathlib.Path(folder)
         self.folder.mkdir(exist_ok=True)
         ts = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
         safe = "".join(c for c in name_prefix if c.isalnum() or c in "-_")
-        self.file = self.folder / f"{safe}_{ts}.csv"
+        self.prefix = safe
+        self.file = self.folder / f"{safe}_{ts}.{fmt}"
+        self.setpoint_file = self.file.with_suffix(".setpoints.csv")
+        self._sp_lock = threading.Lock()
+        self._sp = None                         # (file, csv.writer) once used
+
+    def _open(self):
+        if self.fmt == "bin":
+            return RecordingWriter(self.file, self.sub.dtype,
+                                   meta={"name": self.prefix, **self.meta},
+                                   flush_interval=self.flush_interval,
+                                   fsync_interval=self.fsync_interval)
+        if self.meta:
+            self.file.with_suffix(".meta.json").write_text(
+                json.dumps({"name": self.prefix, **self.meta}, indent=2))
+        return CsvWriter(self.file, self.sub.dtype,
+                         flush_interval=self.flush_interval,
+                         fsync_interval=self.fsync_interval)
 
     def run(self):
-        with self.file.open("w", newline="") as f:
-            writer = csv.writer(f)
-            writer.writerow(["ts_wall"] +
-                            list(MeasurementFrame.__dataclass_fields__.keys()))
+        REGISTRY.collector("logger", self._metrics)
+        with self._open() as out:
             while not self.stop_evt.is_set():
-                try:
-                    frame: MeasurementFrame = self.q.get(timeout=0.5)
-                    writer.writerow([time.time(), *frame.to_tuple()])
-                except queue.Empty:
-                    continue
+                self._write(out, self.sub.get_batch(timeout=0.5))
+            self._write(out, self.sub.get_batch())   # final drain
+        REGISTRY.collector("logger", None)
+
+    @staticmethod
+    def _write(out, batch):
+        t0 = time.perf_counter()
+        out.write(batch)                        # empty ones still drive flush/fsync
+        if len(batch):
+            _M_WRITE.observe(time.perf_counter() - t0)
+            _M_ROWS.inc(len(batch))
+
+    def _metrics(self):
+        yield "lat_logger_backlog_rows", "gauge", "Rows waiting to be written", \
+            [({}, self.sub.pending)]
+        yield "lat_logger_dropped_rows_total", "counter", \
+            "Rows lost because the logger fell behind", [({}, self.sub.dropped)]
+
+    def log_setpoint(self, t_host: float, channel: int, pwm: int,
+                     late_s: float = 0.0, source: str = "manual"):
+        """Append one commanded setpoint (any thread)."""
+        with self._sp_lock:
+            if self.stop_evt.is_set():
+                return
+            if self._sp is None:
+                f = self.setpoint_file.open("w", newline="")
+                w = csv.writer(f)
+                w.writerow(["ts_wall", "channel", "pwm_us", "late_ms", "source"])
+                self._sp = (f, w)
+            self._sp[1].writerow([f"{t_host:.6f}", channel, pwm,
+                                  f"{late_s * 1e3:.3f}", source])
 
     def stop(self):
         """Stop the logger and save the file."""
-        self.stop_evt.set()
+        with self._sp_lock:
+            self.stop_evt.set()
+            if self._sp is not None:
+                self._sp[0].close()
         self.join()
         log(f"[LOG] Saved → {self.file.resolve()}")
+        if self._sp is not None:
+            log(f"[LOG] Setpoints → {self.setpoint_file.resolve()}")
@@ -0,0 +1,139 @@
+from __future__ import annotations
+import threading, time
+from collections import defaultdict
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Optional
+
+from .logging_utils import log
+
+__all__ = ["MavRouter"]
+
+
+class _Waiter:
+    __slots__ = ("msg_type", "predicate", "future", "deadline")
+
+    def __init__(self, msg_type, predicate, future, deadline):
+        self.msg_type  = msg_type
+        self.predicate = predicate
+        self.future    = future
+        self.deadline  = deadline
+
+
+class MavRouter(threading.Thread):
+    """
+    The only reader of a MAVLink connection.
+
+    Drains the link as fast as messages arrive and routes each one by
+    type to subscriber callbacks and to pending `expect()` futures, so
+    no caller ever competes for `recv_match`.  Writes go through `send()`
+    which serialises access to the shared `master.mav` encoder.
+    """
+
+    def __init__(self, master, poll: float = 0.05):
+        super().__init__(daemon=True)
+        self.master = master
+        self.poll = poll
+        self._subs: Dict[str, List[Callable[[Any], None]]] = defaultdict(list)
+        self._waiters: List[_Waiter] = []
+        self._lock = threading.Lock()
+        self._send_lock = threading.Lock()
+        self._halt = threading.Event()
+        self.latest: Dict[str, Any] = {}        # newest message per type
+        self.counts: Dict[str, int] = defaultdict(int)
+
+    # ── subscriptions ──────────────────────────────────────────────
+    def subscribe(self, msg_type: str, callback: Callable[[Any], None]):
+        """Call `callback(msg)` on the reader thread for every `msg_type`."""
+        with self._lock:
+            self._subs[msg_type] = self._subs[msg_type] + [callback]
+
+    def unsubscribe(self, msg_type: str, callback: Callable[[Any], None]):
+        with self._lock:
+            self._subs[msg_type] = [c for c in self._subs[msg_type]
+                                    if c is not callback]
+
+    def expect(self, msg_type: str,
+               predicate: Optional[Callable[[Any], bool]] = None,
+               timeout: float = 5.0) -> Future:
+        """
+        Future resolved with the first `msg_type` message matching
+        `predicate`; fails with TimeoutError after `timeout` seconds.
+        Register it *before* sending the request it answers.
+        """
+        fut: Future = Future()
+        w = _Waiter(msg_type, predicate, fut, time.monotonic() + timeout)
+        with self._lock:
+            self._waiters.append(w)
+        return fut
+
+    # ── writing ────────────────────────────────────────────────────
+    def send(self, fn: Callable[[Any], None]):
+        """Run `fn(master.mav)` under the write lock."""
+        with self._send_lock:
+            fn(self.master.mav)
+
+    # ── reader loop ────────────────────────────────────────────────
+    def run(self):
+        while not self._halt.is_set():
+            try:
+                msg = self.master.recv_match(blocking=True, timeout=self.poll)
+            except Exception as e:
+                log(f"MAVLink read error: {e}")
+                time.sleep(0.5)
+                continue
+            if msg is not None:
+                self._dispatch(msg)
+            self._expire()
+
+    def _dispatch(self, msg):
+        t = msg.get_type()
+        if t == "BAD_DATA":
+            return
+        self.latest[t] = msg
+        self.counts[t] += 1
+        for cb in self._subs.get(t, ()):
+            try:
+                cb(msg)
+            except Exception as e:
+                log(f"MAVLink {t} handler error: {e}")
+        if not self._waiters:
+            return
+        with self._lock:
+            waiters = [w for w in self._waiters if w.msg_type == t]
+        for w in waiters:
+            try:
+                hit = w.predicate is None or w.predicate(msg)
+            except Exception:
+                hit = False
+            if hit:
+                self._resolve(w, result=msg)
+
+    def _resolve(self, w: _Waiter, result=None, exc: Optional[BaseException] = None):
+        with self._lock:
+            if w not in self._waiters:
+                return
+            self._waiters.remove(w)
+        if not w.future.set_running_or_notify_cancel():
+            return                              # caller gave up
+        if exc is None:
+            w.future.set_result(result)
+        else:
+            w.future.set_exception(exc)
+
+    def _expire(self):
+        if not self._waiters:
+            return
+        now = time.monotonic()
+        with self._lock:
+            # cancelled futures are dropped silently
+            self._waiters = [w for w in self._waiters if not w.future.cancelled()]
+            late = [w for w in self._waiters if w.deadline <= now]
+        for w in late:
+            self._resolve(w, exc=TimeoutError(f"no {w.msg_type} reply"))
+
+    def stop(self):
+        self._halt.set()
+        with self._lock:
+            pending, self._waiters = self._waiters, []
+        for w in pending:
+            w.future.cancel()
@@ -1,9 +1,12 @@
 from __future__ import annotations
-from dataclasses import dataclass
+from dataclasses import dataclass, fields
 import struct
 from typing import ClassVar, Tuple, List
 
-__all__ = ["MeasurementFrame"]
+import numpy as np
+
+__all__ = ["MeasurementFrame", "FRAME_SIZE", "FIELD_NAMES", "FRAME_DTYPE",
+           "RECORD_DTYPE", "decode_batch", "decode_records"]
 
 @dataclass(frozen=True, slots=True)
 class MeasurementFrame:
@@ -32,17 +35,60 @@ class MeasurementFrame:
 
     @classmethod
     def from_bytes(cls, payload: bytes) -> "MeasurementFrame":
-        exp = struct.calcsize(cls._FORMAT)
-        if len(payload) != exp:
-            raise ValueError(f"Need {exp} B, got {len(payload)} B")
-        return cls(*struct.unpack(cls._FORMAT, payload))
+        if len(payload) != FRAME_SIZE:
+            raise ValueError(f"Need {FRAME_SIZE} B, got {len(payload)} B")
+        return cls(*_STRUCT.unpack(payload))
+
+    @classmethod
+    def from_record(cls, rec) -> "MeasurementFrame":
+        """Build a frame from one row of a FRAME_DTYPE array."""
+        return cls(*(float(rec[n]) for n in FIELD_NAMES))
 
     def to_bytes(self) -> bytes:
-        return struct.pack(self._FORMAT, *self.to_tuple())
+        return _STRUCT.pack(*self.to_tuple())
 
     # helpers
     def to_tuple(self) -> Tuple[float, ...]:
-        return tuple(getattr(self, f.name) for f in self.__dataclass_fields__.values())
+        return tuple(getattr(self, n) for n in FIELD_NAMES)
 
     def to_csv_row(self) -> List[str]:
         return [f"{v:.6f}" for v in self.to_tuple()]
+
+
+# ─── Wire layout shared by the receiver, logger and readers ─────────────
+_STRUCT = struct.Struct(MeasurementFrame._FORMAT)
+FRAME_SIZE = _STRUCT.size                                   # 56 bytes
+FIELD_NAMES: Tuple[str, ...] = tuple(f.name for f in fields(MeasurementFrame))
+FRAME_DTYPE = np.dtype([(n, "<f4") for n in FIELD_NAMES])   # same 56 B row
+
+
+def decode_batch(buf, count: int) -> np.ndarray:
+    """
+    Decode `count` back-to-back 56-byte datagrams from `buf` in one step.
+    Returns an owned FRAME_DTYPE array (the source buffer may be reused).
+    """
+    return np.frombuffer(buf, dtype=FRAME_DTYPE, count=count).copy()
+
+
+# Bus / recording row: kernel/host receive time, the STM32 and Pixhawk
+# stamps mapped onto host time (core.clock_sync), then the raw 56-byte frame
+RECORD_DTYPE = np.dtype([("t_host", "<f8"), ("t_stm32_host", "<f8"),
+                         ("t_pixhawk_host", "<f8")] + FRAME_DTYPE.descr)  # 80 B
+_RECORD_RAW  = np.dtype({"names":    ["t_host", "raw"],
+                         "formats":  ["<f8", f"V{FRAME_SIZE}"],
+                         "offsets":  [0, RECORD_DTYPE.fields["stm32_timestamp"][1]],
+                         "itemsize": RECORD_DTYPE.itemsize})
+
+
+def decode_records(buf, stamps: np.ndarray, count: int) -> np.ndarray:
+    """
+    Like decode_batch, but prefixes each frame with its host receive time
+    (`stamps[:count]`, seconds since the epoch) as RECORD_DTYPE rows.
+    The aligned-time columns are left NaN for the receiver to fill.
+    """
+    out = np.empty(count, dtype=RECORD_DTYPE)
+    raw = out.view(_RECORD_RAW)
+    raw["t_host"] = stamps[:count]
+    raw["raw"] = np.frombuffer(buf, dtype=f"V{FRAME_SIZE}", count=count)
+    out["t_stm32_host"] = out["t_pixhawk_host"] = np.nan
+    return out
@@ -0,0 +1,241 @@
+"""
+Process-wide metrics: counters, gauges and histograms, readable as
+Prometheus text over HTTP and by the in-app stats window.
+
+Hot paths update plain attributes (one writer per metric, no locks): a
+counter increment or a histogram observation costs about a microsecond.
+State that a component already keeps (StreamStats, bus rings, the PWM
+queue, the command tracker) is not duplicated; it is read at scrape time
+by a *collector*, a function registered under a key that yields
+
+    (name, kind, help, [(labels, value), ...])      kind: "counter" | "gauge"
+    (name, "histogram", help, [(labels, (upper_bounds, counts, sum))])
+
+Registering a collector again under the same key replaces it, so a
+reconnect does not leave stale series behind.
+
+    from core.metrics import REGISTRY, MetricsServer
+    rx_batch = REGISTRY.histogram("lat_telemetry_batch_rows", "...", buckets=(1, 4, 16))
+    rx_batch.observe(n)
+    MetricsServer(REGISTRY, port=9108).start()     # GET /metrics
+"""
+from __future__ import annotations
+import bisect, math, threading, time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+__all__ = ["Counter", "Gauge", "Histogram", "Registry", "MetricsServer",
+           "REGISTRY", "TIME_BUCKETS"]
+
+# seconds, for per-batch / per-tick / per-write durations
+TIME_BUCKETS = (5e-5, 1e-4, 2.5e-4, 5e-4, 1e-3, 2.5e-3, 5e-3, 0.01, 0.025,
+                0.05, 0.1, 0.25, 1.0)
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name: str, help: str):
+        self.name, self.help = name, help
+        self.value = 0.0
+
+    def inc(self, n: float = 1.0):
+        self.value += n
+
+    def samples(self):
+        return [({}, self.value)]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, v: float):
+        self.value = v
+
+
+class Histogram:
+    """Fixed upper bounds; the last bucket is +Inf."""
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, buckets: Sequence[float] = TIME_BUCKETS):
+        self.name, self.help = name, help
+        self.bounds = tuple(float(b) for b in buckets)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.sum = 0.0
+
+    def observe(self, v: float):
+        self.counts[bisect.bisect_left(self.bounds, v)] += 1
+        self.sum += v
+
+    def observe_many(self, values: np.ndarray):
+        """Vectorised observe() for a whole batch."""
+        if len(values):
+            idx = np.searchsorted(self.bounds, values, side="left")
+            for i, c in enumerate(np.bincount(idx, minlength=len(self.counts)).tolist()):
+                self.counts[i] += c
+            self.sum += float(np.sum(values))
+
+    def time(self):
+        return _Timer(self)
+
+    def samples(self):
+        return [({}, (self.bounds, list(self.counts), self.sum))]
+
+
+class _Timer:
+    __slots__ = ("h", "t")
+
+    def __init__(self, h: Histogram):
+        self.h = h
+
+    def __enter__(self):
+        self.t = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.h.observe(time.perf_counter() - self.t)
+
+
+Family = Tuple[str, str, str, List[Tuple[Dict[str, str], object]]]
+
+
+class Registry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._metrics: Dict[str, object] = {}
+        self._collectors: Dict[str, Callable[[], Iterable[Family]]] = {}
+
+    def _get(self, cls, name: str, help: str, *args):
+        with self._lock:
+            m = self._metrics.get(name)
+            if m is None:
+                m = self._metrics[name] = cls(name, help, *args)
+            elif type(m) is not cls:
+                raise ValueError(f"metric {name!r} already registered as {m.kind}")
+            return m
+
+    def counter(self, name: str, help: str) -> Counter:
+        return self._get(Counter, name, help)
+
+    def gauge(self, name: str, help: str) -> Gauge:
+        return self._get(Gauge, name, help)
+
+    def histogram(self, name: str, help: str,
+                  buckets: Sequence[float] = TIME_BUCKETS) -> Histogram:
+        return self._get(Histogram, name, help, buckets)
+
+    def collector(self, key: str, fn: Optional[Callable[[], Iterable[Family]]]):
+        """Register (or with fn=None remove) a scrape-time collector."""
+        with self._lock:
+            if fn is None:
+                self._collectors.pop(key, None)
+            else:
+                self._collectors[key] = fn
+
+    def families(self) -> List[Family]:
+        with self._lock:
+            metrics = list(self._metrics.values())
+            collectors = list(self._collectors.items())
+        out: List[Family] = [(m.name, m.kind, m.help, m.samples()) for m in metrics]
+        for key, fn in collectors:
+            try:
+                out.extend(fn())
+            except Exception:                   # never break a scrape
+                out.append(("lat_metrics_collector_errors", "gauge",
+                            "Collector raised during the last scrape",
+                            [({"collector": key}, 1.0)]))
+        return out
+
+    def render(self) -> str:
+        """Prometheus text exposition format (version 0.0.4)."""
+        lines: List[str] = []
+        seen = set()
+        for name, kind, help, samples in self.families():
+            if name not in seen:
+                seen.add(name)
+                lines.append(f"# HELP {name} {help}")
+                lines.append(f"# TYPE {name} {kind}")
+            for labels, value in samples:
+                if kind == "histogram":
+                    bounds, counts, total = value
+                    cum = 0
+                    for b, c in zip(list(bounds) + [math.inf], counts):
+                        cum += c
+                        le = "+Inf" if b == math.inf else f"{b:g}"
+                        lines.append(f"{name}_bucket{_labels({**labels, 'le': le})} {cum}")
+                    lines.append(f"{name}_sum{_labels(labels)} {_num(total)}")
+                    lines.append(f"{name}_count{_labels(labels)} {cum}")
+                else:
+                    lines.append(f"{name}{_labels(labels)} {_num(value)}")
+        return "\n".join(lines) + "\n"
+
+    def snapshot(self) -> List[Tuple[str, str]]:
+        """(series, value text) pairs for display; histograms as count / mean."""
+        out = []
+        for name, kind, _, samples in self.families():
+            for labels, value in samples:
+                if kind == "histogram":
+                    _, counts, total = value
+                    n = sum(counts)
+                    text = f"n={n}" + (f"  mean={total / n:.4g}" if n else "")
+                else:
+                    text = _num(value)
+                out.append((f"{name}{_labels(labels)}", text))
+        return out
+
+
+def _labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    esc = lambda v: str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+    inner = ",".join(f'{k}="{esc(v)}"' for k, v in labels.items())
+    return "{" + inner + "}"
+
+
+def _num(v) -> str:
+    v = float(v)
+    if math.isnan(v):
+        return "NaN"
+    if math.isinf(v):
+        return "+Inf" if v > 0 else "-Inf"
+    return f"{v:.17g}" if v != int(v) else str(int(v))
+
+
+REGISTRY = Registry()
+
+
+class MetricsServer(threading.Thread):
+    """GET /metrics on a local port, served from a daemon thread."""
+
+    def __init__(self, registry: Registry = REGISTRY,
+                 host: str = "127.0.0.1", port: int = 9108):
+        super().__init__(daemon=True)
+        reg = registry
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] not in ("/metrics", "/"):
+                    self.send_error(404)
+                    return
+                body = reg.render().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):     # no per-scrape console spam
+                pass
+
+        self.httpd = ThreadingHTTPServer((host, port), Handler)
+        self.httpd.daemon_threads = True
+        self.address = self.httpd.server_address
+
+    def run(self):
+        self.httpd.serve_forever(poll_interval=0.5)
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
@@ -1,6 +1,7 @@
 from __future__ import annotations
 import sys, time, threading, datetime as dt
-from typing import List
+from typing import Dict, List, Set
+from concurrent.futures import Future
 import os,sys
 
 import core.shared_state as globals
@@ -12,19 +13,34 @@ import core.shared_state as globals
 
 # Now import the shared_state module
 # import shared_state as globals
-from core.shared_state import armed_status
+from core.mav_router import MavRouter
+from core.command_pipeline import PwmPipeline
+from core.command_stats import CommandTracker, LATENCY_EDGES_MS
+from core.metrics import REGISTRY
 
 
-try:
-    from pymavlink import mavutil
-except ImportError:
-    mavutil = None
+# pymavlink is slow to import (it pulls in its whole dialect and numpy);
+# it is loaded on first use, i.e. when a port is actually opened.
+mavutil = None
+
+
+def _mav():
+    """pymavlink.mavutil, imported on first call."""
+    global mavutil
+    if mavutil is None:
+        try:
+            from pymavlink import mavutil as m
+        except ImportError:
+            raise RuntimeError("Please `pip install pymavlink`") from None
+        mavutil = m
+    return mavutil
 
 # ─── Logging helper (from testingpix.py) ────────────────────────────────
 def log(txt: str):
     print(f"[{dt.datetime.now().strftime('%H:%M:%S')}] {txt}")
 
 # ─── MAVLink helpers (verbatim) ─────────────────────────────────────────
+# These read the link directly: only use them while no MavRouter owns it.
 def wait_heartbeat(master, timeout=10):
     log("🔌 Connecting…")
     t0 = time.time()
@@ -35,137 +51,79 @@ def wait_heartbeat(master, timeout=10):
             return
     sys.exit("❌ No heartbeat – check port/baud")
 
-def wait_param_echo(master, name, target, timeout=3):
-    t_end = time.time() + timeout
-    while time.time() < t_end:
-        m = master.recv_match(type="PARAM_VALUE", blocking=True, timeout=1)
-        if not m: continue
-        pid = (m.param_id.decode() 
-               if isinstance(m.param_id, bytes) 
-               else m.param_id)
-        pid = pid.rstrip("\x00")
-        if pid == name and abs(float(m.param_value) - target) < 1e-3:
-            return True
-    return False
-
-def set_param(master, name, value, retries=3):
-    """
-    Send param_set, then if no echo do param_request_read_send + recv_match.
-    """
-    for r in range(1, retries+1):
-        master.mav.param_set_send(master.target_system,
-                                  master.target_component,
-                                  name.encode(),
-                                  float(value),
-                                  mavutil.mavlink.MAV_PARAM_TYPE_REAL32)
-        if wait_param_echo(master, name, float(value)):
-            log(f"🔧 {name} → {value}")
-            return True
-
-        # fallback: request and read
-        master.mav.param_request_read_send(master.target_system,
-                                           master.target_component,
-                                           name.encode(), -1)
-        rep = master.recv_match(type="PARAM_VALUE", blocking=True, timeout=2)
-        if rep:
-            pid = (rep.param_id.decode() 
-                   if isinstance(rep.param_id, bytes) 
-                   else rep.param_id)
-            pid = pid.rstrip("\x00")
-            if pid == name and abs(float(rep.param_value) - float(value)) < 1e-3:
-                log(f"🆗 {name} already {value} (echo skipped)")
-                return True
-
-        log(f"⚠︎ {name} not updated, retry {r}/{retries}")
-    log(f"🚫 skipping {name} (no echo)")
-    return False
-
-def change_mode(master, mode, timeout=5):
-    mode_id = master.mode_mapping()[mode]
-    master.mav.set_mode_send(master.target_system,
-                             mavutil.mavlink.MAV_MODE_FLAG_CUSTOM_MODE_ENABLED,
-                             mode_id)
-    t_end = time.time() + timeout
-    while time.time() < t_end:
-        hb = master.recv_match(type="HEARTBEAT", blocking=True, timeout=1)
-        if hb and hb.custom_mode == mode_id:
-            log(f"🎮 Mode → {mode}")
-            return True
-    sys.exit(f"❌ Couldn't enter {mode}")
-
 def is_armed(hb) -> bool:
-    return bool(hb.base_mode & mavutil.mavlink.MAV_MODE_FLAG_SAFETY_ARMED)
-
-def arm_echo(master, arm_it=True, timeout=6) -> bool:
-    master.mav.command_long_send(master.target_system,
-                                 master.target_component,
-                                 mavutil.mavlink.MAV_CMD_COMPONENT_ARM_DISARM,
-                                 0, 1 if arm_it else 0, 0,0,0,0,0,0)
-    t_end = time.time() + timeout
-    while time.time() < t_end:
-        hb = master.recv_match(type="HEARTBEAT", blocking=True, timeout=1)
-        if hb and is_armed(hb) == arm_it:
-            log("✅ Armed" if arm_it else "✅ Disarmed")
-            return True
-    return False
+    return bool(hb.base_mode & _mav().mavlink.MAV_MODE_FLAG_SAFETY_ARMED)
+
 # ──────────────────────────────────────────────────────────────────────────
 
 class MotorController:
     """
     Wraps pymavlink for servo‐PWM plus arming/disarming with thread-safe heartbeat monitoring.
+
+    After the initial heartbeat, a single MavRouter thread owns all reads;
+    heartbeats update the status fields through a subscription, and
+    arm / set-mode / set-param return futures resolved by the matching reply.
     """
 
-    def __init__(self, com_port: str, baud: int):
-        if mavutil is None:
-            raise RuntimeError("Please `pip install pymavlink`")
-        self.master = mavutil.mavlink_connection(com_port, baud=baud)
+    def __init__(self, com_port: str, baud: int, max_cmd_rate: float = 100.0,
+                 bulk_setpoints: bool = False):
+        self.master = _mav().mavlink_connection(com_port, baud=baud)
         wait_heartbeat(self.master)
 
         log(f"[Motor] Connected @ {com_port} {baud}")
-        change_mode(self.master, "MANUAL")
 
         # shadow list so we can echo servo values to GUI/console
         self._shadow: List[int] = [1000]*8
+        self._owned: Set[int] = set()          # channels we have overridden
         
         # Thread-safe heartbeat and armed status monitoring
         self.last_heartbeat_time = time.time()
         self.is_armed_status = False
         self.last_heartbeat = None
         self._status_lock = threading.RLock()  # Add thread safety
-        self._heartbeat_thread = threading.Thread(target=self._monitor_heartbeat, daemon=True)
-        self._heartbeat_thread.start()
 
-    def _monitor_heartbeat(self):
-        """Continuously monitor for heartbeat messages with proper thread safety"""
-        while True:
-            try:
-                # Use non-blocking receive with short timeout
-                hb = self.master.recv_match(type="HEARTBEAT", blocking=False, timeout=0.05)
-                if hb and getattr(hb, 'type', None) != 1:
-                    time.sleep(1.0)  # Wait longer on error
-                    continue
-                if hb:
-                    with self._status_lock:  # Thread-safe update
-                        self.last_heartbeat_time = time.time()
-                        self.last_heartbeat = hb
-                        # Extract armed status from heartbeat
-                        if getattr(hb, 'base_mode', None) == 81:
-                            self.is_armed_status = True
-                            armed_status = True
-                            print(f"Arm Status:{armed_status} ")
-                        else:
-                            self.is_armed_status = False
-                            armed_status = False
-                            print(f"Arm Status:{armed_status} ")
-                        #self.is_armed_status = is_armed(hb)
-                        print(f"Vehicle Status: {hb}")
-                        
-                
-                time.sleep(0.2)  # Slower polling to reduce interference (200ms)
-            except Exception as e:
-                log(f"Heartbeat monitoring error: {e}")
-                time.sleep(1.0)  # Wait longer on error
-                continue
+        # one reader for the whole link; everything else subscribes
+        self.router = MavRouter(self.master)
+        self.router.subscribe("HEARTBEAT", self._on_heartbeat)
+        # every COMMAND_LONG is timed against its COMMAND_ACK
+        self.cmd_stats = CommandTracker()
+        self.router.subscribe("COMMAND_ACK", self.cmd_stats.on_ack)
+        self.router.start()
+
+        # servo commands leave through their own rate-limited sender;
+        # bulk mode packs every pending channel into one RC_CHANNELS_OVERRIDE
+        # and repeats it while idle (ArduPilot drops an override that is not
+        # refreshed within RC_OVERRIDE_TIME, 3 s by default)
+        self.bulk = bulk_setpoints and hasattr(self.master.mav,
+                                               "rc_channels_override_send")
+        if bulk_setpoints and not self.bulk:
+            log("⚠︎ RC_CHANNELS_OVERRIDE unavailable – using DO_SET_SERVO")
+        self._override_raw: List[int] = []     # last RC_CHANNELS_OVERRIDE sent
+        self.pwm = PwmPipeline(self._send_servo, max_rate=max_cmd_rate,
+                               send_many=self._send_override if self.bulk else None,
+                               refresh=self._refresh_override if self.bulk else None)
+        self.pwm.start()
+        REGISTRY.collector("motor", self._metrics)
+
+        try:
+            self.set_mode("MANUAL").result()
+            log("🎮 Mode → MANUAL")
+        except TimeoutError:
+            sys.exit("❌ Couldn't enter MANUAL")
+
+    def _on_heartbeat(self, hb):
+        """HEARTBEAT handler (router thread)"""
+        if getattr(hb, 'type', None) != 1:
+            return  # not the vehicle (e.g. a GCS heartbeat)
+        armed = is_armed(hb)
+        with self._status_lock:  # Thread-safe update
+            self.last_heartbeat_time = time.time()
+            self.last_heartbeat = hb
+            changed = armed != self.is_armed_status
+            self.is_armed_status = armed
+        if changed:
+            log(f"Vehicle {'ARMED' if armed else 'DISARMED'} "
+                f"(base_mode {hb.base_mode}, status {hb.system_status})")
 
     def is_connected(self) -> bool:
         """Check if we've received a heartbeat within the last 3 seconds"""
@@ -177,36 +135,177 @@ class MotorController:
         with self._status_lock:
             return self.is_armed_status if self.is_connected() else False
 
+    # ── futures: resolve on the matching reply ──────────────────────
+    def arm_async(self, arm_it: bool = True, timeout: float = 6) -> Future:
+        """Send ARM/DISARM; resolves with the first HEARTBEAT in that state."""
+        fut = self.router.expect("HEARTBEAT",
+                                 lambda hb: is_armed(hb) == arm_it, timeout)
+        self._command_long(_mav().mavlink.MAV_CMD_COMPONENT_ARM_DISARM,
+                           1 if arm_it else 0)
+        return fut
+
+    def set_mode(self, mode: str, timeout: float = 5) -> Future:
+        """Request a flight mode; resolves with the confirming HEARTBEAT."""
+        mode_id = self.master.mode_mapping()[mode]
+        fut = self.router.expect("HEARTBEAT",
+                                 lambda hb: hb.custom_mode == mode_id, timeout)
+        self.router.send(lambda mav: mav.set_mode_send(
+            self.master.target_system,
+            _mav().mavlink.MAV_MODE_FLAG_CUSTOM_MODE_ENABLED,
+            mode_id))
+        return fut
+
+    def set_param_async(self, name: str, value: float,
+                        timeout: float = 3) -> Future:
+        """PARAM_SET; resolves with the PARAM_VALUE echo carrying `value`."""
+        fut = self.router.expect("PARAM_VALUE",
+                                 lambda m: _param_matches(m, name, value), timeout)
+        self.router.send(lambda mav: mav.param_set_send(
+            self.master.target_system, self.master.target_component,
+            name.encode(), float(value),
+            _mav().mavlink.MAV_PARAM_TYPE_REAL32))
+        return fut
+
+    def set_param(self, name: str, value: float, retries: int = 3) -> bool:
+        """Blocking set_param with retries; falls back to a read-back request."""
+        for r in range(1, retries+1):
+            try:
+                self.set_param_async(name, value).result()
+                log(f"🔧 {name} → {value}")
+                return True
+            except TimeoutError:
+                pass
+            # fallback: request and read
+            fut = self.router.expect("PARAM_VALUE",
+                                     lambda m: _param_matches(m, name, value), 2)
+            self.router.send(lambda mav: mav.param_request_read_send(
+                self.master.target_system, self.master.target_component,
+                name.encode(), -1))
+            try:
+                fut.result()
+                log(f"🆗 {name} already {value} (echo skipped)")
+                return True
+            except TimeoutError:
+                log(f"⚠︎ {name} not updated, retry {r}/{retries}")
+        log(f"🚫 skipping {name} (no echo)")
+        return False
+
     def arm(self):
         """Arm with status verification"""
-        with self._status_lock:  # Prevent status reading during arm operation
-            result = arm_echo(self.master, True)
-            # Give time for status to propagate
-            time.sleep(0.5)
-            return result
+        return self._arm_wait(True)
 
     def disarm(self):
         """Disarm with status verification"""
-        with self._status_lock:  # Prevent status reading during disarm operation
-            result = arm_echo(self.master, False)
-            # Give time for status to propagate
-            time.sleep(0.5)
-            return result
+        return self._arm_wait(False)
+
+    def _arm_wait(self, arm_it: bool) -> bool:
+        try:
+            self.arm_async(arm_it).result()
+        except TimeoutError:
+            return False
+        log("✅ Armed" if arm_it else "✅ Disarmed")
+        return True
 
     def set_pwm(self, channel: int, pwm_us: int):
         """
-        Public method: updates local shadow list, prints it,
-        then sends MAV_CMD_DO_SET_SERVO.
+        Public method: updates local shadow list, then queues
+        MAV_CMD_DO_SET_SERVO on the command pipeline.  Never blocks.
         """
         self._shadow[channel-1] = pwm_us
-        print("PWM", self._shadow)
-
-        with self._status_lock:  # Thread-safe PWM sending
-            self.master.mav.command_long_send(
-                self.master.target_system,
-                self.master.target_component,
-                mavutil.mavlink.MAV_CMD_DO_SET_SERVO,
-                0,
-                float(channel),
-                float(pwm_us),
-                0,0,0,0,0)
+        self.pwm.submit(channel, pwm_us)
+
+    def set_pwm_many(self, setpoints: Dict[int, int]):
+        """
+        Update several channels at once, e.g. {1: 1400, 2: 1400}.
+        In bulk mode they leave as a single RC_CHANNELS_OVERRIDE message,
+        otherwise as back-to-back DO_SET_SERVO commands.  Never blocks.
+        """
+        for ch, pwm_us in setpoints.items():
+            self._shadow[ch-1] = pwm_us
+        self.pwm.submit_many(dict(setpoints))
+
+    def stop_pwm(self, pwm_us: int = 1000):
+        """Priority stop: every channel to `pwm_us` ahead of queued commands."""
+        self._shadow[:] = [pwm_us]*8
+        self.pwm.stop(pwm_us)
+
+    def _send_servo(self, channel: int, pwm_us: int):
+        self._command_long(_mav().mavlink.MAV_CMD_DO_SET_SERVO,
+                           float(channel), float(pwm_us))
+
+    def _command_long(self, command: int, *params: float):
+        """COMMAND_LONG (params padded to 7), registered with cmd_stats."""
+        p = list(params) + [0] * (7 - len(params))
+
+        def send(mav):
+            self.cmd_stats.on_sent(command)     # before the ACK can race us
+            mav.command_long_send(self.master.target_system,
+                                  self.master.target_component,
+                                  command, 0, *p)
+        self.router.send(send)
+
+    def _send_override(self, setpoints: Dict[int, int]):
+        """
+        One RC_CHANNELS_OVERRIDE for all channels we drive.  Channels never
+        commanded here are left as UINT16_MAX (ignored by the autopilot).
+        The outputs must be mapped to RC passthrough (SERVOn_FUNCTION = 1 or
+        RCINn) for the override to reach them.
+        """
+        self._owned.update(setpoints)
+        raw = [self._shadow[i] if i + 1 in self._owned else _RC_IGNORE
+               for i in range(8)]
+        for ch, pwm_us in setpoints.items():    # sender's view wins
+            raw[ch-1] = pwm_us
+        self._override_raw = raw
+        self.router.send(lambda mav: mav.rc_channels_override_send(
+            self.master.target_system, self.master.target_component, *raw))
+
+    def _refresh_override(self):
+        """Repeat the last override so the owned channels keep their values."""
+        raw = self._override_raw
+        if raw:
+            self.router.send(lambda mav: mav.rc_channels_override_send(
+                self.master.target_system, self.master.target_component, *raw))
+
+    def _metrics(self):
+        """Scrape-time view of the PWM queue and command tracker (core.metrics)."""
+        q = self.pwm.stats()
+        for key, help in (("queued", "Setpoints submitted"),
+                          ("coalesced", "Setpoints replaced before they were sent"),
+                          ("sent", "Setpoints sent to the autopilot"),
+                          ("refreshes", "RC overrides repeated to keep them alive"),
+                          ("errors", "Setpoint sends that raised")):
+            yield f"lat_pwm_{key}_total", "counter", help, [({}, q[key])]
+        yield "lat_pwm_backlog", "gauge", "Channels waiting to be sent", [({}, q["backlog"])]
+        cs = self.cmd_stats.counters()
+        for key in ("sent", "acked", "unacked", "stray_acks"):
+            yield f"lat_mav_commands_{key}_total", "counter", \
+                f"COMMAND_LONG {key.replace('_', ' ')}", [({}, cs[key])]
+        yield "lat_mav_commands_pending", "gauge", "COMMAND_LONGs awaiting an ACK", \
+            [({}, cs["pending"])]
+        yield "lat_mav_command_ack_seconds", "histogram", "COMMAND_LONG → COMMAND_ACK latency", \
+            [({}, ((LATENCY_EDGES_MS / 1e3).tolist(), cs["hist"], cs["latency_sum"]))]
+        with self._status_lock:
+            age = time.time() - self.last_heartbeat_time
+        yield "lat_mav_heartbeat_age_seconds", "gauge", "Time since the last vehicle HEARTBEAT", \
+            [({}, age)]
+
+    def close(self):
+        REGISTRY.collector("motor", None)
+        self.pwm.close()
+        self.router.stop()
+        self.router.join(timeout=1.0)
+        try:
+            self.master.close()
+        except Exception:
+            pass
+
+
+_RC_IGNORE = 0xFFFF       # RC_CHANNELS_OVERRIDE: leave this channel alone
+
+
+def _param_matches(m, name: str, value: float) -> bool:
+    pid = (m.param_id.decode()
+           if isinstance(m.param_id, bytes)
+           else m.param_id)
+    return pid.rstrip("\x00") == name and abs(float(m.param_value) - float(value)) < 1e-3
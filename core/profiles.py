@@ -0,0 +1,228 @@
+"""
+Setpoint profiles and the thread that plays them.
+
+A profile is a list of (t, pwm) events: at `t` seconds after start the
+channel goes to `pwm` µs and holds until the next event.  Smooth shapes
+(ramps, sine sweeps) are sampled at `rate` Hz.  The runner waits for each
+event on an absolute monotonic deadline, so timing errors never
+accumulate however long the profile is.
+
+Profiles can be loaded from files:
+  *.json – one spec or a list of specs played back to back, e.g.
+           {"type": "ramp", "start": 1000, "end": 1600, "duration": 10}
+           {"type": "table", "rows": [[0, 1200], [2.5, 1400], [5, 1000]]}
+  *.csv  – two columns `t,pwm` (header optional), played as a table
+"""
+from __future__ import annotations
+import csv, json, math, pathlib, threading, time
+from dataclasses import dataclass
+from typing import Callable, Iterable, Optional, Sequence
+
+import numpy as np
+
+from .logging_utils import log
+
+__all__ = ["Profile", "ProfileRunner", "step", "ramp", "staircase",
+           "sine_sweep", "table", "concat", "from_spec", "load",
+           "pct_to_pwm"]
+
+PWM_MIN, PWM_MAX = 1000, 2000
+
+
+def pct_to_pwm(pct: float) -> int:
+    """Throttle percent → servo µs, same mapping as the throttle slider."""
+    return PWM_MIN + int(max(0.0, min(100.0, pct)) / 100 * (PWM_MAX - PWM_MIN))
+
+
+@dataclass(frozen=True)
+class Profile:
+    name: str
+    t:    np.ndarray        # event times (s from start), non-decreasing
+    pwm:  np.ndarray        # µs, held until the next event
+
+    def __post_init__(self):
+        if len(self.t) != len(self.pwm) or len(self.t) == 0:
+            raise ValueError(f"profile {self.name!r}: need matching, non-empty t/pwm")
+        if np.any(np.diff(self.t) < 0):
+            raise ValueError(f"profile {self.name!r}: times must not decrease")
+
+    @property
+    def duration(self) -> float:
+        return float(self.t[-1])
+
+    def __len__(self) -> int:
+        return len(self.t)
+
+
+def _make(name: str, t, pwm) -> Profile:
+    pwm = np.clip(np.rint(np.asarray(pwm, dtype=np.float64)), PWM_MIN, PWM_MAX)
+    return Profile(name, np.asarray(t, dtype=np.float64), pwm.astype(np.int64))
+
+
+# ── builders ───────────────────────────────────────────────────────────
+def step(level: float, duration: float, rest: float = PWM_MIN) -> Profile:
+    """`level` for `duration` s, then `rest`."""
+    return _make("step", [0.0, duration], [level, rest])
+
+
+def ramp(start: float, end: float, duration: float, rate: float = 50.0,
+         rest: Optional[float] = None) -> Profile:
+    """Linear ramp sampled at `rate` Hz; optionally drop to `rest` at the end."""
+    n = max(2, int(round(duration * rate)) + 1)
+    t = np.linspace(0.0, duration, n)
+    pwm = np.linspace(start, end, n)
+    if rest is not None:
+        t, pwm = np.r_[t, duration], np.r_[pwm, rest]
+    return _make("ramp", t, pwm)
+
+
+def staircase(start: float, end: float, steps: int, dwell: float,
+              rest: float = PWM_MIN) -> Profile:
+    """`steps` equal levels from `start` to `end`, `dwell` s each, then `rest`."""
+    levels = np.linspace(start, end, steps)
+    t = np.arange(steps + 1) * dwell
+    return _make("staircase", t, np.r_[levels, rest])
+
+
+def sine_sweep(center: float, amplitude: float, f0: float, f1: float,
+               duration: float, rate: float = 100.0, log_sweep: bool = False,
+               rest: float = PWM_MIN) -> Profile:
+    """Chirp around `center` from `f0` to `f1` Hz (linear or logarithmic)."""
+    t = np.arange(0.0, duration, 1.0 / rate)
+    if log_sweep and f0 > 0 and f1 != f0:
+        k = math.log(f1 / f0) / duration
+        phase = 2 * math.pi * f0 * (np.exp(k * t) - 1) / k
+    else:
+        phase = 2 * math.pi * (f0 * t + (f1 - f0) * t * t / (2 * duration))
+    return _make("sine_sweep", np.r_[t, duration],
+                 np.r_[center + amplitude * np.sin(phase), rest])
+
+
+def table(rows: Iterable[Sequence[float]], name: str = "table") -> Profile:
+    """Arbitrary (t, pwm) rows, held between rows."""
+    arr = np.asarray(list(rows), dtype=np.float64).reshape(-1, 2)
+    return _make(name, arr[:, 0], arr[:, 1])
+
+
+def concat(profiles: Sequence[Profile], gap: float = 0.0,
+           name: Optional[str] = None) -> Profile:
+    """Play `profiles` back to back, `gap` s apart."""
+    ts, ps, t0 = [], [], 0.0
+    for p in profiles:
+        ts.append(p.t + t0)
+        ps.append(p.pwm)
+        t0 += p.duration + gap
+    return Profile(name or "+".join(p.name for p in profiles),
+                   np.concatenate(ts), np.concatenate(ps))
+
+
+_BUILDERS = {"step": step, "ramp": ramp, "staircase": staircase,
+             "sine_sweep": sine_sweep, "table": table}
+
+
+def from_spec(spec) -> Profile:
+    """Build from a dict `{"type": ..., **kwargs}` or a list of them."""
+    if isinstance(spec, list):
+        return concat([from_spec(s) for s in spec])
+    spec = dict(spec)
+    kind = spec.pop("type", None)
+    if kind not in _BUILDERS:
+        raise ValueError(f"Unknown profile type {kind!r} "
+                         f"(expected one of {', '.join(_BUILDERS)})")
+    return _BUILDERS[kind](**spec)
+
+
+def load(path: str | pathlib.Path) -> Profile:
+    path = pathlib.Path(path)
+    if path.suffix.lower() == ".csv":
+        with path.open(newline="") as f:
+            rows = [r for r in csv.reader(f) if r]
+        if rows and not _is_number(rows[0][0]):
+            rows = rows[1:]                     # header
+        prof = table([(float(r[0]), float(r[1])) for r in rows], name=path.stem)
+    else:
+        prof = from_spec(json.loads(path.read_text()))
+    return Profile(path.stem, prof.t, prof.pwm)
+
+
+def _is_number(s: str) -> bool:
+    try:
+        float(s)
+        return True
+    except ValueError:
+        return False
+
+
+# ── playback ───────────────────────────────────────────────────────────
+class ProfileRunner(threading.Thread):
+    """
+    Plays a Profile on one channel on its own thread.
+
+    `send(channel, pwm)` must not block (MotorController.set_pwm queues).
+    `on_setpoint(t_host, channel, pwm, late_s, name)` is called after every
+    event, with the wall-clock send time and how late it left.
+    `stop()` aborts at once; an aborted (or failed) run then drops the
+    channel to `rest_pwm`, as ThrustSweep does, and logs that setpoint too.
+    """
+
+    def __init__(self, profile: Profile, channel: int,
+                 send: Callable[[int, int], None],
+                 on_setpoint: Optional[Callable[..., None]] = None,
+                 on_done: Optional[Callable[["ProfileRunner"], None]] = None,
+                 rest_pwm: int = 1000):
+        super().__init__(daemon=True)
+        self.profile = profile
+        self.channel = channel
+        self.rest_pwm = rest_pwm
+        self._send = send
+        self._on_setpoint = on_setpoint
+        self._on_done = on_done
+        self._abort = threading.Event()
+        self.index = 0                          # next event
+        self.max_late = 0.0                     # worst deadline miss (s)
+        self.completed = False
+
+    @property
+    def progress(self) -> float:
+        return self.index / len(self.profile)
+
+    def run(self):
+        p = self.profile
+        log(f"▶ Profile {p.name}: {len(p)} setpoints over {p.duration:.1f} s "
+            f"on M{self.channel}")
+        t0 = time.monotonic()
+        try:
+            for i in range(len(p)):
+                deadline = t0 + p.t[i]
+                delay = deadline - time.monotonic()
+                if delay > 0 and self._abort.wait(delay):
+                    break
+                if self._abort.is_set():
+                    break
+                pwm = int(p.pwm[i])
+                self._send(self.channel, pwm)
+                late = max(0.0, time.monotonic() - deadline)
+                self.max_late = max(self.max_late, late)
+                self.index = i + 1
+                if self._on_setpoint:
+                    self._on_setpoint(time.time(), self.channel, pwm, late, p.name)
+            else:
+                self.completed = True
+        except Exception as e:
+            log(f"Profile {p.name} error: {e}")
+        if not self.completed:
+            try:
+                self._send(self.channel, self.rest_pwm)
+                if self._on_setpoint:
+                    self._on_setpoint(time.time(), self.channel, self.rest_pwm, 0.0, p.name)
+            except Exception as e:
+                log(f"Profile {p.name}: could not return M{self.channel} to rest: {e}")
+        log(f"■ Profile {p.name} {'done' if self.completed else 'aborted'} "
+            f"({self.index}/{len(p)}, worst lateness {self.max_late*1e3:.1f} ms)")
+        if self._on_done:
+            self._on_done(self)
+
+    def stop(self):
+        self._abort.set()
+        if self.is_alive() and threading.current_thread() is not self:
+            self.join(timeout=1.0)
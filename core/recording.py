@@ -0,0 +1,267 @@
+"""
+Compact binary recordings.
+
+Layout:  MAGIC (8 B) | header length (uint32 LE) | JSON header | records
+The JSON header is space-padded so records start on a 64-byte boundary,
+and describes the row layout (`fields`), so readers never hard-code it.
+Each record is one RECORD_DTYPE row: receive and aligned times + raw 56-byte frame.
+"""
+from __future__ import annotations
+import csv, datetime, json, os, pathlib, struct, sys, time
+from typing import Iterator, Optional
+
+import numpy as np
+
+from .measurement import RECORD_DTYPE, MeasurementFrame
+
+__all__ = ["RecordingWriter", "CsvWriter", "RecordingReader", "read_header",
+           "to_csv", "from_csv"]
+
+MAGIC   = b"LATREC\x00\x01"
+VERSION = 1
+_ALIGN  = 64
+
+
+class _Writer:
+    """Buffered file with time-based flush and fsync."""
+
+    def __init__(self, path: str | pathlib.Path, mode: str,
+                 buffer_size: int, flush_interval: float,
+                 fsync_interval: float, **open_kw):
+        self.path = pathlib.Path(path)
+        self._f = self.path.open(mode, buffering=buffer_size, **open_kw)
+        self.flush_interval = flush_interval
+        self.fsync_interval = fsync_interval
+        self._next_flush = time.monotonic() + flush_interval
+        self._next_fsync = time.monotonic() + fsync_interval
+        self.rows = 0
+
+    def _tick(self):
+        now = time.monotonic()
+        if self.flush_interval and now >= self._next_flush:
+            self._f.flush()
+            self._next_flush = now + self.flush_interval
+        if self.fsync_interval and now >= self._next_fsync:
+            self._f.flush()
+            os.fsync(self._f.fileno())
+            self._next_fsync = now + self.fsync_interval
+
+    def close(self):
+        if self._f.closed:
+            return
+        self._f.flush()
+        if self.fsync_interval:
+            os.fsync(self._f.fileno())
+        self._f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class RecordingWriter(_Writer):
+    """Appends bus batches as raw records to a self-describing file."""
+
+    def __init__(self, path: str | pathlib.Path,
+                 dtype: np.dtype = RECORD_DTYPE,
+                 meta: Optional[dict] = None,
+                 buffer_size: int = 1 << 20,
+                 flush_interval: float = 1.0,
+                 fsync_interval: float = 10.0):
+        super().__init__(path, "wb", buffer_size, flush_interval,
+                         fsync_interval)
+        self.dtype = np.dtype(dtype)
+        header = {
+            "version":      VERSION,
+            "record_size":  self.dtype.itemsize,
+            "fields":       [[n, self.dtype.fields[n][0].str]
+                             for n in self.dtype.names],
+            "frame_format": MeasurementFrame._FORMAT,
+            "created":      datetime.datetime.now().isoformat(),
+            "meta":         meta or {},
+        }
+        blob = json.dumps(header).encode()
+        pad = -(len(MAGIC) + 4 + len(blob)) % _ALIGN
+        blob += b" " * pad
+        self._f.write(MAGIC + struct.pack("<I", len(blob)) + blob)
+
+    def write(self, batch: np.ndarray):
+        if len(batch):
+            self._f.write(np.ascontiguousarray(batch, dtype=self.dtype).data)
+            self.rows += len(batch)
+        self._tick()
+
+
+class CsvWriter(_Writer):
+    """Text equivalent of RecordingWriter: one CSV row per record."""
+
+    def __init__(self, path: str | pathlib.Path,
+                 dtype: np.dtype = RECORD_DTYPE,
+                 buffer_size: int = 1 << 20,
+                 flush_interval: float = 1.0,
+                 fsync_interval: float = 10.0):
+        super().__init__(path, "w", buffer_size, flush_interval,
+                         fsync_interval, newline="")
+        self.dtype = np.dtype(dtype)
+        self._csv = csv.writer(self._f)
+        self._csv.writerow(_csv_header(self.dtype))
+
+    def write(self, batch: np.ndarray):
+        if len(batch):
+            self._csv.writerows(batch.tolist())
+            self.rows += len(batch)
+        self._tick()
+
+
+def _csv_header(dtype: np.dtype):
+    # keep the historical "ts_wall" name for the host timestamp column
+    return ["ts_wall" if n == "t_host" else n for n in dtype.names]
+
+
+def read_header(f) -> tuple[dict, np.dtype, int]:
+    """Parse the header of an open binary recording.
+
+    Returns (header dict, row dtype, byte offset of the first record).
+    """
+    magic = f.read(len(MAGIC))
+    if magic != MAGIC:
+        raise ValueError("Not a LAT recording (bad magic)")
+    (n,) = struct.unpack("<I", f.read(4))
+    header = json.loads(f.read(n))
+    dtype = np.dtype([(name, fmt) for name, fmt in header["fields"]])
+    if dtype.itemsize != header["record_size"]:
+        raise ValueError("Header record_size does not match its fields")
+    return header, dtype, len(MAGIC) + 4 + n
+
+
+def to_csv(src: str | pathlib.Path, dst: str | pathlib.Path | None = None,
+           chunk_rows: int = 1 << 16) -> pathlib.Path:
+    """
+    Stream a binary recording into CSV without loading it whole.
+    A trailing partial record (e.g. after a crash) is ignored.
+    """
+    src = pathlib.Path(src)
+    dst = pathlib.Path(dst) if dst else src.with_suffix(".csv")
+    with src.open("rb") as f, dst.open("w", newline="") as out:
+        _, dtype, _ = read_header(f)
+        writer = csv.writer(out)
+        writer.writerow(_csv_header(dtype))
+        while True:
+            blob = f.read(chunk_rows * dtype.itemsize)
+            k = len(blob) // dtype.itemsize
+            if k == 0:
+                break
+            writer.writerows(np.frombuffer(blob, dtype=dtype, count=k).tolist())
+    return dst
+
+
+def from_csv(src: str | pathlib.Path, dst: str | pathlib.Path | None = None,
+             chunk_rows: int = 1 << 16) -> pathlib.Path:
+    """
+    Convert a CSV log (including pre-binary logs) into a recording so it
+    can be opened with RecordingReader.  Unknown columns are ignored and
+    missing ones are filled with NaN.
+    """
+    src = pathlib.Path(src)
+    dst = pathlib.Path(dst) if dst else src.with_suffix(".bin")
+    names = RECORD_DTYPE.names
+    with src.open(newline="") as f, \
+            RecordingWriter(dst, meta={"converted_from": src.name},
+                            fsync_interval=0) as out:
+        reader = csv.reader(f)
+        cols = ["t_host" if c == "ts_wall" else c for c in next(reader)]
+        pick = [cols.index(n) if n in cols else None for n in names]
+        chunk = np.empty(chunk_rows, dtype=RECORD_DTYPE)
+        k = 0
+        for row in reader:
+            chunk[k] = tuple(float(row[i]) if i is not None else np.nan
+                             for i in pick)
+            k += 1
+            if k == chunk_rows:
+                out.write(chunk)
+                k = 0
+        out.write(chunk[:k])
+    return dst
+
+
+class RecordingReader:
+    """
+    Memory-mapped view of a binary recording.
+
+    `reader["thrust1"]` is a zero-copy column over the mapped file, and a
+    sparse index (every `index_stride`-th host timestamp) lets
+    `window(t0, t1)` locate a time range touching only the pages inside
+    it, so opening a multi-GB run costs about as much as reading its header.
+    """
+
+    def __init__(self, path: str | pathlib.Path, index_stride: int = 4096):
+        self.path = pathlib.Path(path)
+        with self.path.open("rb") as f:
+            self.header, self.dtype, offset = read_header(f)
+        n = (self.path.stat().st_size - offset) // self.dtype.itemsize
+        if n:
+            self.rows = np.memmap(self.path, dtype=self.dtype, mode="r",
+                                  offset=offset, shape=(n,))
+        else:
+            self.rows = np.empty(0, dtype=self.dtype)
+        self.index_stride = max(1, int(index_stride))
+        self._t = self.rows["t_host"]
+        self._index = np.array(self._t[::self.index_stride])
+        self.t0 = float(self._t[0]) if n else 0.0
+
+    @property
+    def channels(self) -> tuple[str, ...]:
+        return self.dtype.names
+
+    @property
+    def duration(self) -> float:
+        return float(self._t[-1]) - self.t0 if len(self) else 0.0
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        return self.rows[name]
+
+    def _locate(self, t: float) -> int:
+        """First row with t_host >= t, via the sparse index."""
+        j = int(np.searchsorted(self._index, t, side="right")) - 1
+        if j < 0:
+            return 0
+        lo = j * self.index_stride
+        hi = min(lo + self.index_stride, len(self))
+        return lo + int(np.searchsorted(self._t[lo:hi], t, side="left"))
+
+    def time_slice(self, t_start: float, t_end: float,
+                   relative: bool = True) -> slice:
+        """Row slice covering [t_start, t_end) (seconds from run start by default)."""
+        base = self.t0 if relative else 0.0
+        return slice(self._locate(base + t_start), self._locate(base + t_end))
+
+    def window(self, t_start: float, t_end: float,
+               relative: bool = True) -> np.ndarray:
+        """Zero-copy rows within [t_start, t_end)."""
+        return self.rows[self.time_slice(t_start, t_end, relative)]
+
+    def frames(self, sl: slice = slice(None)) -> Iterator[MeasurementFrame]:
+        for rec in self.rows[sl]:
+            yield MeasurementFrame.from_record(rec)
+
+    def close(self):
+        self.rows = self._t = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+if __name__ == "__main__":
+    # python -m core.recording <file.bin|file.csv> [out]
+    if len(sys.argv) not in (2, 3):
+        sys.exit("usage: python -m core.recording <recording.bin|log.csv> [out]")
+    conv = from_csv if sys.argv[1].endswith(".csv") else to_csv
+    print(conv(*sys.argv[1:]))
@@ -1,5 +1,5 @@
 from __future__ import annotations
-from dataclasses import dataclass, asdict
+from dataclasses import dataclass, asdict, field
 import json, pathlib
 
 __all__ = ["Settings"]
@@ -12,6 +12,16 @@ class Settings:
     baud:      int = 115200
     stm32_ip:  str = "0.0.0.0"      # bind addr for UDP recv
     udp_port:  int = 9000
+    log_format: str = "csv"         # "csv" or "bin" (see core.recording)
+    stm32_clock_scale:   float = 1.0   # STM32 timestamp units per second
+    pixhawk_clock_scale: float = 1.0   # Pixhawk timestamp units per second
+    bulk_setpoints: bool = False    # RC_CHANNELS_OVERRIDE instead of DO_SET_SERVO
+    # extra / overriding derived channels, name -> expression (core.derived)
+    derived: dict = field(default_factory=dict)
+    # live-view filters, channel -> spec (core.filters); recordings stay raw
+    filters: dict = field(default_factory=dict)
+    # Prometheus text at http://127.0.0.1:<port>/metrics (core.metrics); 0 = off
+    metrics_port: int = 9108
 
     @classmethod
     def load(cls, path: pathlib.Path | None = None) -> "Settings":
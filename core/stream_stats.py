@@ -0,0 +1,145 @@
+from __future__ import annotations
+import threading, time
+from typing import Optional
+
+import numpy as np
+
+__all__ = ["StreamStats", "verdict"]
+
+# inter-arrival histogram bin edges (ms); last bin is "> 500 ms"
+JITTER_EDGES_MS = np.array([0.05, 0.1, 0.2, 0.5, 1, 2, 5, 10, 20, 50,
+                            100, 200, 500])
+
+
+class StreamStats:
+    """
+    Per-stream health counters, updated once per received batch.
+
+    Gaps are inferred from `stm32_timestamp` deltas against a running
+    estimate of the nominal sample period, so the sender rate need not be
+    configured.  Inter-arrival times come from the host receive stamps.
+
+    Without finite STM32 timestamps (the real rig may send NaN) gaps cannot
+    be detected: the snapshot's `timed` is False and `clean` is None
+    (unknown) rather than True, unless size errors already rule it out.
+    """
+
+    def __init__(self, rate_window: float = 1.0, gap_factor: float = 1.5):
+        self.rate_window = rate_window
+        self.gap_factor  = gap_factor
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.packets     = 0
+            self.bytes       = 0
+            self.size_errors = 0
+            self.gaps        = 0       # discontinuities in stm32_timestamp
+            self.lost        = 0       # frames estimated missing in those gaps
+            self.backwards   = 0       # stm32_timestamp went backwards
+            self.jitter_hist = np.zeros(len(JITTER_EDGES_MS) + 1, dtype=np.int64)
+            self.period: Optional[float] = None   # nominal stm32 period
+            self._last_host: Optional[float] = None
+            self._last_stm:  Optional[float] = None
+            # Welford mean/variance of host inter-arrival (s)
+            self._ia_n, self._ia_mean, self._ia_m2 = 0, 0.0, 0.0
+            now = time.monotonic()
+            self._win = (now, 0, 0)
+            self.pps = self.bps = 0.0
+            self.started = time.time()
+
+    # ── receive thread ─────────────────────────────────────────────
+    def on_size_error(self, nbytes: int):
+        with self._lock:
+            self.size_errors += 1
+            self.bytes += nbytes
+
+    def on_batch(self, batch: np.ndarray, frame_size: int):
+        n = len(batch)
+        if n == 0:
+            return
+        host = batch["t_host"]
+        stm  = batch["stm32_timestamp"].astype(np.float64)
+        with self._lock:
+            self.packets += n
+            self.bytes += n * frame_size
+
+            # host inter-arrival: histogram + running variance
+            ia = np.diff(host, prepend=self._last_host) if self._last_host is not None \
+                else np.diff(host)
+            self._last_host = float(host[-1])
+            if len(ia):
+                self.jitter_hist += np.bincount(
+                    np.searchsorted(JITTER_EDGES_MS, ia * 1e3),
+                    minlength=len(self.jitter_hist))
+                self._welford(ia)
+
+            # sensor-clock continuity
+            d = np.diff(stm, prepend=self._last_stm) if self._last_stm is not None \
+                else np.diff(stm)
+            if np.isfinite(stm[-1]):
+                self._last_stm = float(stm[-1])
+            d = d[np.isfinite(d)]
+            if len(d):
+                pos = d[d > 0]
+                if len(pos):
+                    med = float(np.median(pos))
+                    self.period = med if self.period is None else \
+                        0.9 * self.period + 0.1 * med
+                self.backwards += int(np.count_nonzero(d < 0))
+                if self.period:
+                    big = d[d > self.gap_factor * self.period]
+                    self.gaps += len(big)
+                    self.lost += int(np.rint(big / self.period).sum()) - len(big)
+
+            self._roll_rate()
+
+    def _welford(self, x: np.ndarray):
+        # merge a batch into the running mean/M2 (Chan et al.)
+        nb, mb = len(x), float(x.mean())
+        m2b = float(((x - mb) ** 2).sum())
+        n = self._ia_n + nb
+        delta = mb - self._ia_mean
+        self._ia_mean += delta * nb / n
+        self._ia_m2 += m2b + delta * delta * self._ia_n * nb / n
+        self._ia_n = n
+
+    def _roll_rate(self):
+        now = time.monotonic()
+        t0, p0, b0 = self._win
+        if now - t0 >= self.rate_window:
+            self.pps = (self.packets - p0) / (now - t0)
+            self.bps = (self.bytes - b0) / (now - t0)
+            self._win = (now, self.packets, self.bytes)
+
+    # ── any thread ─────────────────────────────────────────────────
+    def snapshot(self) -> dict:
+        with self._lock:
+            # rates decay to zero when the stream stops
+            idle = time.monotonic() - self._win[0] >= 2 * self.rate_window
+            jitter = (self._ia_m2 / (self._ia_n - 1)) ** 0.5 if self._ia_n > 1 else 0.0
+            return {
+                "packets":       self.packets,
+                "bytes":         self.bytes,
+                "pps":           0.0 if idle else self.pps,
+                "bps":           0.0 if idle else self.bps,
+                "size_errors":   self.size_errors,
+                "gaps":          self.gaps,
+                "lost":          self.lost,
+                "backwards":     self.backwards,
+                "period_s":      self.period,
+                "interarrival_mean_ms": self._ia_mean * 1e3,
+                "jitter_ms":     jitter * 1e3,
+                "jitter_hist":   dict(zip(
+                    [f"<{e:g}ms" for e in JITTER_EDGES_MS] + [f">{JITTER_EDGES_MS[-1]:g}ms"],
+                    self.jitter_hist.tolist())),
+                "timed":         self.period is not None,
+                "clean":         False if (self.size_errors or self.gaps or self.backwards)
+                                 else (True if self.period is not None else None),
+            }
+
+
+def verdict(snap: dict) -> str:
+    """One-word stream state for summaries: clean / NOT clean / unverified."""
+    return {True: "clean", False: "NOT clean"}.get(snap["clean"], "unverified")
@@ -0,0 +1,275 @@
+"""
+Automated thrust-curve sweep.
+
+Steps one motor through a PWM table.  At each step the live telemetry is
+watched until thrust and RPM settle (rolling standard deviation under a
+threshold), then thrust, current, voltage, RPM and temperature are
+averaged over the next `average_s` seconds and the sweep moves on.
+
+All statistics are kept as per-batch sums (n, Σx, Σx²), so the cost per
+frame is a handful of vectorised NumPy ops whatever the sample rate.
+"""
+from __future__ import annotations
+import csv, datetime, math, pathlib, threading, time
+from collections import deque
+from typing import Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from .bus import Subscription
+from .logging_utils import log
+
+__all__ = ["ThrustSweep", "RollingStats", "parse_pwm_table"]
+
+THRUST_FIELDS = ("thrust1", "thrust2", "thrust3", "thrust4", "thrust5", "thrust6")
+# columns averaged per step, in table order
+CHANNELS = ("thrust", "current", "voltage", "power", "rpm", "temperature")
+
+
+def parse_pwm_table(text: str) -> List[int]:
+    """"1100,1300,1500" or "start:stop:step" (stop inclusive)."""
+    text = text.strip()
+    if ":" in text:
+        start, stop, inc = (int(float(v)) for v in text.split(":"))
+        return list(range(start, stop + (1 if inc > 0 else -1), inc))
+    return [int(float(v)) for v in text.replace(";", ",").split(",") if v.strip()]
+
+
+def _channels(batch: np.ndarray) -> np.ndarray:
+    """(len(CHANNELS), k) float64 matrix for one batch."""
+    names = batch.dtype.names
+    v = batch["voltage"].astype(np.float64)
+    i = batch["current"].astype(np.float64)
+    if "thrust_total" in names:             # derived at ingest (core.derived)
+        thrust = batch["thrust_total"].astype(np.float64)
+    else:
+        thrust = np.zeros(len(batch))
+        for f in THRUST_FIELDS:
+            thrust += batch[f]
+    power = batch["power"].astype(np.float64) if "power" in names else v * i
+    return np.vstack([thrust, i, v, power,
+                      batch["rpm"].astype(np.float64),
+                      batch["temperature"].astype(np.float64)])
+
+
+class RollingStats:
+    """
+    Mean / std per channel over the last `window` seconds, from per-batch
+    aggregates.  Values are shifted by the first sample seen so Σx² stays
+    well conditioned on large raw counts.  Non-finite samples are skipped.
+    """
+
+    def __init__(self, nch: int, window: Optional[float] = None):
+        self.nch, self.window = nch, window
+        self.reset()
+
+    def reset(self):
+        self._parts: deque = deque()            # (t_last, n, Σx, Σx²)
+        self._n = np.zeros(self.nch)
+        self._s = np.zeros(self.nch)
+        self._ss = np.zeros(self.nch)
+        self._shift: Optional[np.ndarray] = None
+        self.t_first = self.t_last = math.nan
+
+    def add(self, t: np.ndarray, x: np.ndarray):
+        if x.shape[1] == 0:
+            return
+        if self._shift is None:
+            self._shift = np.nan_to_num(x[:, 0])
+            self.t_first = float(t[0])
+        ok = np.isfinite(x)
+        d = np.where(ok, x - self._shift[:, None], 0.0)
+        part = (float(t[-1]), ok.sum(1), d.sum(1), (d * d).sum(1))
+        self._parts.append(part)
+        self._n += part[1]; self._s += part[2]; self._ss += part[3]
+        self.t_last = part[0]
+        if self.window is not None:
+            while len(self._parts) > 1 and self._parts[0][0] < self.t_last - self.window:
+                _, n, s, ss = self._parts.popleft()
+                self._n -= n; self._s -= s; self._ss -= ss
+
+    @property
+    def span(self) -> float:
+        """Seconds of data currently covered."""
+        if not self._parts:
+            return 0.0
+        start = self.t_first if self.window is None else \
+            max(self.t_first, self.t_last - self.window)
+        return self.t_last - start
+
+    @property
+    def count(self) -> int:
+        return int(self._n.min()) if self._parts else 0
+
+    def mean(self) -> np.ndarray:
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return self._s / self._n + (self._shift if self._shift is not None else 0)
+
+    def std(self) -> np.ndarray:
+        with np.errstate(invalid="ignore", divide="ignore"):
+            m = self._s / self._n
+            return np.sqrt(np.maximum(self._ss / self._n - m * m, 0.0))
+
+
+class ThrustSweep(threading.Thread):
+    """
+    Unattended thrust-curve run on its own thread.
+
+    A step counts as settled when, over the last `settle_window` seconds,
+    thrust and RPM each have std <= max(abs_tol, rel_tol·|mean|).  Steps
+    that never settle are averaged anyway after `settle_timeout` and
+    flagged.  `thrust_scale` converts summed thrust channels to grams.
+    `prepare()` runs before the first step (e.g. arm); `finish()` runs
+    after the channel is back at `rest_pwm`, however the sweep ended
+    (e.g. disarm).
+    """
+
+    def __init__(self, sub: Subscription, channel: int,
+                 pwm_table: Sequence[int],
+                 send: Callable[[int, int], None],
+                 on_setpoint: Optional[Callable[..., None]] = None,
+                 settle_window: float = 1.0, average_s: float = 2.0,
+                 settle_timeout: float = 15.0, rel_tol: float = 0.02,
+                 abs_tol: Optional[Dict[str, float]] = None,
+                 thrust_scale: float = 1.0, rest_pwm: int = 1000,
+                 folder: str | pathlib.Path = "logs",
+                 prepare: Optional[Callable[[], bool]] = None,
+                 finish: Optional[Callable[[], object]] = None,
+                 on_done: Optional[Callable[["ThrustSweep"], None]] = None):
+        super().__init__(daemon=True)
+        self.sub, self.channel = sub, channel
+        self.pwm_table = list(pwm_table)
+        self._send, self._on_setpoint = send, on_setpoint
+        self.settle_window, self.average_s = settle_window, average_s
+        self.settle_timeout, self.rel_tol = settle_timeout, rel_tol
+        self.abs_tol = {"thrust": 1.0, "rpm": 50.0, **(abs_tol or {})}
+        self.thrust_scale, self.rest_pwm = thrust_scale, rest_pwm
+        self.folder = pathlib.Path(folder)
+        self._prepare, self._finish, self._on_done = prepare, finish, on_done
+        self._abort = threading.Event()
+        self.rows: List[dict] = []
+        self.step = 0                           # index into pwm_table
+        self.state = "idle"                     # settling / averaging / done
+        self.file: Optional[pathlib.Path] = None
+
+    # ── per step ───────────────────────────────────────────────────
+    def _settled(self, roll: RollingStats) -> bool:
+        if roll.span < 0.9 * self.settle_window or roll.count < 3:
+            return False
+        m, s = roll.mean(), roll.std()
+        for name in ("thrust", "rpm"):
+            k = CHANNELS.index(name)
+            if not s[k] <= max(self.abs_tol[name], self.rel_tol * abs(m[k])):
+                return False
+        return True
+
+    def _feed(self, stats: RollingStats) -> bool:
+        batch = self.sub.get_batch(timeout=0.2)
+        if len(batch):
+            stats.add(batch["t_host"], _channels(batch))
+        return not self._abort.is_set()
+
+    def _run_step(self, pwm: int) -> Optional[dict]:
+        self._send(self.channel, pwm)
+        if self._on_setpoint:
+            self._on_setpoint(time.time(), self.channel, pwm, 0.0, "sweep")
+        t_start = time.monotonic()
+        self.sub.get_batch()                    # discard pre-step rows
+
+        self.state = "settling"
+        roll = RollingStats(len(CHANNELS), self.settle_window)
+        settled = False
+        while self._feed(roll):
+            if self._settled(roll):
+                settled = True
+                break
+            if time.monotonic() - t_start > self.settle_timeout:
+                break
+        if self._abort.is_set():
+            return None
+        t_settle = time.monotonic() - t_start
+
+        self.state = "averaging"
+        avg = RollingStats(len(CHANNELS))
+        t_avg = time.monotonic()
+        while self._feed(avg) and avg.span < self.average_s:
+            if time.monotonic() - t_avg > self.average_s + self.settle_timeout:
+                break                           # stream stalled
+        if self._abort.is_set():
+            return None
+
+        m, s = avg.mean(), avg.std()
+        row = {"pwm_us": pwm, "settled": settled,
+               "settle_s": round(t_settle, 3), "samples": avg.count}
+        for k, name in enumerate(CHANNELS):
+            row[name] = float(m[k])
+            row[f"{name}_std"] = float(s[k])
+        row["thrust_g"] = row["thrust"] * self.thrust_scale
+        row["power_w"] = row["power"]
+        row["g_per_w"] = row["thrust_g"] / row["power_w"] if row["power_w"] > 0 else math.nan
+        return row
+
+    # ── thread ─────────────────────────────────────────────────────
+    def run(self):
+        log(f"▶ Thrust sweep on M{self.channel}: {len(self.pwm_table)} steps")
+        if self._prepare and not self._prepare():
+            log("■ Thrust sweep not started (prepare failed, e.g. could not arm)")
+            self.state = "done"
+            if self._on_done:
+                self._on_done(self)
+            return
+        try:
+            for self.step, pwm in enumerate(self.pwm_table):
+                row = self._run_step(pwm)
+                if row is None:
+                    break
+                self.rows.append(row)
+                log(f"  {pwm} µs: {row['thrust_g']:.1f} g, {row['power_w']:.1f} W, "
+                    f"{row['g_per_w']:.2f} g/W"
+                    + ("" if row["settled"] else "  (not settled)"))
+        except Exception as e:
+            log(f"Thrust sweep error: {e}")
+        finally:
+            self._send(self.channel, self.rest_pwm)
+            if self._on_setpoint:
+                self._on_setpoint(time.time(), self.channel, self.rest_pwm, 0.0, "sweep")
+            if self._finish:
+                try:
+                    if self._finish() is False:
+                        log("⚠︎ Thrust sweep: finish step failed (motor may still be armed)")
+                except Exception as e:
+                    log(f"⚠︎ Thrust sweep: finish step error: {e} (motor may still be armed)")
+        self.state = "done"
+        if self.rows:
+            self.file = self.save()
+            log(f"■ Thrust sweep {'aborted' if self._abort.is_set() else 'done'}: "
+                f"{len(self.rows)} steps → {self.file.resolve()}")
+            print(self.format_table())
+        if self._on_done:
+            self._on_done(self)
+
+    def stop(self):
+        self._abort.set()
+        if self.is_alive() and threading.current_thread() is not self:
+            self.join(timeout=2.0)
+
+    # ── output ─────────────────────────────────────────────────────
+    def save(self) -> pathlib.Path:
+        self.folder.mkdir(exist_ok=True)
+        ts = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+        path = self.folder / f"sweep_M{self.channel}_{ts}.csv"
+        with path.open("w", newline="") as f:
+            w = csv.DictWriter(f, fieldnames=list(self.rows[0]))
+            w.writeheader()
+            w.writerows(self.rows)
+        return path
+
+    def format_table(self) -> str:
+        lines = [f"{'PWM':>6} {'thrust g':>10} {'V':>7} {'A':>7} {'W':>8} "
+                 f"{'RPM':>8} {'°C':>6} {'g/W':>7}"]
+        for r in self.rows:
+            lines.append(f"{r['pwm_us']:>6} {r['thrust_g']:>10.1f} {r['voltage']:>7.2f} "
+                         f"{r['current']:>7.2f} {r['power_w']:>8.1f} {r['rpm']:>8.0f} "
+                         f"{r['temperature']:>6.1f} {r['g_per_w']:>7.2f}"
+                         + ("" if r["settled"] else " *"))
+        return "\n".join(lines)
@@ -2,61 +2,204 @@
 
 from __future__ import annotations
 import socket
+import select
 import struct
+import sys
 import threading
-import queue
-from .measurement import MeasurementFrame
+import time
+from collections import Counter
+import numpy as np
+from .measurement import FRAME_SIZE, decode_records
+from .bus import FrameBus
+from .ingest import IngestPipeline
+from .stream_stats import StreamStats
+from .clock_sync import ClockAligner
+from .metrics import REGISTRY
+
+_WSAEMSGSIZE = 10040   # Windows: datagram larger than the receive slot
+
+# Linux kernel receive timestamps (struct timespec in SCM_TIMESTAMPNS)
+_SO_TIMESTAMPNS = getattr(socket, "SO_TIMESTAMPNS", 35)
+_TIMESPEC = struct.Struct("@ll")
+
+_M_BATCH = REGISTRY.histogram("lat_telemetry_batch_rows",
+                              "Datagrams drained per receiver wakeup",
+                              buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256))
+_M_PUBLISH = REGISTRY.histogram("lat_telemetry_publish_seconds",
+                                "Decode, clock alignment, ingest and publish time per batch")
+
 
 class TelemetryReceiver(threading.Thread):
     """
     Listens for UDP datagrams of exactly 14 float32 (56 bytes) and
-    publishes the latest MeasurementFrame to a size-1 queue.
+    publishes every decoded frame, stamped with its host receive time,
+    to a FrameBus (or an IngestPipeline in front of one) as RECORD_DTYPE rows.
+
+    Each wakeup drains up to `batch_size` datagrams with `recv_into`
+    straight into a preallocated ring, then decodes the whole batch in
+    one NumPy step.
+
+    On Linux the receive time is the kernel's SO_TIMESTAMPNS stamp, so
+    it excludes wakeup and GIL delay; elsewhere it falls back to
+    time.time() at recv.  STM32 and Pixhawk stamps are mapped onto that
+    host clock by online ClockAligner fits.
     """
 
     def __init__(self,
                  bind_ip: str,
                  port: int,
-                 dst_queue: "queue.Queue[MeasurementFrame]"):
+                 bus: FrameBus | IngestPipeline,
+                 batch_size: int = 256,
+                 rcvbuf: int = 4 * 1024 * 1024,
+                 stm32_clock_scale: float = 1.0,
+                 pixhawk_clock_scale: float = 1.0):
         """
-        bind_ip   – local IP to bind; "" means all interfaces
-        port      – UDP port to bind to
-        dst_queue – queue where new frames will be posted (maxsize=1)
+        bind_ip    – local IP to bind; "" means all interfaces
+        port       – UDP port to bind to
+        bus        – FrameBus / IngestPipeline that receives each decoded batch
+        batch_size – max datagrams drained per wakeup
+        rcvbuf     – requested SO_RCVBUF in bytes (0 keeps the OS default)
+        *_clock_scale – device timestamp units per second
         """
         super().__init__(daemon=True)
         self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        if rcvbuf:
+            self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, rcvbuf)
+        # the kernel may clamp (or on Linux double) the requested size
+        self.rcvbuf = self.sock.getsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF)
         self.sock.bind((bind_ip, port))
+        self.sock.setblocking(False)
 
-        self.q    = dst_queue
-        self._fmt = MeasurementFrame._FORMAT
-        self._exp = struct.calcsize(self._fmt)  # Should be 56 bytes
+        self.kernel_timestamps = False
+        if sys.platform.startswith("linux"):
+            try:
+                self.sock.setsockopt(socket.SOL_SOCKET, _SO_TIMESTAMPNS, 1)
+                self.kernel_timestamps = True
+            except OSError:
+                pass
+        self._ancsize = socket.CMSG_SPACE(_TIMESPEC.size) \
+            if self.kernel_timestamps else 0
+
+        self.bus  = bus
+        self._exp = FRAME_SIZE  # Should be 56 bytes
         self._stop = threading.Event()
-        
-        print(f"TelemetryReceiver: Expecting {self._exp} bytes per packet")
+
+        # Datagrams land back-to-back; each recv gets one spare byte so an
+        # oversized packet shows up as a size error instead of truncating.
+        self.batch_size = max(1, int(batch_size))
+        self._ring = bytearray(self.batch_size * self._exp + 1)
+        self._view = memoryview(self._ring)
+        self._stamps = np.empty(self.batch_size, dtype=np.float64)
+
+        # packet/byte rates, size errors, gaps and inter-arrival jitter
+        self.stats = StreamStats()
+
+        # device clocks → host clock
+        self.stm32_clock   = ClockAligner(scale=stm32_clock_scale)
+        self.pixhawk_clock = ClockAligner(scale=pixhawk_clock_scale)
+
+        # datagrams drained per wakeup: last value and histogram
+        self.last_batch = 0
+        self.batch_hist: Counter[int] = Counter()
+        # batches lost to an exception in decode / ingest stages / publish
+        self.publish_errors = 0
+
+        REGISTRY.collector("telemetry", self._metrics)
+
+        print(f"TelemetryReceiver: Expecting {self._exp} bytes per packet "
+              f"(batch {self.batch_size}, SO_RCVBUF {self.rcvbuf} B, "
+              f"{'kernel' if self.kernel_timestamps else 'user'} timestamps)")
 
     def run(self):
         while not self._stop.is_set():
             try:
-                pkt, addr = self.sock.recvfrom(self._exp)
-            except OSError:
+                ready, _, _ = select.select([self.sock], [], [], 0.5)
+            except (OSError, ValueError):   # socket closed by stop()
                 break
-            
-            if len(pkt) != self._exp:
-                print(f"Unexpected packet size: {len(pkt)} bytes. Expected {self._exp} bytes.")
+            if not ready:
                 continue
-                
+
             try:
-                frame = MeasurementFrame.from_bytes(pkt)
-            except ValueError as e:
-                print(f"Error parsing frame: {e}")
-                continue
+                n = self._drain()
+            except OSError:
+                break
+            self.last_batch = n
+            self.batch_hist[n] += 1
+            if n:
+                t0 = time.perf_counter()
+                try:
+                    batch = decode_records(self._ring, self._stamps, n)
+                    host = batch["t_host"]
+                    batch["t_stm32_host"] = self.stm32_clock.update(
+                        host, batch["stm32_timestamp"])
+                    batch["t_pixhawk_host"] = self.pixhawk_clock.update(
+                        host, batch["pixhawk_timestamp"])
+                    self.stats.on_batch(batch, self._exp)
+                    self.bus.publish(batch)
+                except Exception as e:          # a bad stage must not kill the receiver
+                    self.publish_errors += 1
+                    errs = self.publish_errors
+                    if errs <= 10 or errs % 1000 == 0:
+                        print(f"TelemetryReceiver: batch of {n} dropped: "
+                              f"{type(e).__name__}: {e} ({errs} so far)")
+                    continue
+                _M_PUBLISH.observe(time.perf_counter() - t0)
+                _M_BATCH.observe(n)
 
+    def _drain(self) -> int:
+        """Read queued datagrams into the ring until empty or full."""
+        exp, view, stamps, n = self._exp, self._view, self._stamps, 0
+        anc = self._ancsize
+        while n < self.batch_size:
+            off = n * exp
+            ts = None
             try:
-                self.q.put_nowait(frame)
-            except queue.Full:
-                self.q.get_nowait()
-                self.q.put_nowait(frame)
+                if anc:
+                    nbytes, ancdata, _, _ = self.sock.recvmsg_into(
+                        [view[off:off + exp + 1]], anc)
+                    for level, kind, data in ancdata:
+                        if level == socket.SOL_SOCKET and kind == _SO_TIMESTAMPNS:
+                            sec, nsec = _TIMESPEC.unpack_from(data)
+                            ts = sec + nsec * 1e-9
+                else:
+                    nbytes = self.sock.recv_into(view[off:off + exp + 1], exp + 1)
+            except BlockingIOError:
+                break
+            except OSError as e:
+                if getattr(e, "winerror", None) != _WSAEMSGSIZE:
+                    raise
+                nbytes = exp + 1
+            if nbytes != exp:
+                self.stats.on_size_error(nbytes)
+                errs = self.stats.size_errors
+                if errs <= 10 or errs % 1000 == 0:   # don't flood the console
+                    print(f"Unexpected packet size: {nbytes} bytes. Expected {exp} bytes. "
+                          f"({errs} so far)")
+                continue
+            stamps[n] = ts if ts is not None else time.time()
+            n += 1
+        return n
+
+    def _metrics(self):
+        """Scrape-time view of StreamStats (core.metrics collector)."""
+        st = self.stats.snapshot()
+        for key, help in (("packets", "Datagrams received"),
+                          ("bytes", "Payload bytes received"),
+                          ("size_errors", "Datagrams with the wrong size"),
+                          ("gaps", "Sequence gaps in STM32 timestamps"),
+                          ("lost", "Frames estimated lost in gaps"),
+                          ("backwards", "Frames with a timestamp going backwards")):
+            yield f"lat_telemetry_{key}_total", "counter", help, [({}, st[key])]
+        yield "lat_telemetry_publish_errors_total", "counter", \
+            "Batches dropped by an error in decode, ingest or publish", \
+            [({}, self.publish_errors)]
+        yield "lat_telemetry_packets_per_second", "gauge", "Current packet rate", \
+            [({}, st["pps"])]
+        yield "lat_telemetry_jitter_seconds", "gauge", "Inter-arrival standard deviation", \
+            [({}, st["jitter_ms"] / 1e3)]
 
     def stop(self):
+        REGISTRY.collector("telemetry", None)
         self._stop.set()
         try:
             self.sock.close()
@@ -0,0 +1,161 @@
+"""
+Headless bench runner: connect, optionally tare, run a profile or a
+thrust sweep (or just record), then exit with a summary.  Never imports
+DearPyGui or anything under ui/, so it runs over SSH or in a test cell.
+
+    python headless.py --com /dev/ttyACM0 --record run1 --profile profiles/ramp.json
+    python headless.py --com COM5 --sweep 1100:1900:100 --motor 2 --record sweep
+    python headless.py --record idle --duration 60 --format bin   # telemetry only
+
+Unset connection options fall back to the saved GUI settings.
+Exit status: 0 ok, 1 run failed or aborted, 2 stream not clean or, without
+STM32 timestamps, not verifiable (--strict).
+"""
+from __future__ import annotations
+import argparse, json, sys, time
+
+from core.settings    import Settings
+from core.coordinator import AppCoordinator
+from core.logging_utils import log
+from core             import profiles
+from core.sweep       import parse_pwm_table
+from core.stream_stats import verdict
+
+
+def _parse(argv):
+    p = argparse.ArgumentParser(description="Run the motor test bench without the GUI.")
+    conn = p.add_argument_group("connection (default: saved settings)")
+    conn.add_argument("--com", help="MAVLink port, e.g. COM5, /dev/ttyACM0, udpin:0.0.0.0:14550")
+    conn.add_argument("--baud", type=int)
+    conn.add_argument("--ip", help="UDP bind address for STM32 telemetry")
+    conn.add_argument("--port", type=int, help="UDP port for STM32 telemetry")
+
+    run = p.add_argument_group("what to run (pick at most one)")
+    what = run.add_mutually_exclusive_group()
+    what.add_argument("--profile", help="profile file (.json / .csv, see core.profiles)")
+    what.add_argument("--step", metavar="PCT:MS", help="single shot, e.g. 30:2000")
+    what.add_argument("--sweep", metavar="TABLE", help='thrust sweep PWM table, "1100:1900:100" or a list')
+    run.add_argument("--motor", type=int, default=1, help="output channel (1-8)")
+    run.add_argument("--tare", type=float, metavar="S", help="tare thrust/load over S seconds first")
+    run.add_argument("--duration", type=float, default=10.0,
+                     help="seconds to record when nothing is run (default 10)")
+
+    rec = p.add_argument_group("recording")
+    rec.add_argument("--record", metavar="PREFIX", help="log to logs/PREFIX_<time>.<fmt>")
+    rec.add_argument("--format", choices=("csv", "bin"))
+
+    p.add_argument("--strict", action="store_true", help="exit 2 if the stream had gaps or errors, or could not be checked")
+    p.add_argument("--json", action="store_true", help="print the summary as JSON")
+    return p.parse_args(argv)
+
+
+def _settings(args) -> Settings:
+    s = Settings.load()
+    for attr, val in (("com_port", args.com), ("baud", args.baud),
+                      ("stm32_ip", args.ip), ("udp_port", args.port),
+                      ("log_format", args.format)):
+        if val is not None:
+            setattr(s, attr, val)
+    return s
+
+
+def _wait(thread) -> bool:
+    """Join in short slices so Ctrl-C still gets through."""
+    while thread.is_alive():
+        thread.join(0.2)
+    return True
+
+
+def _summary(coord: AppCoordinator, result: dict) -> dict:
+    st = coord.stream_stats()
+    out = {
+        **result,
+        "stream": {k: st[k] for k in ("packets", "pps", "size_errors", "gaps",
+                                      "lost", "backwards", "jitter_ms", "timed", "clean")},
+        "masked": st["masked"],
+        "clock_sync": coord.clock_sync(),
+    }
+    cs = coord.command_stats()
+    if cs:
+        out["commands"] = {k: cs[k] for k in ("sent", "acked", "failed", "unacked")}
+        out["commands"]["latency_ms"] = cs["latency_ms"]
+    return out
+
+
+def main(argv=None) -> int:
+    args = _parse(argv)
+    t_boot = time.perf_counter()
+    coord = AppCoordinator(_settings(args))
+    log(f"Ready in {time.perf_counter() - t_boot:.2f} s")
+
+    needs_motor = args.profile or args.step or args.sweep
+    if needs_motor and not coord.motor:
+        log("❌ Motor controller unavailable – cannot run")
+        coord.shutdown()
+        return 1
+    result = {"ok": True}
+    try:
+        if args.tare:
+            _wait(coord.tare(args.tare))
+        if args.record:
+            coord.start_logging(args.record, args.format)
+            result["recording"] = str(coord.logger.file)
+
+        if args.sweep:
+            sweep = coord.run_sweep(parse_pwm_table(args.sweep), args.motor)
+            _wait(sweep)
+            result["ok"] = len(sweep.rows) == len(sweep.pwm_table)
+            result["sweep"] = {"file": str(sweep.file) if sweep.file else None,
+                               "steps": len(sweep.rows),
+                               "unsettled": sum(not r["settled"] for r in sweep.rows)}
+        elif args.profile or args.step:
+            if args.profile:
+                prof = profiles.load(args.profile)
+            else:
+                pct, ms = (float(v) for v in args.step.split(":"))
+                prof = profiles.step(profiles.pct_to_pwm(pct), ms / 1000)
+            if not coord.motor.arm():
+                raise RuntimeError("could not arm")
+            runner = coord.run_profile(prof, args.motor)
+            _wait(runner)
+            result["ok"] = runner.completed
+            result["profile"] = {"name": prof.name, "setpoints": runner.index,
+                                 "of": len(prof),
+                                 "max_late_ms": round(float(runner.max_late) * 1e3, 3)}
+        else:
+            log(f"Recording telemetry for {args.duration:g} s")
+            time.sleep(args.duration)
+    except KeyboardInterrupt:
+        log("Interrupted")
+        result["ok"] = False
+    except Exception as e:
+        log(f"❌ {e}")
+        result["ok"] = False
+    finally:
+        if coord.motor:
+            coord.stop_all()
+        coord.stop_logging()
+        summary = _summary(coord, result)
+        coord.shutdown()
+
+    if args.json:
+        print(json.dumps(summary, indent=2, default=str))
+    else:
+        s = summary["stream"]
+        gaps = f"{s['gaps']} gaps (~{s['lost']} lost)" if s["timed"] \
+            else "gaps n/a (no STM32 timestamps)"
+        print(f"\n{'OK' if summary['ok'] else 'FAILED'} — stream "
+              f"{verdict(s)}: {s['packets']} pkts, {gaps}, {s['size_errors']} size errors, "
+              f"jitter {s['jitter_ms']:.2f} ms")
+        for key in ("recording", "profile", "sweep", "commands"):
+            if key in summary:
+                print(f"  {key}: {summary[key]}")
+    if not summary["ok"]:
+        return 1
+    if args.strict and summary["stream"]["clean"] is not True:   # unverified fails too
+        return 2
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,17 +1,13 @@
-import dearpygui.dearpygui as dpg
-from ui.connect_dialog import show_connect_dialog
-from ui.main_window   import MainWindow
-from core.coordinator import AppCoordinator
+import time
+_T0 = time.perf_counter()
 
-def _boot(settings):
-    MainWindow(AppCoordinator(settings))
+from utils import startup
+startup.begin(_T0)
 
-def main():
-    dpg.create_context()
-    dpg.create_viewport(title="LAT Motor GUI", width=1300, height=860)
-    show_connect_dialog(_boot)
-    dpg.setup_dearpygui(); dpg.show_viewport()
-    dpg.start_dearpygui(); dpg.destroy_context()
+import dearpygui.dearpygui as dpg
+startup.mark("import dearpygui")
+from ui.main_window   import MainWindow
+startup.mark("import ui")
 
 if __name__ == "__main__":
     MainWindow()
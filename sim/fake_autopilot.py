@@ -0,0 +1,270 @@
+"""
+Fake MAVLink autopilot for running MotorController without a Pixhawk.
+
+Speaks just enough ArduPlane to get through connect, MANUAL mode, arming
+and servo/parameter commands:
+
+    HEARTBEAT             sent at --hb-rate (and right after arm / mode change)
+    SET_MODE              switches custom_mode
+    COMMAND_LONG          ARM_DISARM and DO_SET_SERVO are applied and ACKed
+                          ACCEPTED; anything else gets UNSUPPORTED
+    RC_CHANNELS_OVERRIDE  applied to the outputs (UINT16_MAX / 0 = leave)
+    PARAM_SET             stored and echoed as PARAM_VALUE
+    PARAM_REQUEST_READ    answered from the stored parameters
+
+Replies can be delayed (--latency, --jitter) and incoming or outgoing
+messages dropped (--drop-rx, --drop-tx) to exercise timeouts and retries.
+
+    python -m sim.fake_autopilot                          # → udpout:127.0.0.1:14550
+    python main.py / headless.py --com udpin:0.0.0.0:14550
+
+    python -m sim.fake_autopilot --link pty               # prints /dev/pts/N
+    python headless.py --com /dev/pts/N --step 30:2000    # needs pyserial
+"""
+from __future__ import annotations
+import argparse, heapq, itertools, os, random, threading, time
+from collections import Counter
+from typing import Callable, Dict, List, Optional
+
+from pymavlink import mavutil
+
+__all__ = ["FakeAutopilot"]
+
+mavlink = mavutil.mavlink
+
+# ArduPlane custom modes (the ones MotorController may ask for)
+MODES = {"MANUAL": 0, "CIRCLE": 1, "STABILIZE": 2, "FBWA": 5, "AUTO": 10, "RTL": 11}
+
+
+class _PtyLink(mavutil.mavfile):
+    """MAVLink over the master side of a pseudo-terminal."""
+
+    def __init__(self, **kw):
+        import tty
+        self.fd, slave = os.openpty()
+        tty.setraw(slave)                       # binary clean, no echo
+        self.slave_fd = slave                   # keep it open: no EIO on read
+        self.device = os.ttyname(slave)
+        os.set_blocking(self.fd, False)
+        mavutil.mavfile.__init__(self, self.fd, self.device, **kw)
+
+    def recv(self, n=None):
+        try:
+            return os.read(self.fd, n or 4096)
+        except (BlockingIOError, OSError):
+            return b""
+
+    def write(self, buf):
+        return os.write(self.fd, buf)
+
+    def close(self):
+        for fd in (self.fd, self.slave_fd):
+            try:
+                os.close(fd)
+            except OSError:
+                pass
+
+
+class FakeAutopilot(threading.Thread):
+    """
+    One reader thread (this) applies incoming messages; replies and
+    heartbeats leave from a second thread after their scheduled delay, so
+    only that thread ever writes to the link.
+
+    `servos` (1-16 → µs), `params`, `armed` and `custom_mode` are the
+    vehicle state; `stats` counts traffic.
+    """
+
+    def __init__(self, link: str = "udpout:127.0.0.1:14550", hb_rate: float = 1.0,
+                 latency: float = 0.0, jitter: float = 0.0,
+                 drop_rx: float = 0.0, drop_tx: float = 0.0,
+                 deny_arm: bool = False, seed: Optional[int] = None,
+                 vehicle_type: int = mavlink.MAV_TYPE_FIXED_WING):
+        super().__init__(daemon=True)
+        kw = dict(source_system=1, source_component=1)
+        self.link = _PtyLink(**kw) if link == "pty" else \
+            mavutil.mavlink_connection(link, **kw)
+        self.device = getattr(self.link, "device", link)
+        self.hb_rate = hb_rate
+        self.latency, self.jitter = latency, jitter
+        self.drop_rx, self.drop_tx = drop_rx, drop_tx
+        self.deny_arm = deny_arm
+        self.vehicle_type = vehicle_type
+        self.rng = random.Random(seed)
+
+        self.armed = False
+        self.custom_mode = MODES["STABILIZE"]   # so connecting exercises SET_MODE
+        self.servos: Dict[int, int] = {}
+        self.params: Dict[str, float] = {}
+        self.stats: Counter = Counter()
+
+        self._halt = threading.Event()
+        self._cv = threading.Condition()
+        self._queue: List = []                  # (due, seq, send(mav))
+        self._seq = itertools.count()
+        self._tx = threading.Thread(target=self._tx_loop, daemon=True)
+
+    def stop(self):
+        self._halt.set()
+        with self._cv:
+            self._cv.notify()
+
+    # ── outgoing ──────────────────────────────────────────────────────
+    def _schedule(self, send: Callable, delay: Optional[float] = None):
+        if delay is None:
+            delay = self.latency + (self.rng.uniform(0, self.jitter) if self.jitter else 0)
+        with self._cv:
+            heapq.heappush(self._queue, (time.monotonic() + delay, next(self._seq), send))
+            self._cv.notify()
+
+    def _heartbeat(self, mav):
+        base = mavlink.MAV_MODE_FLAG_CUSTOM_MODE_ENABLED \
+            | mavlink.MAV_MODE_FLAG_MANUAL_INPUT_ENABLED
+        if self.armed:
+            base |= mavlink.MAV_MODE_FLAG_SAFETY_ARMED
+        status = mavlink.MAV_STATE_ACTIVE if self.armed else mavlink.MAV_STATE_STANDBY
+        mav.heartbeat_send(self.vehicle_type, mavlink.MAV_AUTOPILOT_ARDUPILOTMEGA,
+                           base, self.custom_mode, status)
+
+    def _tx_loop(self):
+        next_hb = time.monotonic() if self.hb_rate else float("inf")
+        while not self._halt.is_set():
+            now = time.monotonic()
+            if now >= next_hb:
+                self._push(self._heartbeat, "HEARTBEAT")
+                next_hb = now + 1.0 / self.hb_rate
+            with self._cv:
+                due = []
+                while self._queue and self._queue[0][0] <= now:
+                    due.append(heapq.heappop(self._queue)[2])
+                if not due:
+                    nxt = min(self._queue[0][0], next_hb) if self._queue else next_hb
+                    self._cv.wait(min(nxt - now, 1.0))
+                    continue
+            for send in due:
+                self._push(send)
+
+    def _push(self, send: Callable, kind: str = "reply"):
+        if self.drop_tx and self.rng.random() < self.drop_tx:
+            self.stats["tx_dropped"] += 1
+            return
+        try:
+            send(self.link.mav)
+            self.stats[f"tx_{kind}"] += 1
+        except OSError:
+            self.stats["tx_errors"] += 1
+
+    # ── incoming ──────────────────────────────────────────────────────
+    def run(self):
+        self._tx.start()
+        while not self._halt.is_set():
+            msg = self.link.recv_match(blocking=True, timeout=0.2)
+            if msg is None:
+                continue
+            kind = msg.get_type()
+            if kind == "BAD_DATA":
+                continue
+            if self.drop_rx and self.rng.random() < self.drop_rx:
+                self.stats["rx_dropped"] += 1
+                continue
+            self.stats[kind] += 1
+            handler = getattr(self, f"_on_{kind.lower()}", None)
+            if handler:
+                handler(msg)
+        self._tx.join(timeout=1.0)
+        self.link.close()
+
+    def _ack(self, command: int, result: int):
+        self._schedule(lambda mav: mav.command_ack_send(command, result))
+
+    def _on_set_mode(self, msg):
+        self.custom_mode = msg.custom_mode
+        self._schedule(self._heartbeat)
+
+    def _on_command_long(self, msg):
+        cmd = msg.command
+        if cmd == mavlink.MAV_CMD_COMPONENT_ARM_DISARM:
+            if msg.param1 and self.deny_arm:
+                self._ack(cmd, mavlink.MAV_RESULT_DENIED)
+                return
+            self.armed = bool(msg.param1)
+            self._ack(cmd, mavlink.MAV_RESULT_ACCEPTED)
+            self._schedule(self._heartbeat)
+        elif cmd == mavlink.MAV_CMD_DO_SET_SERVO:
+            ch = int(msg.param1)
+            if not 1 <= ch <= 16:
+                self._ack(cmd, mavlink.MAV_RESULT_DENIED)
+                return
+            self.servos[ch] = int(msg.param2)
+            self._ack(cmd, mavlink.MAV_RESULT_ACCEPTED)
+        else:
+            self._ack(cmd, mavlink.MAV_RESULT_UNSUPPORTED)
+
+    def _on_rc_channels_override(self, msg):
+        for ch in range(1, 9):
+            v = getattr(msg, f"chan{ch}_raw")
+            if v not in (0, 0xFFFF):
+                self.servos[ch] = int(v)
+
+    def _param_value(self, name: str):
+        value = self.params[name]
+        index = list(self.params).index(name)
+        return lambda mav: mav.param_value_send(
+            name.encode(), value, mavlink.MAV_PARAM_TYPE_REAL32,
+            len(self.params), index)
+
+    def _on_param_set(self, msg):
+        name = _param_name(msg.param_id)
+        self.params[name] = float(msg.param_value)
+        self._schedule(self._param_value(name))
+
+    def _on_param_request_read(self, msg):
+        name = _param_name(msg.param_id)
+        if name in self.params:
+            self._schedule(self._param_value(name))
+
+    def summary(self) -> str:
+        s = self.stats
+        return (f"rx: {s['COMMAND_LONG']} COMMAND_LONG, {s['RC_CHANNELS_OVERRIDE']} "
+                f"RC_OVERRIDE, {s['PARAM_SET']} PARAM_SET, {s['SET_MODE']} SET_MODE, "
+                f"{s['rx_dropped']} dropped; tx: {s['tx_reply']} replies, "
+                f"{s['tx_HEARTBEAT']} heartbeats, {s['tx_dropped']} dropped; "
+                f"armed={self.armed} servos={dict(sorted(self.servos.items()))}")
+
+
+def _param_name(pid) -> str:
+    return (pid.decode() if isinstance(pid, bytes) else pid).rstrip("\x00")
+
+
+def _parse(argv):
+    p = argparse.ArgumentParser(description="Fake MAVLink autopilot for bench testing.")
+    p.add_argument("--link", default="udpout:127.0.0.1:14550",
+                   help='pymavlink connection string, or "pty" for a pseudo-terminal')
+    p.add_argument("--hb-rate", type=float, default=1.0, help="heartbeats per second")
+    p.add_argument("--latency", type=float, default=0.0, help="reply delay, seconds")
+    p.add_argument("--jitter", type=float, default=0.0, help="extra random delay, 0..S")
+    p.add_argument("--drop-rx", type=float, default=0.0, help="incoming drop probability")
+    p.add_argument("--drop-tx", type=float, default=0.0, help="outgoing drop probability")
+    p.add_argument("--deny-arm", action="store_true", help="refuse to arm")
+    p.add_argument("--seed", type=int)
+    return p.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = _parse(argv)
+    ap = FakeAutopilot(args.link, args.hb_rate, args.latency, args.jitter,
+                       args.drop_rx, args.drop_tx, args.deny_arm, args.seed)
+    print(f"Fake autopilot on {ap.device} (Ctrl-C to stop)")
+    ap.start()
+    try:
+        while ap.is_alive():
+            ap.join(0.5)
+    except KeyboardInterrupt:
+        ap.stop()
+        ap.join(2.0)
+    print(ap.summary())
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,293 @@
+"""
+STM32 telemetry simulator / UDP load generator.
+
+Sends valid 56-byte MeasurementFrame datagrams at a fixed rate (10 Hz to
+50 kHz and beyond), so the receiver, ingest, logger and GUI can be run
+and load-tested without the bench hardware.
+
+    python -m sim.stm32_sim --rate 1000                         # default scene
+    python -m sim.stm32_sim --rate 50000 --duration 30 --loss 0.001
+    python -m sim.stm32_sim --wave "current=ramp:0:30:10+noise:0:0.2" \\
+                            --sentinel 0.01 --sentinel-fields thrust1,load
+    python -m sim.stm32_sim --reorder 0.02 --burst-every 2 --burst-len 0.1
+
+Channel values, losses and sentinels are a function of the sample index
+and --seed only (each has its own random stream), so a run is reproducible
+whatever the host scheduling did.  Waveform terms, summed with "+":
+
+    const:v                 v
+    step:lo:hi:t            lo before t seconds, hi after
+    square:lo:hi:period     alternates lo / hi every period/2
+    ramp:v0:v1:T            v0 → v1 over T seconds, repeating
+    sine:mean:amp:hz        mean + amp·sin(2π·hz·t)
+    noise:mean:std          Gaussian
+
+Impairments:
+    --loss p                drop each datagram with probability p
+    --reorder p             hold a datagram back behind the next --reorder-depth
+    --burst-every/-len      every S seconds hold datagrams for L seconds, then
+                            send them back-to-back (Wi-Fi / switch hiccup)
+    --sentinel p            replace --sentinel-fields values with 2^31 (no reading)
+"""
+from __future__ import annotations
+import argparse, math, socket, threading, time
+from collections import deque
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from core.measurement import FIELD_NAMES, FRAME_DTYPE, FRAME_SIZE
+from core.filters import SENTINELS
+
+__all__ = ["Waveform", "Stm32Sim", "DEFAULT_SCENE"]
+
+# channels (not timestamps) the simulator generates
+CHANNELS = tuple(n for n in FIELD_NAMES if not n.endswith("_timestamp"))
+
+DEFAULT_SCENE: Dict[str, str] = {
+    "voltage":     "const:24+noise:0:0.05",
+    "current":     "ramp:0:20:10+noise:0:0.1",
+    "rpm":         "ramp:0:15000:10+noise:0:20",
+    "temperature": "ramp:30:45:60+noise:0:0.1",
+    "torque":      "ramp:0:1.5:10+noise:0:0.01",
+    "load":        "square:0:2:4+noise:0:0.005",
+    **{f"thrust{i}": f"ramp:0:500:10+noise:0:{1 + i}" for i in range(1, 7)},
+}
+
+_KINDS = {"const": 1, "step": 3, "square": 3, "ramp": 3, "sine": 3, "noise": 2}
+
+
+class Waveform:
+    """Sum of waveform terms, evaluated on arrays of sample times."""
+
+    def __init__(self, spec: str):
+        self.spec = spec
+        self.terms = []
+        for term in spec.split("+"):
+            kind, *args = term.strip().split(":")
+            if kind not in _KINDS:
+                raise ValueError(f"Unknown waveform {kind!r} in {spec!r} "
+                                 f"({', '.join(_KINDS)})")
+            if len(args) != _KINDS[kind]:
+                raise ValueError(f"{kind} takes {_KINDS[kind]} arguments, "
+                                 f"got {len(args)} in {spec!r}")
+            self.terms.append((kind, [float(a) for a in args]))
+
+    def __call__(self, t: np.ndarray, rng: np.random.Generator) -> np.ndarray:
+        y = np.zeros(len(t))
+        for kind, a in self.terms:
+            if kind == "const":
+                y += a[0]
+            elif kind == "step":
+                y += np.where(t < a[2], a[0], a[1])
+            elif kind == "square":
+                y += np.where((t % a[2]) < a[2] / 2, a[0], a[1])
+            elif kind == "ramp":
+                y += a[0] + (a[1] - a[0]) * ((t % a[2]) / a[2])
+            elif kind == "sine":
+                y += a[0] + a[1] * np.sin(2 * math.pi * a[2] * t)
+            else:
+                y += rng.normal(a[0], a[1], len(t))
+        return y
+
+
+class Stm32Sim(threading.Thread):
+    """
+    Paced UDP sender.  Each wakeup generates every frame that is due by
+    now in one NumPy step and sends them, so high rates cost one syscall
+    per datagram and no per-frame Python arithmetic.
+
+    `duration` None runs until stop(); `stats` holds the counters.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 5005,
+                 rate: float = 1000.0, duration: Optional[float] = None,
+                 waves: Optional[Dict[str, str]] = None, seed: int = 0,
+                 loss: float = 0.0, reorder: float = 0.0, reorder_depth: int = 3,
+                 burst_every: float = 0.0, burst_len: float = 0.0,
+                 sentinel: float = 0.0, sentinel_fields: Sequence[str] = ("load",),
+                 clock_scale: float = 1.0, pixhawk_offset: float = 1000.0):
+        super().__init__(daemon=True)
+        if rate <= 0:
+            raise ValueError("rate must be > 0")
+        scene = dict(DEFAULT_SCENE, **(waves or {}))
+        unknown = [k for k in list(scene) + list(sentinel_fields) if k not in CHANNELS]
+        if unknown:
+            raise ValueError(f"Unknown channels {unknown} (have {', '.join(CHANNELS)})")
+        self.waves = {k: Waveform(v) for k, v in scene.items()}
+        self.target = (host, port)
+        self.rate, self.duration = float(rate), duration
+        self.loss, self.reorder, self.reorder_depth = loss, reorder, max(1, reorder_depth)
+        self.burst_every, self.burst_len = burst_every, burst_len
+        self.sentinel, self.sentinel_fields = sentinel, list(sentinel_fields)
+        self.clock_scale, self.pixhawk_offset = clock_scale, pixhawk_offset
+        # one random stream per use, so chunking does not change the draws
+        streams = list(self.waves) + [f"sentinel:{f}" for f in self.sentinel_fields] \
+            + ["loss", "reorder"]
+        self._rng = {k: np.random.default_rng([seed, i]) for i, k in enumerate(streams)}
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, 4 * 1024 * 1024)
+        self._halt = threading.Event()
+        self._late: List[list] = []                 # [frames still to pass, datagram]
+        self.stats = {"generated": 0, "sent": 0, "dropped": 0, "reordered": 0,
+                      "sentinels": 0, "send_errors": 0, "elapsed": 0.0}
+
+    def stop(self):
+        self._halt.set()
+
+    # ── frame generation ───────────────────────────────────────────────
+    def frames(self, n0: int, n1: int) -> np.ndarray:
+        """Frames for sample indices n0 ≤ n < n1 (FRAME_DTYPE)."""
+        t = np.arange(n0, n1) / self.rate
+        out = np.zeros(n1 - n0, dtype=FRAME_DTYPE)
+        out["stm32_timestamp"] = t * self.clock_scale
+        out["pixhawk_timestamp"] = (t + self.pixhawk_offset) * self.clock_scale
+        for name, wave in self.waves.items():
+            out[name] = wave(t, self._rng[name])
+        if self.sentinel:
+            for name in self.sentinel_fields:
+                hit = self._rng[f"sentinel:{name}"].random(len(out)) < self.sentinel
+                out[name][hit] = SENTINELS[0]
+                self.stats["sentinels"] += int(hit.sum())
+        return out
+
+    def _impair(self, frames: np.ndarray) -> List[int]:
+        """Rows that survive loss (indices, in order)."""
+        n = len(frames)
+        keep = self._rng["loss"].random(n) >= self.loss if self.loss else np.ones(n, bool)
+        self.stats["dropped"] += int(n - keep.sum())
+        return np.flatnonzero(keep).tolist()
+
+    def _reorder(self, datagrams: List[bytes]) -> List[bytes]:
+        """
+        Hold each datagram back with probability `reorder` until
+        `reorder_depth` later ones have gone out.  Held datagrams carry over
+        between wakeups, so this works at any rate.
+        """
+        if not self.reorder:
+            return datagrams
+        late = self._rng["reorder"].random(len(datagrams)) < self.reorder
+        out = []
+        for d, hold in zip(datagrams, late.tolist()):
+            if hold:
+                self._late.append([self.reorder_depth, d])
+                continue
+            out.append(d)
+            for entry in self._late:
+                entry[0] -= 1
+            while self._late and self._late[0][0] <= 0:
+                out.append(self._late.pop(0)[1])
+                self.stats["reordered"] += 1
+        return out
+
+    def _holding(self, t: float) -> bool:
+        return bool(self.burst_every and self.burst_len) and \
+            (t % self.burst_every) >= self.burst_every - self.burst_len
+
+    # ── pacing loop ─────────────────────────────────────────────────────
+    def run(self):
+        sent_upto = 0
+        held: deque = deque()
+        t0 = time.perf_counter()
+        tick = min(1e-3, 1.0 / self.rate)           # ≤ 1 ms wakeups
+        end = None if self.duration is None else int(self.duration * self.rate)
+        while not self._halt.is_set():
+            elapsed = time.perf_counter() - t0
+            due = int(elapsed * self.rate) + 1
+            if end is not None:
+                due = min(due, end)
+            if due > sent_upto:
+                frames = self.frames(sent_upto, due)
+                self.stats["generated"] += len(frames)
+                raw = frames.view(np.uint8).reshape(len(frames), FRAME_SIZE)
+                held.extend(self._reorder([raw[i].tobytes() for i in self._impair(frames)]))
+                sent_upto = due
+            if held and not self._holding(elapsed):
+                self._send(held)
+            if end is not None and sent_upto >= end and not held:
+                held.extend(d for _, d in self._late)   # nothing left to pass them
+                self._late.clear()
+                if not held:
+                    break
+            wait = sent_upto / self.rate - (time.perf_counter() - t0)
+            if end is not None and sent_upto >= end:
+                wait = tick                         # only a burst hold left
+            time.sleep(min(max(wait, 0.0), tick))
+        held.extend(d for _, d in self._late)
+        self._late.clear()
+        if held:
+            self._send(held)
+        self.stats["elapsed"] = time.perf_counter() - t0
+        self.sock.close()
+
+    def _send(self, held: deque):
+        sendto, target = self.sock.sendto, self.target
+        while held:
+            try:
+                sendto(held.popleft(), target)
+                self.stats["sent"] += 1
+            except BlockingIOError:
+                time.sleep(0)                       # socket buffer full
+            except OSError:
+                self.stats["send_errors"] += 1
+
+    def summary(self) -> str:
+        s = self.stats
+        rate = s["sent"] / s["elapsed"] if s["elapsed"] else 0.0
+        return (f"sent {s['sent']} of {s['generated']} frames in {s['elapsed']:.2f} s "
+                f"({rate:,.0f}/s, target {self.rate:,.0f}/s); dropped {s['dropped']}, "
+                f"reordered {s['reordered']}, sentinels {s['sentinels']}, "
+                f"send errors {s['send_errors']}")
+
+
+def _parse(argv):
+    p = argparse.ArgumentParser(description="Simulate the STM32 telemetry stream over UDP.")
+    p.add_argument("--host", default="127.0.0.1")
+    p.add_argument("--port", type=int, default=5005)
+    p.add_argument("--rate", type=float, default=1000.0, help="frames per second")
+    p.add_argument("--duration", type=float, help="seconds (default: until Ctrl-C)")
+    p.add_argument("--wave", action="append", default=[], metavar="CH=SPEC",
+                   help='channel waveform, e.g. "rpm=ramp:0:12000:5" (repeatable)')
+    p.add_argument("--seed", type=int, default=0)
+    p.add_argument("--clock-scale", type=float, default=1.0,
+                   help="device timestamp units per second")
+    imp = p.add_argument_group("impairments")
+    imp.add_argument("--loss", type=float, default=0.0)
+    imp.add_argument("--reorder", type=float, default=0.0)
+    imp.add_argument("--reorder-depth", type=int, default=3)
+    imp.add_argument("--burst-every", type=float, default=0.0, metavar="S")
+    imp.add_argument("--burst-len", type=float, default=0.0, metavar="S")
+    imp.add_argument("--sentinel", type=float, default=0.0)
+    imp.add_argument("--sentinel-fields", default="load")
+    return p.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = _parse(argv)
+    waves = {}
+    for w in args.wave:
+        ch, _, spec = w.partition("=")
+        waves[ch.strip()] = spec
+    try:
+        sim = Stm32Sim(args.host, args.port, args.rate, args.duration, waves, args.seed,
+                       args.loss, args.reorder, args.reorder_depth,
+                       args.burst_every, args.burst_len,
+                       args.sentinel, [f for f in args.sentinel_fields.split(",") if f],
+                       args.clock_scale)
+    except ValueError as e:
+        print(f"❌ {e}")
+        return 2
+    print(f"Sending {args.rate:g} frames/s to {args.host}:{args.port} (Ctrl-C to stop)")
+    sim.start()
+    try:
+        while sim.is_alive():
+            sim.join(0.2)
+    except KeyboardInterrupt:
+        sim.stop()
+        sim.join()
+    print(sim.summary())
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
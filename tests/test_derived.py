@@ -0,0 +1,56 @@
+"""Derived channels on the view branch, where sentinels are masked to NaN."""
+import csv, pathlib
+
+import numpy as np
+
+from core.calibration import CalibrationSet, CalibrationStage
+from core.derived import DerivedChannels, DEFAULT_DERIVED
+from core.filters import ValidityMask, ChannelFilters, SENTINELS
+from core.ingest import IngestPipeline
+from core.measurement import FIELD_NAMES, RECORD_DTYPE
+
+LOG = pathlib.Path(__file__).resolve().parent.parent / "logs" / "Test101_20250725_152924.csv"
+
+
+def _pipeline():
+    return IngestPipeline(
+        [CalibrationStage(CalibrationSet()), DerivedChannels(DEFAULT_DERIVED)],
+        view_stages=[ValidityMask(FIELD_NAMES), ChannelFilters({}),
+                     DerivedChannels(DEFAULT_DERIVED)])
+
+
+def _view(rows: np.ndarray) -> np.ndarray:
+    ingest = _pipeline()
+    sub = ingest.view_bus.subscribe("test", capacity=len(rows))
+    ingest.publish(rows)
+    return sub.get_batch(timeout=1.0)
+
+
+def test_thrust_total_skips_disconnected_cells():
+    rows = np.zeros(4, dtype=RECORD_DTYPE)
+    for i, f in enumerate(("thrust1", "thrust2", "thrust3", "thrust4", "thrust5", "thrust6")):
+        rows[f] = 10.0 * (i + 1)
+    rows["thrust2"] = rows["thrust4"] = SENTINELS[0]
+    rows["thrust5"][1:] = SENTINELS[0]
+    rows["thrust1"][3] = np.nan
+    for f in ("thrust1", "thrust3", "thrust6"):
+        rows[f][2] = SENTINELS[0]
+    rows["voltage"], rows["current"] = 10.0, 2.0
+
+    v = _view(rows)
+    assert np.allclose(v["thrust_total"][:2], [10 + 30 + 50 + 60, 10 + 30 + 60])
+    assert np.isnan(v["thrust_total"][2])       # nothing connected
+    assert np.isclose(v["thrust_total"][3], 30 + 60)
+    assert np.isclose(v["thrust_per_motor"][1], (10 + 30 + 60) / 3)
+    assert np.isclose(v["g_per_w"][0], 150 / 20.0)
+
+
+def test_thrust_total_finite_on_recorded_log():
+    with LOG.open() as fh:
+        recs = [r for _, r in zip(range(200), csv.DictReader(fh))]
+    rows = np.zeros(len(recs), dtype=RECORD_DTYPE)
+    for f in FIELD_NAMES:
+        rows[f] = [float(r[f]) for r in recs]
+    v = _view(rows)
+    assert np.isfinite(v["thrust_total"]).all()
+    assert np.isfinite(v["thrust_per_motor"]).all()
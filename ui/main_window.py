@@ -1,4 +1,5 @@
-import threading, time, queue
+import dataclasses, threading, time
+import numpy as np
 import dearpygui.dearpygui as dpg
 import os,sys
 
@@ -6,13 +7,18 @@ import os,sys
 core_path = os.path.join(os.path.dirname(__file__), 'core')
 sys.path.append(core_path)
 
-# Now import the shared_state module
-from core.shared_state import armed_status
-
 from utils.gauge         import create_gauge, update_gauge
-from core.coordinator    import AppCoordinator
+from utils               import widgets, startup
+from utils.decimate      import DecimatedHistory
 from core.settings       import Settings
-from core.logger         import DataLogger
+from core.measurement    import MeasurementFrame
+from core                import profiles
+from core.sweep          import parse_pwm_table
+from core.metrics        import REGISTRY
+
+_M_TICK    = REGISTRY.histogram("lat_ui_tick_seconds", "MainWindow refresh (_updater) time")
+_M_DISPLAY = REGISTRY.gauge("lat_ui_display_latency_seconds",
+                            "Receive time of the newest sample to its frame on screen")
 
 class MainWindow:
     _GAUGES = [
@@ -27,30 +33,38 @@ class MainWindow:
     # Extended plot variables to include all individual data fields
     _PLOT_VARS = [
         "Voltage", "Current", "RPM", "Temperature", "Power", "Torque", "Load",
-        "Total_Thrust", "Thrust1", "Thrust2", "Thrust3", "Thrust4", "Thrust5", "Thrust6",
+        "Total_Thrust", "Efficiency", "Thrust1", "Thrust2", "Thrust3", "Thrust4", "Thrust5", "Thrust6",
         "STM32_Timestamp", "Pixhawk_Timestamp"
     ]
 
-    def __init__(self):
+    def __init__(self, refresh_hz: float = 60.0, run: bool = True):
+        """
+        Build the UI and, with `run`, show it and block in the render loop.
+        run=False leaves a headless context (no viewport) for benchmarks;
+        the caller destroys it.
+        """
         self.coord         = None
+        self.refresh_hz    = refresh_hz   # UI refreshes per second (≤ render rate)
         self._pending_pct  = 0
         self.plot_ch1      = "Voltage"
         self.plot_ch2      = "Current"
-        self.hist          = {k: [] for k in ["t"] + self._PLOT_VARS}
+        self.hist          = DecimatedHistory(self._PLOT_VARS)
+        self.plot_window_s = 5.0
+        self.plot_follow   = True
         self._t0           = time.time()
         self.is_recording  = False
-        self.data_logger   = None
         self.plot_series1  = None
         self.plot_series2  = None
 
         # Connection status tracking
         self.udp_connected = False
         self.serial_connected = False
-        self.is_armed = False  # Track armed status for change detection
+        self.is_armed = False  # last armed state shown
         self.last_data_time = 0
-        
-        # Queue for DataLogger
-        self.log_queue     = queue.Queue()
+        self.display_latency     = 0.0
+        self.display_latency_max = 0.0
+        self._next_stream_panel  = 0.0
+        self._next_metrics_panel = 0.0
 
         dpg.create_context()
         dpg.create_viewport(title="LAT Motor GUI", width=1400, height=950)
@@ -123,6 +137,32 @@ class MainWindow:
                     dpg.add_button(label="Disarm", callback=self._on_disarm, width=330)
                     # Melody Control - Add this new button
                     dpg.add_button(label="🎵 Play Happy Birthday", callback=self._on_play_melody, width=330)
+                    # Setpoint profile from file (see core.profiles)
+                    dpg.add_input_text(tag="profile_path", label="Profile",
+                                       hint="profiles/ramp.json", width=270)
+                    with dpg.group(horizontal=True):
+                        dpg.add_button(label="Run Profile", width=162,
+                                       callback=self._on_run_profile)
+                        dpg.add_button(label="Stop Profile", width=162,
+                                       callback=lambda: self._do_if(
+                                           lambda c: c.stop_profile()))
+                    # Unattended thrust curve (see core.sweep)
+                    dpg.add_input_text(tag="sweep_table", label="Sweep PWM",
+                                       default_value="1100:1900:100", width=250)
+                    with dpg.group(horizontal=True):
+                        dpg.add_button(label="Thrust Sweep", width=162,
+                                       callback=self._on_sweep)
+                        dpg.add_button(label="Stop Sweep", width=162,
+                                       callback=lambda: self._do_if(
+                                           lambda c: c.stop_sweep()))
+                    # Zero the load cells (see core.calibration)
+                    with dpg.group(horizontal=True):
+                        dpg.add_input_float(tag="tare_seconds", label="s",
+                                            default_value=2.0, min_value=0.2,
+                                            min_clamped=True, step=0, width=80)
+                        dpg.add_button(label="Tare Thrust/Load", width=230,
+                                       callback=lambda: self._do_if(
+                                           lambda c: c.tare(dpg.get_value("tare_seconds"))))
 
                     dpg.add_separator()
 
@@ -150,7 +190,8 @@ class MainWindow:
                         ("power_text",       "Power: 0.00 W"),
                         ("torque_text",      "Torque: 0.00 Nm"),
                         ("load_text",        "Load: 0.00 kg"),
-                        ("throttle_text",    "Throttle: 0%")
+                        ("throttle_text",    "Throttle: 0%"),
+                        ("latency_text",     "Display latency: -")
                     ]:
                         dpg.add_text(tag=tag, default_value=text)
                     
@@ -169,6 +210,24 @@ class MainWindow:
                     ]:
                         dpg.add_text(tag=tag, default_value=text)
 
+                    dpg.add_separator()
+
+                    # UDP stream health (TelemetryReceiver.stats)
+                    dpg.add_text("Stream Health", bullet=True)
+                    for tag, text in [
+                        ("stream_state_text",  "Stream: -"),
+                        ("stream_rate_text",   "Rate: 0 pkt/s, 0.0 kB/s"),
+                        ("stream_error_text",  "Size errors: 0"),
+                        ("stream_gap_text",    "Gaps: 0 (~0 lost)"),
+                        ("stream_jitter_text", "Inter-arrival: - ms ± - ms"),
+                        ("stream_drop_text",   "Bus drops: -"),
+                        ("cmd_ack_text",       "Cmd ack: -"),
+                        ("cmd_fail_text",      "Cmd failed: 0, unacked: 0"),
+                    ]:
+                        dpg.add_text(tag=tag, default_value=text)
+                    dpg.add_button(label="Metrics…", width=330,
+                                   callback=lambda: dpg.show_item("metrics_window"))
+
                 # ---- RIGHT PANEL ----
                 with dpg.child_window(autosize_x=True, autosize_y=True):
                     # Gauges
@@ -176,11 +235,21 @@ class MainWindow:
                         for tag, lbl, rng in self._GAUGES:
                             create_gauge(tag, lbl, rng)
 
+                    # Plot range: follow the newest N seconds, or free pan/zoom
+                    with dpg.group(horizontal=True):
+                        dpg.add_input_float(label="Window (s)", width=120,
+                                            default_value=self.plot_window_s,
+                                            min_value=1.0, max_value=3600.0,
+                                            min_clamped=True, max_clamped=True,
+                                            callback=lambda s,a,u: setattr(self, "plot_window_s", a))
+                        dpg.add_checkbox(label="Follow live", default_value=True,
+                                         callback=lambda s,a,u: self._set_follow(a))
+
                     # First live plot
                     dpg.add_combo(self._PLOT_VARS, label="Plot #1",
                                   default_value=self.plot_ch1,
                                   callback=lambda s,a,u: setattr(self, "plot_ch1", a))
-                    with dpg.plot(label="Live Plot #1", height=300, width=-1):
+                    with dpg.plot(label="Live Plot #1", tag="plot1", height=300, width=-1):
                         dpg.add_plot_axis(dpg.mvXAxis, label="Time (s)", tag="x_axis1")
                         with dpg.plot_axis(dpg.mvYAxis, label="Value", tag="y_axis1"):
                             self.plot_series1 = dpg.add_line_series([], [], tag="plot_series1")
@@ -191,7 +260,7 @@ class MainWindow:
                     dpg.add_combo(self._PLOT_VARS, label="Plot #2",
                                   default_value=self.plot_ch2,
                                   callback=lambda s,a,u: setattr(self, "plot_ch2", a))
-                    with dpg.plot(label="Live Plot #2", height=300, width=-1):
+                    with dpg.plot(label="Live Plot #2", tag="plot2", height=300, width=-1):
                         dpg.add_plot_axis(dpg.mvXAxis, label="Time (s)", tag="x_axis2")
                         with dpg.plot_axis(dpg.mvYAxis, label="Value", tag="y_axis2"):
                             self.plot_series2 = dpg.add_line_series([], [], tag="plot_series2")
@@ -199,15 +268,26 @@ class MainWindow:
         # Popup for log prefix
         with dpg.window(label="Log Filename Prefix",
                         modal=True, show=False,
-                        tag="log_popup", width=300, height=120):
+                        tag="log_popup", width=300, height=150):
             dpg.add_text("Enter prefix:")
             self.logname_tag = dpg.add_input_text(tag="log_name_input", width=260)
+            saved_fmt = Settings.load().log_format
+            self.logfmt_tag  = dpg.add_combo(["csv", "bin"], tag="log_format_combo",
+                                             label="Format", width=200,
+                                             default_value=saved_fmt if saved_fmt in ("csv", "bin")
+                                             else "csv",
+                                             callback=self._on_log_format)
             dpg.add_button(label="Start Recording",
                            callback=self._on_start_logging, width=260)
             dpg.add_button(label="Cancel",
                            callback=lambda: dpg.hide_item("log_popup"),
                            width=260)
 
+        # Everything in core.metrics (same as http://127.0.0.1:<port>/metrics)
+        with dpg.window(label="Metrics", tag="metrics_window", show=False,
+                        width=640, height=560, pos=(380, 60)):
+            dpg.add_text("", tag="metrics_text")
+
         # Create themes for line colors
         with dpg.theme() as self.red_theme:
             with dpg.theme_component(dpg.mvLineSeries):
@@ -258,11 +338,13 @@ class MainWindow:
         dpg.bind_item_theme(self.plot_series1, self.blue_theme)
         dpg.bind_item_theme(self.plot_series2, self.blue_theme)
 
+        startup.mark("build ui")
+        if not run:
+            return
         dpg.setup_dearpygui()
         dpg.show_viewport()
-        threading.Thread(target=self._updater, daemon=True).start()
         dpg.set_primary_window("main_window", True)
-        dpg.start_dearpygui()
+        self._render_loop()
         dpg.destroy_context()
 
     def _update_connection_status(self):
@@ -287,22 +369,22 @@ class MainWindow:
         
         # Update UDP status button
         if self.udp_connected:
-            dpg.set_item_label("udp_status_btn", "● UDP Connected")
-            dpg.bind_item_theme("udp_status_btn", self.green_status_theme)
+            widgets.set_label("udp_status_btn", "● UDP Connected")
+            widgets.bind_theme("udp_status_btn", self.green_status_theme)
         else:
-            dpg.set_item_label("udp_status_btn", "● UDP Disconnected")
-            dpg.bind_item_theme("udp_status_btn", self.red_status_theme)
+            widgets.set_label("udp_status_btn", "● UDP Disconnected")
+            widgets.bind_theme("udp_status_btn", self.red_status_theme)
         
         # Update Serial status button
         if self.serial_connected:
-            dpg.set_item_label("serial_status_btn", f"● Serial Connected ({time_since_heartbeat:.1f}s)")
-            dpg.bind_item_theme("serial_status_btn", self.green_status_theme)
+            widgets.set_label("serial_status_btn", f"● Serial Connected ({time_since_heartbeat:.1f}s)")
+            widgets.bind_theme("serial_status_btn", self.green_status_theme)
         else:
             if time_since_heartbeat == float('inf'):
-                dpg.set_item_label("serial_status_btn", "● Serial Disconnected")
+                widgets.set_label("serial_status_btn", "● Serial Disconnected")
             else:
-                dpg.set_item_label("serial_status_btn", f"● Serial Lost ({time_since_heartbeat:.1f}s ago)")
-            dpg.bind_item_theme("serial_status_btn", self.red_status_theme)
+                widgets.set_label("serial_status_btn", f"● Serial Lost ({time_since_heartbeat:.1f}s ago)")
+            widgets.bind_theme("serial_status_btn", self.red_status_theme)
 
     def _do_if(self, fn):
         if self.coord:
@@ -348,39 +430,18 @@ class MainWindow:
              "D4#": 311.13  # Sharper D4 as discussed
         }
 
-        try:
-            # Play the melody twice
-            for loop_num in range(1, 3):
-                print(f"\n🎵 Playing loop {loop_num}/2")
-                
-                for i, (note, duration) in enumerate(melody, 1):
-                    freq = extended_notes[note]
-                    display_note = note
-                    
-                    pwm = self._freq_to_pwm(freq)
-                    
-                    print(f"Loop {loop_num} - Note {i:2d}: {display_note:4s}, Freq: {freq:6.1f} Hz, PWM: {pwm:4d} µs, Duration: {duration:.1f}s")
-                    
-                    # Send PWM signal to selected motor
-                    self.coord.motor.set_pwm(self.coord._sel_motor, pwm)
-                    time.sleep(duration)
-                    
-                    # Reset to rest position with short gap
-                    self.coord.motor.set_pwm(self.coord._sel_motor, 1200)
-                    time.sleep(0.05)
-                
-                # Pause between loops
-                if loop_num == 1:
-                    print("🎵 Brief pause between loops...")
-                    time.sleep(0.5)
-                    
-            print("🎵 Happy Birthday melody complete (2x)!")
-            
-        except Exception as e:
-            print(f"Error playing melody: {e}")
-            # Ensure motor is reset
-            if self.coord and self.coord.motor:
-                self.coord.motor.set_pwm(self.coord._sel_motor, 1200)
+        # one timed table: note, rest gap, ... twice, played on deadlines
+        rows, t = [], 0.0
+        for loop_num in range(1, 3):
+            for note, duration in melody:
+                rows.append((t, self._freq_to_pwm(extended_notes[note])))
+                t += duration
+                rows.append((t, 1200))          # rest position, short gap
+                t += 0.05
+            if loop_num == 1:
+                t += 0.5                        # pause between loops
+        rows.append((t, 1200))
+        self.coord.run_profile(profiles.table(rows, name="happy_birthday"))
 
 
 
@@ -394,20 +455,26 @@ class MainWindow:
             print("Motor controller not available - cannot play melody")
             return
         
-        # Run melody in separate thread to avoid blocking GUI
-        threading.Thread(target=self._play_happy_birthday, daemon=True).start()
+        # the profile runner plays it off the GUI thread
+        self._play_happy_birthday()
 
 
     def _on_connect(self):
-        s = Settings(
+        # start from the saved settings so the options not on this panel
+        # (log format, filters, derived channels, …) survive the save
+        s = dataclasses.replace(
+            Settings.load(),
             com_port  = dpg.get_value(self.com_tag),
             baud      = int(dpg.get_value(self.baud_tag)),
             stm32_ip  = dpg.get_value(self.ip_tag),
             udp_port  = int(dpg.get_value(self.port_tag)),
+            log_format = dpg.get_value(self.logfmt_tag),
         )
         s.save()
         
         try:
+            # the backend (and pymavlink with it) loads on first connect
+            from core.coordinator import AppCoordinator
             self.coord = AppCoordinator(s)
             
             # Check connection status after initialization
@@ -477,13 +544,31 @@ class MainWindow:
     def _on_single(self):
         if not self.coord:
             return
-        threading.Thread(
-            target=lambda: self.coord.single_shot(
-                self._pending_pct,
-                dpg.get_value("duration_box")
-            ),
-            daemon=True
-        ).start()
+        # scheduled on the profile runner; returns immediately
+        self.coord.single_shot(self._pending_pct, dpg.get_value("duration_box"))
+
+    def _on_run_profile(self):
+        if not self.coord:
+            print("No coordinator available")
+            return
+        path = dpg.get_value("profile_path").strip()
+        try:
+            prof = profiles.load(path)
+        except Exception as e:
+            print(f"Cannot load profile {path!r}: {e}")
+            return
+        self.coord.run_profile(prof)
+
+    def _on_sweep(self):
+        if not self.coord:
+            print("No coordinator available")
+            return
+        try:
+            table = parse_pwm_table(dpg.get_value("sweep_table"))
+        except ValueError as e:
+            print(f"Bad sweep table: {e}")
+            return
+        self.coord.run_sweep(table)
 
     def _on_continuous(self, sender, app_data):
         if self.coord:
@@ -494,9 +579,8 @@ class MainWindow:
     def _on_pause(self):
         # Stop logging and change UI
         self.is_recording = False
-        if self.data_logger:
-            self.data_logger.stop()
-            self.data_logger = None
+        if self.coord:
+            self.coord.stop_logging()
         dpg.hide_item("record_status")
         dpg.enable_item("record_button")
         dpg.bind_item_theme(self.plot_series1, self.blue_theme)
@@ -505,14 +589,24 @@ class MainWindow:
     def _on_record(self):
         dpg.show_item("log_popup")
 
+    def _on_log_format(self, sender, fmt):
+        """Remember the chosen recording format for the next session."""
+        s = Settings.load()
+        s.log_format = fmt
+        s.save()
+        if self.coord:
+            self.coord.settings.log_format = fmt
+
     def _on_start_logging(self):
-        self.is_recording = True
         prefix = dpg.get_value(self.logname_tag).strip() or "log"
         dpg.hide_item("log_popup")
-        
-        # Create and start DataLogger with queue
-        self.data_logger = DataLogger(self.log_queue, prefix)
-        self.data_logger.start()
+        if not self.coord:
+            print("No coordinator available - cannot record")
+            return
+        self.is_recording = True
+
+        # Logger gets its own lossless subscription on the frame bus
+        self.coord.start_logging(prefix, dpg.get_value(self.logfmt_tag))
 
         # Change plot line color to red for recording
         dpg.bind_item_theme(self.plot_series1, self.red_theme)
@@ -523,140 +617,202 @@ class MainWindow:
 
     def _on_stop_logging(self):
         self.is_recording = False
-        if self.data_logger:
-            self.data_logger.stop()
-            self.data_logger = None
+        if self.coord:
+            self.coord.stop_logging()
         dpg.hide_item("record_status")
         dpg.enable_item("record_button")
         dpg.bind_item_theme(self.plot_series1, self.blue_theme)
         dpg.bind_item_theme(self.plot_series2, self.blue_theme)
 
-    def _updater(self):
-        """Main update loop - handles both UI updates AND feeds logging queue"""
+    def _set_follow(self, follow: bool):
+        self.plot_follow = follow
+        if not follow:
+            # release the sliding window so the operator can pan/zoom
+            dpg.set_axis_limits_auto("x_axis1")
+            dpg.set_axis_limits_auto("x_axis2")
+
+    def _update_plot(self, n: int, channel: str, t_now: float):
+        """Feed plot `n` a min/max-decimated view of its visible x-range."""
+        if self.plot_follow:
+            t0, t1 = t_now - self.plot_window_s, t_now
+            dpg.set_axis_limits(f"x_axis{n}", t0, t1)  # Sliding X window
+        else:
+            t0, t1 = dpg.get_axis_limits(f"x_axis{n}")
+        # one min/max pair per horizontal pixel is all the plot can show
+        width = max(100, dpg.get_item_rect_size(f"plot{n}")[0])
+        dpg.set_value(f"plot_series{n}",
+                      list(self.hist.window(channel, t0, t1, 2 * width)))
+        dpg.fit_axis_data(f"y_axis{n}")  # Auto-fit Y axis to visible data
+
+    def _render_loop(self):
+        """
+        Drive the UI from the render thread: refresh at most `refresh_hz`
+        times per second, right before a frame is rendered, so every
+        DearPyGui call happens on this thread.
+        """
+        period = 1.0 / self.refresh_hz
+        next_refresh = 0.0
         while dpg.is_dearpygui_running():
-            if not self.coord:
-                time.sleep(0.05)
-                continue
-            
-            # Get fresh data - this should NEVER be blocked
-            frame = self.coord.latest_frame()
-            if frame:
-                self.last_data_time = time.time()  # Update last data time  
-                # Feed data to logging queue if recording (non-blocking)
-                if self.is_recording and not self.log_queue.full():
-                    try:
-                        self.log_queue.put_nowait(frame)
-                    except queue.Full:
-                        pass  # Skip if queue is full, don't block UI
-                
-                # Continue with UI updates as normal
-                t = time.time() - self._t0
-                self.hist["t"].append(t)
-                
-                # Map all UDP struct fields to plot variables
-                plot_data_map = {
-                    "Voltage": frame.voltage,
-                    "Current": frame.current,
-                    "RPM": frame.rpm,
-                    "Temperature": frame.temperature,
-                    "Power": frame.voltage * frame.current,
-                    "Torque": frame.torque,
-                    "Load": frame.load,
-                    "Total_Thrust": frame.thrust,  # Property that sums all thrusters
-                    "Thrust1": frame.thrust1,
-                    "Thrust2": frame.thrust2,
-                    "Thrust3": frame.thrust3,
-                    "Thrust4": frame.thrust4,
-                    "Thrust5": frame.thrust5,
-                    "Thrust6": frame.thrust6,
-                    "STM32_Timestamp": frame.stm32_timestamp,
-                    "Pixhawk_Timestamp": frame.pixhawk_timestamp
-                }
-                
-                # Update history for all plot variables
-                for key in self._PLOT_VARS:
-                    self.hist[key].append(plot_data_map[key])
-                
-                # Optional: Keep reasonable amount of historical data to prevent memory issues
-                # Keep last 1000 points (roughly 50 seconds at 20Hz) for history
-                if len(self.hist["t"]) > 1000:
-                    for k in self.hist:
-                        self.hist[k] = self.hist[k][-1000:]
-                
-                # Update plots with scrolling 5-second X-axis window
-                if len(self.hist["t"]) > 0:
-                    current_time = self.hist["t"][-1]
-                    window_start = current_time - 5.0  # 5-second window
-                    
-                    try:
-                        # Plot 1: Set data and configure axes
-                        dpg.set_value("plot_series1", [self.hist["t"], self.hist[self.plot_ch1]])
-                        dpg.set_axis_limits("x_axis1", window_start, current_time)  # Sliding X window
-                        dpg.fit_axis_data("y_axis1")  # Auto-fit Y axis to visible data
-                        
-                        # Plot 2: Set data and configure axes
-                        dpg.set_value("plot_series2", [self.hist["t"], self.hist[self.plot_ch2]])
-                        dpg.set_axis_limits("x_axis2", window_start, current_time)  # Sliding X window
-                        dpg.fit_axis_data("y_axis2")  # Auto-fit Y axis to visible data
-                        
-                    except Exception as e:
-                        print(f"Plot update error: {e}")
-                
-                # Update gauges (using main sensor values)
-                gauge_values = [frame.voltage, frame.current, frame.rpm, frame.temperature, frame.torque, frame.load]
-                for (tag,_,rng), val in zip(self._GAUGES, gauge_values):
-                    update_gauge(tag, val, rng)
-                    
-                # Update all status text displays
-                dpg.set_value("stm32_timestamp_text",   f"STM32 Time: {frame.stm32_timestamp:.3f} s")
-                dpg.set_value("pixhawk_timestamp_text", f"Pixhawk Time: {frame.pixhawk_timestamp:.3f} s")
-                dpg.set_value("voltage_text",     f"Voltage: {frame.voltage:.2f} V")
-                dpg.set_value("current_text",     f"Current: {frame.current:.2f} A")
-                dpg.set_value("rpm_text",         f"RPM: {frame.rpm}")
-                dpg.set_value("temperature_text", f"Temp: {frame.temperature:.1f} °C")
-                dpg.set_value("power_text",       f"Power: {frame.voltage * frame.current:.2f} W")
-                dpg.set_value("torque_text",      f"Torque: {frame.torque:.2f} Nm")
-                dpg.set_value("load_text",        f"Load: {frame.load:.2f} kg")
-                dpg.set_value("total_thrust_text", f"Total Thrust: {frame.thrust:.2f}")
-                dpg.set_value("thrust1_text",     f"Thrust 1: {frame.thrust1:.2f}")
-                dpg.set_value("thrust2_text",     f"Thrust 2: {frame.thrust2:.2f}")
-                dpg.set_value("thrust3_text",     f"Thrust 3: {frame.thrust3:.2f}")
-                dpg.set_value("thrust4_text",     f"Thrust 4: {frame.thrust4:.2f}")
-                dpg.set_value("thrust5_text",     f"Thrust 5: {frame.thrust5:.2f}")
-                dpg.set_value("thrust6_text",     f"Thrust 6: {frame.thrust6:.2f}")
-                
-                pct = int((self.coord._pwm_cached - 1000) / 10)
-                dpg.set_value("throttle_text",    f"Throttle: {pct}%")
-            
-            # Update arm status button based on coordinator's armed state
-
-
-            # Update arm status button based on coordinator's armed state
-            if self.coord and hasattr(self.coord, 'armed') and self.coord.motor:
-                armed = self.coord.armed
-                armed = armed_status
-                #print(f"Armed status mainwindows: {armed_status}")
-                if armed != self.is_armed:
-                    self.is_armed = armed
-                    if self.serial_connected:
-                        if armed:
-                            dpg.set_item_label("armed_status_btn", "● ARMED")
-                            dpg.bind_item_theme("armed_status_btn", self.armed_theme)
-                        else:
-                            dpg.set_item_label("armed_status_btn", "● DISARMED")
-                            dpg.bind_item_theme("armed_status_btn", self.disarmed_theme)
-                    else:
-                        dpg.set_item_label("armed_status_btn", "● Unknown Status")
-                        dpg.bind_item_theme("armed_status_btn", self.gray_status_theme)
-            elif self.coord and not self.coord.motor:
-                # No motor controller available
-                dpg.set_item_label("armed_status_btn", "● No Motor Controller")
-                dpg.bind_item_theme("armed_status_btn", self.gray_status_theme)
+            now = time.monotonic()
+            if now >= next_refresh:
+                t0 = time.perf_counter()
+                newest = self._updater()
+                _M_TICK.observe(time.perf_counter() - t0)
+                next_refresh = now + period
+            else:
+                newest = None
+            dpg.render_dearpygui_frame()
+            startup.done()
+            if newest is not None:
+                # sensor packet arrival → its frame on screen
+                self._note_latency(time.time() - newest)
+
+    def _note_latency(self, lat: float):
+        self.display_latency = lat
+        _M_DISPLAY.set(lat)
+        self.display_latency_max = max(self.display_latency_max, lat)
+        widgets.set_text("latency_text",
+                         f"Display latency: {lat*1e3:.0f} ms "
+                         f"(max {self.display_latency_max*1e3:.0f} ms)")
 
-            
-            self._update_connection_status()
-            
-            time.sleep(0.05)
+    def _updater(self):
+        """
+        One UI refresh - consumes every frame that arrived since the last
+        one (the logger reads the frame bus itself).  Returns the host
+        receive time of the newest frame shown, or None.
+        """
+        if not self.coord:
+            return None
+
+        batch = self.coord.drain_frames()
+        newest = None
+        if len(batch):
+            self.last_data_time = time.time()  # Update last data time
+            newest = float(batch["t_host"][-1])
+            frame = MeasurementFrame.from_record(batch[-1])
+
+            # Map all UDP struct fields to plot variables (whole batch);
+            # power / total thrust / g/W are derived once at ingest
+            power = batch["power"]
+            total = batch["thrust_total"]
+            plot_data_map = {
+                "Voltage": batch["voltage"],
+                "Current": batch["current"],
+                "RPM": batch["rpm"],
+                "Temperature": batch["temperature"],
+                "Power": power,
+                "Torque": batch["torque"],
+                "Load": batch["load"],
+                "Total_Thrust": total,
+                "Efficiency": batch["g_per_w"],
+                "Thrust1": batch["thrust1"],
+                "Thrust2": batch["thrust2"],
+                "Thrust3": batch["thrust3"],
+                "Thrust4": batch["thrust4"],
+                "Thrust5": batch["thrust5"],
+                "Thrust6": batch["thrust6"],
+                "STM32_Timestamp": batch["stm32_timestamp"],
+                "Pixhawk_Timestamp": batch["pixhawk_timestamp"]
+            }
+
+            # Plot time axis = host receive time of each frame
+            t = batch["t_host"] - self._t0
+            self.hist.extend(t, np.vstack([plot_data_map[key] for key in self._PLOT_VARS]))
+
+            # Update plots with the samples inside each visible x-range
+            try:
+                self._update_plot(1, self.plot_ch1, float(t[-1]))
+                self._update_plot(2, self.plot_ch2, float(t[-1]))
+            except Exception as e:
+                print(f"Plot update error: {e}")
+
+            # Update gauges (using main sensor values)
+            gauge_values = [frame.voltage, frame.current, frame.rpm, frame.temperature, frame.torque, frame.load]
+            for (tag,_,rng), val in zip(self._GAUGES, gauge_values):
+                update_gauge(tag, val, rng)
+
+            # Update all status text displays
+            widgets.set_text("stm32_timestamp_text",   f"STM32 Time: {frame.stm32_timestamp:.3f} s")
+            widgets.set_text("pixhawk_timestamp_text", f"Pixhawk Time: {frame.pixhawk_timestamp:.3f} s")
+            widgets.set_text("voltage_text",     f"Voltage: {frame.voltage:.2f} V")
+            widgets.set_text("current_text",     f"Current: {frame.current:.2f} A")
+            widgets.set_text("rpm_text",         f"RPM: {frame.rpm}")
+            widgets.set_text("temperature_text", f"Temp: {frame.temperature:.1f} °C")
+            widgets.set_text("power_text",       f"Power: {power[-1]:.2f} W")
+            widgets.set_text("torque_text",      f"Torque: {frame.torque:.2f} Nm")
+            widgets.set_text("load_text",        f"Load: {frame.load:.2f} kg")
+            widgets.set_text("total_thrust_text", f"Total Thrust: {total[-1]:.2f}")
+            widgets.set_text("thrust1_text",     f"Thrust 1: {frame.thrust1:.2f}")
+            widgets.set_text("thrust2_text",     f"Thrust 2: {frame.thrust2:.2f}")
+            widgets.set_text("thrust3_text",     f"Thrust 3: {frame.thrust3:.2f}")
+            widgets.set_text("thrust4_text",     f"Thrust 4: {frame.thrust4:.2f}")
+            widgets.set_text("thrust5_text",     f"Thrust 5: {frame.thrust5:.2f}")
+            widgets.set_text("thrust6_text",     f"Thrust 6: {frame.thrust6:.2f}")
+
+            pct = int((self.coord._pwm_cached - 1000) / 10)
+            widgets.set_text("throttle_text",    f"Throttle: {pct}%")
+
+        # Update arm status button from the vehicle's SAFETY_ARMED flag
+        if self.coord and self.coord.motor:
+            # set every tick: the widget cache skips unchanged labels/themes,
+            # and the label must follow serial_connected changes too
+            self.is_armed = armed = self.coord.motor.get_armed_status()
+            if self.serial_connected:
+                if armed:
+                    widgets.set_label("armed_status_btn", "● ARMED")
+                    widgets.bind_theme("armed_status_btn", self.armed_theme)
+                else:
+                    widgets.set_label("armed_status_btn", "● DISARMED")
+                    widgets.bind_theme("armed_status_btn", self.disarmed_theme)
+            else:
+                widgets.set_label("armed_status_btn", "● Unknown Status")
+                widgets.bind_theme("armed_status_btn", self.gray_status_theme)
+        elif self.coord and not self.coord.motor:
+            # No motor controller available
+            widgets.set_label("armed_status_btn", "● No Motor Controller")
+            widgets.bind_theme("armed_status_btn", self.gray_status_theme)
+
+        self._update_connection_status()
+        if time.monotonic() >= self._next_stream_panel:
+            self._next_stream_panel = time.monotonic() + 0.5
+            self._update_stream_panel()
+        if time.monotonic() >= self._next_metrics_panel and dpg.is_item_shown("metrics_window"):
+            self._next_metrics_panel = time.monotonic() + 1.0
+            widgets.set_text("metrics_text", "\n".join(
+                f"{series:<64} {value}" for series, value in REGISTRY.snapshot()))
+        return newest
+
+    def _update_stream_panel(self):
+        st = self.coord.stream_stats()
+        widgets.set_text("stream_state_text",
+                         {True: "Stream: clean", False: "Stream: ⚠ errors/gaps seen"}
+                         .get(st["clean"], "Stream: unverified (no STM32 timestamps)"))
+        widgets.set_text("stream_rate_text",
+                         f"Rate: {st['pps']:.0f} pkt/s, {st['bps']/1e3:.1f} kB/s")
+        masked = sum(st["masked"].values())
+        widgets.set_text("stream_error_text",
+                         f"Size errors: {st['size_errors']}, masked values: {masked}")
+        widgets.set_text("stream_gap_text",
+                         f"Gaps: {st['gaps']} (~{st['lost']} lost, {st['backwards']} backwards)"
+                         if st["timed"] else "Gaps: n/a")
+        widgets.set_text("stream_jitter_text",
+                         f"Inter-arrival: {st['interarrival_mean_ms']:.2f} ms "
+                         f"± {st['jitter_ms']:.2f} ms")
+        # the UI ring is latest-only by design; report the lossless consumers
+        drops = ", ".join(f"{name} {v['dropped']}"
+                          for name, v in st["subscribers"].items() if name != "ui")
+        widgets.set_text("stream_drop_text", f"Bus drops: {drops or '-'}")
+
+        cs = self.coord.command_stats()
+        if cs and cs["acked"]:
+            lat = cs["latency_ms"]
+            widgets.set_text("cmd_ack_text",
+                             f"Cmd ack: p50 {lat['p50']:.1f} / p95 {lat['p95']:.1f} "
+                             f"/ max {lat['max']:.1f} ms")
+        if cs:
+            widgets.set_text("cmd_fail_text",
+                             f"Cmd failed: {cs['failed']}, unacked: {cs['unacked']}"
+                             f" ({cs['pending']} pending)")
 
 if __name__ == "__main__":
     MainWindow()
@@ -0,0 +1,104 @@
+from __future__ import annotations
+from typing import Sequence, Tuple
+import numpy as np
+
+from utils.history import PlotHistory
+
+
+def minmax_decimate(t: np.ndarray, y: np.ndarray,
+                    max_points: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Reduce (t, y) to at most ~max_points by keeping the min and the max
+    of each bin, in time order, so narrow spikes survive.
+    """
+    n = len(t)
+    bins = max(1, max_points // 2)
+    if n <= 2 * bins:
+        return t, y
+    size = -(-n // bins)
+    m = (n // size) * size
+    # NaN (masked samples) must not win the min/max of a bin
+    nan = np.isnan(y)
+    y_lo, y_hi = (np.where(nan, np.inf, y), np.where(nan, -np.inf, y)) \
+        if nan.any() else (y, y)
+    yb = y_lo[:m].reshape(-1, size)
+    lo, hi = yb.argmin(axis=1), y_hi[:m].reshape(-1, size).argmax(axis=1)
+    base = np.arange(len(yb)) * size
+    idx = np.empty(2 * len(yb), dtype=np.intp)
+    idx[0::2] = np.minimum(lo, hi) + base
+    idx[1::2] = np.maximum(lo, hi) + base
+    if m < n:
+        a, b = sorted((int(y_lo[m:].argmin()), int(y_hi[m:].argmax())))
+        idx = np.concatenate((idx, [m + a, m + b]))
+    return t[idx], y[idx]
+
+
+class DecimatedHistory:
+    """
+    Plot history plus a pyramid of min/max envelopes.
+
+    Level 0 holds raw samples; each coarser level stores one (min, max)
+    pair per `factor` points of the level below, so a 30-minute run can
+    be drawn from a few thousand points.  `window()` picks the finest
+    level that covers the requested range within the pixel budget.
+    """
+
+    def __init__(self, channels: Sequence[str], capacity: int = 1 << 15,
+                 factor: int = 16, levels: int = 4):
+        self.channels = list(channels)
+        self.factor = int(factor)
+        self.levels = [PlotHistory(channels, capacity) for _ in range(levels)]
+        self._pending = [0] * levels   # points not yet folded upward
+
+    def __len__(self) -> int:
+        return len(self.levels[0])
+
+    def clear(self):
+        for lvl in self.levels:
+            lvl.clear()
+        self._pending = [0] * len(self.levels)
+
+    def last_t(self) -> float:
+        return self.levels[0].last_t()
+
+    def append(self, t: float, values: Sequence[float]):
+        self.levels[0].append(t, values)
+        self._fold(0, 1)
+
+    def extend(self, t: np.ndarray, values: np.ndarray):
+        self.levels[0].extend(t, values)
+        self._fold(0, len(t))
+
+    def _fold(self, i: int, k: int):
+        if i + 1 >= len(self.levels):
+            return
+        lvl = self.levels[i]
+        self._pending[i] = min(self._pending[i] + k, len(lvl))
+        step = self.factor if i == 0 else 2 * self.factor
+        nb = self._pending[i] // step
+        if nb == 0:
+            return
+        start = len(lvl) - self._pending[i]
+        take = nb * step
+        tt = lvl.t[start:start + take].reshape(nb, step)
+        v = lvl.block(start, start + take).reshape(len(self.channels), nb, step)
+        out_t = np.empty(2 * nb)
+        out_t[0::2], out_t[1::2] = tt[:, 0], tt[:, -1]
+        out_v = np.empty((len(self.channels), 2 * nb))
+        out_v[:, 0::2] = np.fmin.reduce(v, axis=2)
+        out_v[:, 1::2] = np.fmax.reduce(v, axis=2)
+        self._pending[i] -= take
+        self.levels[i + 1].extend(out_t, out_v)
+        self._fold(i + 1, 2 * nb)
+
+    def window(self, name: str, t_start: float, t_end: float,
+               max_points: int) -> Tuple[np.ndarray, np.ndarray]:
+        """(t, y) for [t_start, t_end] with at most ~max_points points."""
+        for lvl in self.levels:
+            t, y = lvl.window(name, t_start, t_end)
+            covers = len(lvl) and lvl.t[0] <= t_start
+            if len(t) <= max_points and (covers or lvl is self.levels[-1]):
+                return t, y
+            if len(t) > max_points and covers:
+                break
+        return minmax_decimate(t, y, max_points)
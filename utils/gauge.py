@@ -1,34 +1,42 @@
 import math, dearpygui.dearpygui as dpg
 
+# what each gauge currently shows: tag -> (needle endpoint, value text)
+_shown: dict = {}
+
 def create_gauge(tag: str, label: str, max_val: float):
     """
-    Call once. Creates an empty drawlist with the given tag.
+    Call once. Creates the drawlist with bezel, label, needle and value
+    text; later updates only reconfigure the needle and text items.
     """
     with dpg.drawlist(width=180, height=180, tag=tag):
         # draw static bezel + label once
         dpg.draw_circle((90, 90), 80, color=(80, 80, 80, 255), thickness=6)
         dpg.draw_text((60, 155), label, size=14, color=(200, 200, 200))
+        dpg.draw_line((90, 90), _needle_end(0.0, max_val), color=(0, 255, 0),
+                      thickness=4, tag=f"{tag}_needle")
+        dpg.draw_text((70, 75), f"{0.0:.1f}", size=16, color=(255, 255, 255),
+                      tag=f"{tag}_value")
+    _shown[tag] = (_needle_end(0.0, max_val), f"{0.0:.1f}")
+
+def _needle_end(value: float, max_val: float):
+    pct   = max(0.0, min(1.0, value / max_val)) if value == value else 0.0
+    angle = -0.75 * math.pi + 1.5 * math.pi * pct
+    # whole pixels: sub-pixel needle moves are invisible
+    return (round(90 + 70 * math.cos(angle)), round(90 + 70 * math.sin(angle)))
 
 def update_gauge(tag: str, value: float, max_val: float):
     """
-    Redraw the *needle* and numeric value. Never recreates the drawlist.
+    Move the *needle* and change the numeric value in place.  Skips the
+    draw items entirely when neither changed at the shown precision.
     """
-    if not dpg.does_item_exist(tag):
+    if tag not in _shown or not dpg.does_item_exist(tag):
         return                       # safeguard
-    dpg.delete_item(tag, children_only=True)   # keep the drawlist itself
-
-    # redraw static bezel
-    dpg.draw_circle((90, 90), 80, color=(80, 80, 80, 255), thickness=6,
-                    parent=tag)
-
-    # needle
-    pct   = max(0.0, min(1.0, value / max_val))
-    angle = -0.75 * math.pi + 1.5 * math.pi * pct
-    x = 90 + 70 * math.cos(angle)
-    y = 90 + 70 * math.sin(angle)
-    dpg.draw_line((90, 90), (x, y), color=(0, 255, 0), thickness=4,
-                  parent=tag)
-
-    # numeric text
-    dpg.draw_text((70, 75), f"{value:.1f}", size=16, color=(255, 255, 255),
-                  parent=tag)
+    if not math.isfinite(value):
+        return                       # masked sample: keep the last reading
+    end, text = _needle_end(value, max_val), f"{value:.1f}"
+    old_end, old_text = _shown[tag]
+    if end != old_end:
+        dpg.configure_item(f"{tag}_needle", p2=end)
+    if text != old_text:
+        dpg.configure_item(f"{tag}_value", text=text)
+    _shown[tag] = (end, text)
@@ -0,0 +1,76 @@
+from __future__ import annotations
+from typing import Sequence, Tuple
+import numpy as np
+
+
+class PlotHistory:
+    """
+    Fixed-capacity columnar ring buffer for live-plot history.
+
+    Every sample is written twice (at i and i+capacity), so the newest
+    `len(self)` samples are always one contiguous slice per channel:
+    appends are O(1) and `window()` hands DearPyGui views, never copies.
+    """
+
+    def __init__(self, channels: Sequence[str], capacity: int = 1 << 15):
+        self.channels = list(channels)
+        self.capacity = int(capacity)
+        self._row  = {name: i + 1 for i, name in enumerate(self.channels)}
+        self._data = np.zeros((len(self.channels) + 1, 2 * self.capacity))
+        self._pos  = 0          # next write index in [0, capacity)
+        self._n    = 0          # valid samples (<= capacity)
+
+    def __len__(self) -> int:
+        return self._n
+
+    def clear(self):
+        self._pos = self._n = 0
+
+    def append(self, t: float, values: Sequence[float]):
+        """Add one sample; `values` follows the order of `channels`."""
+        p, cap = self._pos, self.capacity
+        col = self._data[:, p]
+        col[0] = t
+        col[1:] = values
+        self._data[:, p + cap] = col
+        self._pos = (p + 1) % cap
+        self._n = min(self._n + 1, cap)
+
+    def extend(self, t: np.ndarray, values: np.ndarray):
+        """Add a batch: `t` shape (k,), `values` shape (len(channels), k)."""
+        k = len(t)
+        if k == 0:
+            return
+        cap = self.capacity
+        if k > cap:
+            t, values, k = t[-cap:], values[:, -cap:], cap
+        idx = (self._pos + np.arange(k)) % cap
+        self._data[0, idx] = t
+        self._data[1:, idx] = values
+        self._data[:, idx + cap] = self._data[:, idx]
+        self._pos = (self._pos + k) % cap
+        self._n = min(self._n + k, cap)
+
+    def _rows(self, row: int) -> np.ndarray:
+        end = self._pos + self.capacity
+        return self._data[row, end - self._n:end]
+
+    def block(self, i0: int, i1: int) -> np.ndarray:
+        """All channels for samples i0..i1 (0 = oldest held), shape (channels, k)."""
+        base = self._pos + self.capacity - self._n
+        return self._data[1:, base + i0:base + i1]
+
+    @property
+    def t(self) -> np.ndarray:
+        return self._rows(0)
+
+    def last_t(self) -> float:
+        return float(self._data[0, self._pos + self.capacity - 1]) if self._n else 0.0
+
+    def window(self, name: str, t_start: float,
+               t_end: float = np.inf) -> Tuple[np.ndarray, np.ndarray]:
+        """Contiguous (t, y) views of samples with t_start <= t <= t_end."""
+        t = self._rows(0)
+        i0 = int(np.searchsorted(t, t_start, side="left"))
+        i1 = int(np.searchsorted(t, t_end, side="right"))
+        return t[i0:i1], self._rows(self._row[name])[i0:i1]
@@ -0,0 +1,86 @@
+"""
+Startup timing: where the time to the first interactive frame goes.
+
+    from utils import startup
+    startup.begin()                 # as early as possible in main.py
+    ...
+    startup.mark("ui built")        # named phases, time since the last mark
+    ...
+    startup.done()                  # first frame: print the report once
+
+Between begin() and done() every first-time import is timed and charged
+to its top-level package (nested imports count towards the outer one), so
+the report shows e.g. numpy vs dearpygui vs our own packages.  For a
+per-module breakdown run `python -X importtime main.py`.
+
+Set LAT_STARTUP_REPORT=0 to silence the report.
+"""
+from __future__ import annotations
+import builtins, os, sys, time
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+
+__all__ = ["begin", "mark", "done", "report"]
+
+_orig_import = builtins.__import__
+_t0: Optional[float] = None
+_last = 0.0
+_phases: List[Tuple[str, float]] = []
+_imports: Dict[str, float] = defaultdict(float)
+_depth = 0
+_reported = False
+
+
+def _timed_import(name, globals=None, locals=None, fromlist=(), level=0):
+    global _depth
+    if level or name in sys.modules:            # relative or cached: not a cold load
+        return _orig_import(name, globals, locals, fromlist, level)
+    _depth += 1
+    t = time.perf_counter()
+    try:
+        return _orig_import(name, globals, locals, fromlist, level)
+    finally:
+        _depth -= 1
+        if _depth == 0:
+            _imports[name.partition(".")[0]] += time.perf_counter() - t
+
+
+def begin(t0: Optional[float] = None):
+    """Start timing (from `t0`, a perf_counter() value, if given)."""
+    global _t0, _last
+    _t0 = _last = time.perf_counter() if t0 is None else t0
+    builtins.__import__ = _timed_import
+
+
+def mark(label: str):
+    """Close the current phase under `label`."""
+    global _last
+    if _t0 is None:
+        return
+    now = time.perf_counter()
+    _phases.append((label, now - _last))
+    _last = now
+
+
+def done(label: str = "first frame"):
+    """Final mark; stop timing imports and print the report (once)."""
+    global _reported
+    if _t0 is None or _reported:
+        return
+    mark(label)
+    builtins.__import__ = _orig_import
+    _reported = True
+    if os.environ.get("LAT_STARTUP_REPORT", "1") != "0":
+        print(report())
+
+
+def report(top: int = 8) -> str:
+    total = _last - (_t0 or _last)
+    lines = [f"Startup: {total * 1e3:.0f} ms to {_phases[-1][0] if _phases else 'now'}"]
+    for label, dt in _phases:
+        lines.append(f"  {label:<24} {dt * 1e3:8.1f} ms")
+    if _imports:
+        lines.append("  imports (incl. dependencies):")
+        for name, dt in sorted(_imports.items(), key=lambda kv: -kv[1])[:top]:
+            lines.append(f"    {name:<22} {dt * 1e3:8.1f} ms")
+    return "\n".join(lines)
@@ -0,0 +1,30 @@
+import dearpygui.dearpygui as dpg
+
+# last value pushed to each item, so unchanged updates never reach DPG
+_values: dict = {}
+_labels: dict = {}
+_themes: dict = {}
+
+def set_text(tag, text: str):
+    """`dpg.set_value` for text items, skipped when the string is unchanged."""
+    if _values.get(tag) != text:
+        _values[tag] = text
+        dpg.set_value(tag, text)
+
+def set_label(tag, label: str):
+    if _labels.get(tag) != label:
+        _labels[tag] = label
+        dpg.set_item_label(tag, label)
+
+def bind_theme(tag, theme):
+    if _themes.get(tag) != theme:
+        _themes[tag] = theme
+        dpg.bind_item_theme(tag, theme)
+
+def forget(tag=None):
+    """Drop cached state (all items when tag is None) to force a refresh."""
+    for cache in (_values, _labels, _themes):
+        if tag is None:
+            cache.clear()
+        else:
+            cache.pop(tag, None)